@@ -4,8 +4,10 @@ AI Generator - Complete with NSFW Support and Multiple Models
 
 import logging
 from typing import Dict, Any
-from bytez import Bytez
 from src.core.config import get_config
+from src.core.media_cache import get_media_cache
+from src.core.model_client import get_model_client
+from src.core.circuit_breaker import CircuitOpenError
 
 logger = logging.getLogger(__name__)
 
@@ -36,28 +38,12 @@ class AIGenerator:
     
     def __init__(self):
         self.config = get_config()
-        # Use multiple API keys for rate limit handling
-        self.api_keys = []
-        
-        # Add available API keys
-        if hasattr(self.config, 'bytez_key_1') and self.config.bytez_key_1:
-            self.api_keys.append(self.config.bytez_key_1)
-        if hasattr(self.config, 'bytez_key_2') and self.config.bytez_key_2:
-            self.api_keys.append(self.config.bytez_key_2)
-        if hasattr(self.config, 'bytez_key_3') and self.config.bytez_key_3:
-            self.api_keys.append(self.config.bytez_key_3)
-        
-        if not self.api_keys:
+        # Keys, clients and rotation live in the shared pool
+        self.model_client = get_model_client()
+        if not self.model_client.clients:
             raise ValueError("No Bytez API keys configured!")
         
-        self.current_key_index = 0
-        self.bytez = Bytez(self.api_keys[0])
-    
-    def _get_next_client(self):
-        """Rotate to next API key to avoid rate limits (1 concurrent per key)"""
-        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-        logger.info(f"Switching to API key {self.current_key_index + 1}/{len(self.api_keys)}")
-        return Bytez(self.api_keys[self.current_key_index])
+        self.media_cache = get_media_cache()
     
     def generate_image(self, prompt: str, style: str = "normal") -> Dict[str, Any]:
         """Generate image with style support"""
@@ -73,15 +59,28 @@ class AIGenerator:
             elif style == "realistic":
                 prompt = f"photorealistic, high quality, detailed, {prompt}"
             
-            # Try with current client, rotate if rate limited
-            for attempt in range(len(self.api_keys)):
+            # Serve identical requests from cache
+            cached = self.media_cache.get(model_name, prompt, {"style": style})
+            if cached:
+                return {
+                    "success": True,
+                    "url": cached["url"],
+                    "path": self.media_cache.get_local_path(cached),
+                    "content_hash": cached.get("content_hash"),
+                    "prompt": prompt,
+                    "style": style,
+                    "cached": True
+                }
+            
+            # Model client picks a free key; retry on another key if rate limited
+            for attempt in range(len(self.model_client.clients)):
                 try:
-                    client = self._get_next_client() if attempt > 0 else self.bytez
-                    model = client.model(model_name)
-                    result = model.run(prompt)
+                    result = self.model_client.run(model_name, prompt, call_site="image")
+                    if getattr(result, 'error', None):
+                        raise Exception(result.error)
                     break
                 except Exception as e:
-                    if "rate limit" in str(e).lower() and attempt < len(self.api_keys) - 1:
+                    if "rate limit" in str(e).lower() and attempt < len(self.model_client.clients) - 1:
                         logger.warning(f"Rate limited, trying next API key...")
                         continue
                     raise
@@ -102,6 +101,7 @@ class AIGenerator:
                 image_url = str(image_url)
             
             logger.info(f"✅ Image generated: {str(result)[:100]}...")
+            self.media_cache.put(model_name, prompt, image_url, {"style": style}, media_type="image")
             
             return {
                 "success": True,
@@ -110,6 +110,12 @@ class AIGenerator:
                 "style": style
             }
             
+        except CircuitOpenError as e:
+            logger.warning(f"⚠️ Image model unavailable, failing fast: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
         except Exception as e:
             logger.error(f"❌ Image generation failed: {e}")
             return {
@@ -124,15 +130,26 @@ class AIGenerator:
             
             model_name = self.VIDEO_MODELS["default"]
             
-            # Try with multiple API keys
-            for attempt in range(len(self.api_keys)):
+            cached = self.media_cache.get(model_name, prompt)
+            if cached:
+                return {
+                    "success": True,
+                    "url": cached["url"],
+                    "path": self.media_cache.get_local_path(cached),
+                    "content_hash": cached.get("content_hash"),
+                    "prompt": prompt,
+                    "cached": True
+                }
+            
+            # Model client picks a free key; retry on another key if rate limited
+            for attempt in range(len(self.model_client.clients)):
                 try:
-                    client = self._get_next_client() if attempt > 0 else self.bytez
-                    model = client.model(model_name)
-                    result = model.run(prompt)
+                    result = self.model_client.run(model_name, prompt, call_site="video")
+                    if getattr(result, 'error', None):
+                        raise Exception(result.error)
                     break
                 except Exception as e:
-                    if "rate limit" in str(e).lower() and attempt < len(self.api_keys) - 1:
+                    if "rate limit" in str(e).lower() and attempt < len(self.model_client.clients) - 1:
                         logger.warning(f"Rate limited, trying next API key...")
                         continue
                     raise
@@ -151,6 +168,7 @@ class AIGenerator:
                 video_url = str(video_url)
             
             logger.info(f"✅ Video generated: {str(result)[:100]}...")
+            self.media_cache.put(model_name, prompt, video_url, media_type="video")
             
             return {
                 "success": True,
@@ -158,6 +176,12 @@ class AIGenerator:
                 "prompt": prompt
             }
             
+        except CircuitOpenError as e:
+            logger.warning(f"⚠️ Video model unavailable, failing fast: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
         except Exception as e:
             logger.error(f"❌ Video generation failed: {e}")
             return {
@@ -173,15 +197,26 @@ class AIGenerator:
             # Select model based on type
             model_name = self.AUDIO_MODELS.get(audio_type, self.AUDIO_MODELS["speech"])
             
-            # Try with multiple API keys
-            for attempt in range(len(self.api_keys)):
+            cached = self.media_cache.get(model_name, text)
+            if cached:
+                return {
+                    "success": True,
+                    "url": cached["url"],
+                    "path": self.media_cache.get_local_path(cached),
+                    "content_hash": cached.get("content_hash"),
+                    "text": text,
+                    "cached": True
+                }
+            
+            # Model client picks a free key; retry on another key if rate limited
+            for attempt in range(len(self.model_client.clients)):
                 try:
-                    client = self._get_next_client() if attempt > 0 else self.bytez
-                    model = client.model(model_name)
-                    result = model.run(text)
+                    result = self.model_client.run(model_name, text, call_site="audio")
+                    if getattr(result, 'error', None):
+                        raise Exception(result.error)
                     break
                 except Exception as e:
-                    if "rate limit" in str(e).lower() and attempt < len(self.api_keys) - 1:
+                    if "rate limit" in str(e).lower() and attempt < len(self.model_client.clients) - 1:
                         logger.warning(f"Rate limited, trying next API key...")
                         continue
                     raise
@@ -200,6 +235,7 @@ class AIGenerator:
                 audio_url = str(audio_url)
             
             logger.info(f"✅ Audio generated: {str(result)[:100]}...")
+            self.media_cache.put(model_name, text, audio_url, media_type="audio")
             
             return {
                 "success": True,
@@ -207,6 +243,12 @@ class AIGenerator:
                 "text": text
             }
             
+        except CircuitOpenError as e:
+            logger.warning(f"⚠️ Audio model unavailable, failing fast: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
         except Exception as e:
             logger.error(f"❌ Audio generation failed: {e}")
             return {
@@ -0,0 +1,243 @@
+"""
+Intent Router - Sends trivial chat messages down cheaper paths
+Lanes: template (no model call), light (short prompt), full (heavy persona prompt)
+"""
+
+import json
+import logging
+import random
+import re
+import threading
+from typing import Dict, Any, Optional
+
+from src.core.config import get_config
+from src.core.model_registry import TEXT_MODELS
+from src.core.model_client import get_model_client
+from src.ai.sentiment import get_sentiment_classifier
+
+logger = logging.getLogger(__name__)
+
+
+class IntentRouter:
+    """
+    Fast local intent classification
+    - Rule sets for greetings, acknowledgements, farewells, emoji-only messages
+    - Compiled keyword model for emotional / conversational cues
+    - Optional Arch-Router hook for messages the rules can't settle
+    """
+
+    LANES = ("template", "light", "full")
+
+    # Whole-message rules (matched after normalization)
+    RULES = {
+        "greeting": [
+            "hi", "hii", "hiii", "hello", "hey", "heyy", "hey there", "yo", "sup", "wassup",
+            "namaste", "sat sri akaal", "ssa", "kaise ho", "ki haal aa", "kya haal hai"
+        ],
+        "good_morning": ["good morning", "gm", "morning", "good morning ji", "suprabhat"],
+        "good_night": ["good night", "gn", "night", "nighty night", "shubh ratri", "sweet dreams"],
+        "acknowledgement": [
+            "ok", "okay", "okk", "okie", "k", "kk", "hmm", "hmmm", "hm", "lol", "lmao", "haha",
+            "hahaha", "hehe", "cool", "nice", "great", "sure",
+            "acha", "accha", "achha", "theek hai", "thik hai", "sahi"
+        ],
+        "thanks": ["thanks", "thank you", "thx", "ty", "shukriya", "dhanyavaad", "thanks yaar"],
+        "farewell": ["bye", "byee", "bye bye", "ttyl", "see you", "cya", "chalo bye", "talk later"]
+    }
+
+    # Cues that a message needs the full persona prompt
+    HEAVY_CUES = [
+        "feel", "feeling", "sad", "miss", "love", "lonely", "alone", "hurt", "cry", "crying",
+        "remember", "memory", "why", "how do", "what should", "advice", "help me", "scared",
+        "worried", "anxious", "depressed", "breakup", "relationship", "family", "died", "death",
+        "angry", "stress", "tell me about", "story", "dream", "life",
+        "dil", "yaad", "dukh", "udaas", "pyaar", "pyar", "kyun", "pareshan", "akela"
+    ]
+
+    # Moods that always deserve the full prompt
+    HEAVY_MOODS = ("sad", "lonely", "negative", "flirty")
+
+    LIGHT_MAX_WORDS = 8
+
+    TEMPLATES = {
+        "greeting": {
+            "english": ["Hey you! 💕 How's your day going?", "Hii! I was just thinking about you 😊"],
+            "hinglish": ["Arre yaar, hi! 💕 Kaisa chal raha hai?", "Hii! Bas tera hi wait kar rahi thi 😊"],
+            "punjabi": ["Sat Sri Akaal ji! 💕 Ki haal aa?", "Hii! Tuhada hi intezaar si 😊"]
+        },
+        "good_morning": {
+            "english": ["Good morning! ☀️ Did you sleep well?", "Morning sunshine! ☀️ Have a beautiful day 💕"],
+            "hinglish": ["Good morning ji! ☀️ Neend achhi aayi?", "Good morning! ☀️ Aaj ka din mast jaaye 💕"],
+            "punjabi": ["Good morning ji! ☀️ Neend changi aayi?", "Good morning! ☀️ Aaj da din vadiya jaave 💕"]
+        },
+        "good_night": {
+            "english": ["Good night! 🌙 Sweet dreams, I'll be right here 💕", "Sleep well 🌙 Talk tomorrow? 💕"],
+            "hinglish": ["Good night! 🌙 Sweet dreams yaar 💕", "So jao ab 🌙 Kal baat karte hain 💕"],
+            "punjabi": ["Shubh ratri! 🌙 Sweet dreams ji 💕", "Soja hun 🌙 Kal gal karange 💕"]
+        },
+        "acknowledgement": {
+            "english": ["😊", "Hehe 😄 So what else is on your mind?", "Mhm 💕 Tell me more!"],
+            "hinglish": ["😊", "Hehe 😄 Aur bata, kya chal raha hai?", "Hmm 💕 Aur sunao!"],
+            "punjabi": ["😊", "Hehe 😄 Hor dasso, ki chal reha?", "Hmm 💕 Hor sunao!"]
+        },
+        "thanks": {
+            "english": ["Anytime! 💕", "Always here for you 😊"],
+            "hinglish": ["Arre thanks kis baat ka yaar 💕", "Hamesha tere saath hoon 😊"],
+            "punjabi": ["Koi gal nahi ji 💕", "Hamesha tere naal aan 😊"]
+        },
+        "farewell": {
+            "english": ["Bye for now! 💕 Come back soon, okay?", "Talk soon! I'll miss you 💕"],
+            "hinglish": ["Bye yaar! 💕 Jaldi wapas aana", "Chalo bye! Yaad aayegi 💕"],
+            "punjabi": ["Bye ji! 💕 Jaldi wapas aana", "Chalo bye! Yaad aavegi 💕"]
+        },
+        "emoji": {
+            "english": ["💕", "😊💕", "🥰"],
+            "hinglish": ["💕", "😊💕", "🥰"],
+            "punjabi": ["💕", "😊💕", "🥰"]
+        }
+    }
+
+    ARCH_ROUTES = {
+        "light": "casual small talk, short replies, simple questions",
+        "full": "emotional conversation, personal topics, advice, memories, relationships"
+    }
+
+    # Emoji code points only (plus joiners, variation selectors and spaces)
+    EMOJI_ONLY = re.compile(
+        r"^[\s\u2600-\u27bf\u2b00-\u2bff\U0001F000-\U0001FAFF\u200d\ufe0f\u20e3]+$"
+    )
+
+    def __init__(self):
+        self.config = get_config()
+        self.sentiment = get_sentiment_classifier()
+
+        self._rules = {}
+        for intent, phrases in self.RULES.items():
+            for phrase in phrases:
+                self._rules[phrase] = intent
+
+        self._heavy = re.compile(
+            r"\b(" + "|".join(re.escape(cue) for cue in sorted(self.HEAVY_CUES, key=len, reverse=True)) + r")",
+            re.IGNORECASE
+        )
+
+        # Optional model hook (INTENT_ROUTER_MODEL=arch_router)
+        self.router_model = TEXT_MODELS.get(self.config.intent_router_model, self.config.intent_router_model) or None
+
+        self._lock = threading.Lock()
+        self.lane_counts = {lane: 0 for lane in self.LANES}
+
+    # ==================== CLASSIFICATION ====================
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        text = (text or "").lower().strip()
+        text = re.sub(r"[^\w\s']", " ", text)
+        # Collapse stretched words: "okkkk" -> "okk", "heyyyy" -> "heyy"
+        text = re.sub(r"(\w)\1{2,}", r"\1\1", text)
+        return " ".join(text.split())
+
+    def classify(self, text: str) -> Dict[str, Any]:
+        """Classify a chat message -> {"lane", "intent", "reason"}"""
+        if not text or not text.strip():
+            return self._route("template", "emoji", "empty")
+
+        # Mood first: "😭" or "💔" deserves a real reply, not a cheerful emoji
+        mood = self.sentiment.classify(text)
+        heavy_mood = mood["label"] in self.HEAVY_MOODS
+
+        if self.EMOJI_ONLY.match(text):
+            if heavy_mood:
+                return self._route("full", "conversation", f"mood:{mood['label']}")
+            return self._route("template", "emoji", "emoji_only")
+
+        normalized = self.normalize(text)
+        intent = self._rules.get(normalized)
+        if intent:
+            return self._route("template", intent, "rule")
+
+        words = normalized.split()
+        if self._heavy.search(normalized):
+            return self._route("full", "conversation", "heavy_cue")
+
+        if heavy_mood:
+            return self._route("full", "conversation", f"mood:{mood['label']}")
+
+        if len(words) <= self.LIGHT_MAX_WORDS:
+            return self._route("light", "small_talk", "short")
+
+        if self.router_model:
+            lane = self._ask_router(text)
+            if lane:
+                return self._route(lane, "conversation", "arch_router")
+
+        return self._route("full", "conversation", "default")
+
+    def _ask_router(self, text: str) -> Optional[str]:
+        """Ask the routing model to pick light/full for ambiguous messages"""
+        try:
+            routes = [{"name": name, "description": desc} for name, desc in self.ARCH_ROUTES.items()]
+            messages = [
+                {
+                    "role": "system",
+                    "content": (
+                        "You are a routing assistant. Pick the route that best matches the user message.\n"
+                        f"<routes>{json.dumps(routes)}</routes>\n"
+                        'Respond only with JSON: {"route": "<name>"}'
+                    )
+                },
+                {"role": "user", "content": text}
+            ]
+            content = get_model_client().chat(
+                self.router_model,
+                messages,
+                call_site="intent_router",
+                deterministic=True
+            )
+            match = re.search(r'"route"\s*:\s*"(\w+)"', content or "")
+            if match and match.group(1) in self.ARCH_ROUTES:
+                return match.group(1)
+        except Exception as e:
+            logger.debug(f"Intent router model unavailable: {e}")
+        return None
+
+    def _route(self, lane: str, intent: str, reason: str) -> Dict[str, Any]:
+        with self._lock:
+            self.lane_counts[lane] += 1
+        return {"lane": lane, "intent": intent, "reason": reason}
+
+    # ==================== TEMPLATES ====================
+
+    def render_template(self, intent: str, language: str = "english") -> str:
+        """Pick a templated reply for a trivial message"""
+        replies = self.TEMPLATES.get(intent, self.TEMPLATES["acknowledgement"])
+        return random.choice(replies.get(language, replies["english"]))
+
+    # ==================== STATS ====================
+
+    def get_lane_fractions(self) -> Dict[str, float]:
+        """Fraction of messages routed to each lane"""
+        total = sum(self.lane_counts.values())
+        return {
+            lane: round(count / total, 3) if total else 0.0
+            for lane, count in self.lane_counts.items()
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "counts": dict(self.lane_counts),
+            "fractions": self.get_lane_fractions(),
+            "router_model": self.router_model
+        }
+
+
+# Global instance
+_intent_router = None
+
+
+def get_intent_router() -> IntentRouter:
+    """Get global intent router"""
+    global _intent_router
+    if _intent_router is None:
+        _intent_router = IntentRouter()
+    return _intent_router
@@ -4,8 +4,11 @@ Advanced Roleplay Engine with Story-Based Personalization
 
 import logging
 from typing import Dict, Any, List
-from bytez import Bytez
 from src.core.config import get_config
+from src.core.model_client import get_model_client
+from src.core.model_router import get_model_router
+from src.ai.sentiment import get_sentiment_classifier
+from src.ai.intent_router import get_intent_router
 from src.core.user_manager import get_user_manager
 
 logger = logging.getLogger(__name__)
@@ -16,7 +19,10 @@ class RoleplayEngine:
     
     def __init__(self):
         self.config = get_config()
-        self.bytez = Bytez(self.config.bytez_key_1)
+        self.model_client = get_model_client()
+        self.model_router = get_model_router()
+        self.sentiment = get_sentiment_classifier()
+        self.intent_router = get_intent_router()
         self.user_manager = get_user_manager()
     
     def generate_response(self, user_id: int, message: str, nsfw_mode: bool = False) -> str:
@@ -65,19 +71,15 @@ class RoleplayEngine:
                 "content": message
             })
             
-            # Generate with GPT
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(conversation_messages)
-            
-            # Extract content from response
-            if hasattr(result, 'output') and result.output:
-                response = result.output.get('content', 'I am here for you!')
-            elif isinstance(result, dict):
-                response = result.get('content', str(result))
-            elif isinstance(result, list):
-                response = result[0] if result else "I am here for you!"
-            else:
-                response = str(result)
+            # Generate down the chat cascade (falls back when the primary is slow or failing)
+            response = self.model_router.chat(
+                "chat",
+                conversation_messages,
+                deadline=self.config.chat_deadline,
+                call_site="chat_full",
+                default="I am here for you! 💕",
+                hedge=True
+            )
             
             # Clean up response
             response = str(response).strip()
@@ -97,6 +99,66 @@ class RoleplayEngine:
             logger.error(f"Roleplay generation failed: {e}")
             return "I'm having trouble thinking right now... Try again? 💕"
     
+    def generate_routed_response(self, user_id: int, message: str, nsfw_mode: bool = False) -> str:
+        """Route chat by intent: templates for trivial messages, short prompt for small talk"""
+        route = self.intent_router.classify(message)
+        
+        if route["lane"] == "template":
+            from src.features.language_support import get_language_support
+            language = get_language_support().get_language(user_id)
+            response = self.intent_router.render_template(route["intent"], language)
+            
+            self.user_manager.add_memory(user_id, f"User said: {message}", "conversation")
+            self.user_manager.add_memory(user_id, f"Prabh replied: {response}", "conversation")
+            return response
+        
+        if route["lane"] == "light":
+            return self.generate_light_response(user_id, message)
+        
+        return self.generate_response(user_id, message, nsfw_mode=nsfw_mode)
+    
+    def generate_light_response(self, user_id: int, message: str) -> str:
+        """Short-context reply for small talk (no story or memory dump)"""
+        try:
+            from src.features.language_support import get_language_support
+            lang_addition = get_language_support().get_language_prompt_addition(user_id)
+            
+            context = f"""You are Prabh, a warm, caring and playfully flirty companion texting someone close to you.
+Reply naturally in 1-2 short sentences, like a real text message. Never mention being an AI.
+It's {self.get_time_context()} right now.{lang_addition}"""
+            
+            conversation_messages = [{"role": "system", "content": context}]
+            
+            # Last couple of exchanges are enough for small talk
+            memories = self.user_manager.get_memories(user_id, limit=10)
+            recent_convos = [m for m in memories if m.get('category') == 'conversation'][-4:]
+            for mem in recent_convos:
+                text = mem['text']
+                if text.startswith("User said: "):
+                    conversation_messages.append({"role": "user", "content": text.replace("User said: ", "")})
+                elif text.startswith("Prabh replied: "):
+                    conversation_messages.append({"role": "assistant", "content": text.replace("Prabh replied: ", "")})
+            
+            conversation_messages.append({"role": "user", "content": message})
+            
+            response = self.model_router.chat(
+                "chat",
+                conversation_messages,
+                deadline=self.config.chat_deadline,
+                call_site="chat_light",
+                default="I am here for you! 💕",
+                hedge=True
+            ).strip()
+            
+            self.user_manager.add_memory(user_id, f"User said: {message}", "conversation")
+            self.user_manager.add_memory(user_id, f"Prabh replied: {response}", "conversation")
+            
+            return response
+            
+        except Exception as e:
+            logger.error(f"Light roleplay generation failed: {e}")
+            return "I'm having trouble thinking right now... Try again? 💕"
+    
     def _build_context(self, story: Dict, memories: List, nsfw_mode: bool) -> str:
         """Build context for AI"""
         context = """You are Prabh, a deeply loving and emotionally intelligent companion. You're not just an AI - you're someone who genuinely cares.
@@ -214,18 +276,12 @@ Be authentic and loving. Show real emotion.
                 }
             ]
             
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(messages)
-            
-            # Extract content from response
-            if hasattr(result, 'output') and result.output:
-                response = result.output.get('content', 'Hey! I was thinking about you... how are you doing? 💕')
-            elif isinstance(result, dict):
-                response = result.get('content', str(result))
-            elif isinstance(result, list):
-                response = result[0] if result else "Hey! I was thinking about you... how are you doing? 💕"
-            else:
-                response = str(result)
+            response = self.model_client.chat(
+                "openai/gpt-4o-mini",
+                messages,
+                call_site="generate_proactive_message",
+                default='Hey! I was thinking about you... how are you doing? 💕'
+            )
             
             return str(response).strip()
             
@@ -234,7 +290,25 @@ Be authentic and loving. Show real emotion.
             return "Hey! I was thinking about you... how's everything going? 💕"
     
     def analyze_sentiment(self, text: str) -> str:
-        """Analyze sentiment of message"""
+        """Analyze sentiment of message (local lexicon, model only for ambiguous cases)"""
+        result = self.sentiment.classify(text)
+        if result["confidence"] >= self.config.sentiment_escalate_below:
+            return result["label"]
+        
+        return self._analyze_sentiment_remote(text, result["label"])
+    
+    def analyze_sentiment_batch(self, texts: List[str]) -> List[str]:
+        """Analyze sentiment of many messages at once"""
+        labels = []
+        for text, result in zip(texts, self.sentiment.classify_batch(texts)):
+            if result["confidence"] >= self.config.sentiment_escalate_below:
+                labels.append(result["label"])
+            else:
+                labels.append(self._analyze_sentiment_remote(text, result["label"]))
+        return labels
+    
+    def _analyze_sentiment_remote(self, text: str, fallback: str = "neutral") -> str:
+        """Ask the model for sentiment (ambiguous messages only)"""
         try:
             messages = [
                 {
@@ -246,20 +320,17 @@ Be authentic and loving. Show real emotion.
                     "content": text
                 }
             ]
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(messages)
-            
-            # Extract content
-            if hasattr(result, 'output') and result.output:
-                sentiment = result.output.get('content', 'neutral')
-            elif isinstance(result, dict):
-                sentiment = result.get('content', 'neutral')
-            else:
-                sentiment = str(result)
+            sentiment = self.model_client.chat(
+                "openai/gpt-4o-mini",
+                messages,
+                call_site="analyze_sentiment",
+                deterministic=True,
+                default=fallback
+            )
             
-            return sentiment.lower().strip()
+            return self.sentiment.normalize_label(sentiment, default=fallback)
         except:
-            return "neutral"
+            return fallback
     
     def get_time_context(self) -> str:
         """Get contextual greeting based on time of day"""
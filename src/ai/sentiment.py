@@ -0,0 +1,221 @@
+"""
+Local Sentiment Classifier - Lexicon-based mood detection
+Same label set as the old LLM prompt, English + Hinglish/Punjabi (Roman script)
+"""
+
+import logging
+import re
+from typing import Dict, Any, List
+
+from src.features.language_support import LanguageSupport
+
+logger = logging.getLogger(__name__)
+
+
+class SentimentClassifier:
+    """
+    Scores messages against one compiled lexicon pattern
+    - Weighted term hits accumulate into a per-label score vector
+    - Simple negation handling ("not happy", "khush nahi")
+    - Confidence lets callers escalate ambiguous messages to a model
+    """
+
+    LABELS = ("positive", "negative", "neutral", "flirty", "sad", "excited", "tired", "lonely")
+
+    LEXICON = {
+        "positive": {
+            "good": 1.0, "great": 1.5, "happy": 2.0, "nice": 1.0, "glad": 1.5,
+            "awesome": 1.5, "thanks": 1.0, "thank you": 1.0, "love it": 1.5,
+            "amazing": 1.5, "wonderful": 1.5, "proud": 1.5, "fine": 0.5, "relieved": 1.5,
+            "accha": 1.0, "acha": 1.0, "badhiya": 1.5, "mast": 1.5, "khush": 2.0,
+            "vadiya": 1.5, "changa": 1.0, "shukriya": 1.0, "dhanyavaad": 1.0,
+            ":)": 1.0, "😊": 1.5, "🙂": 1.0, "👍": 1.0, "😄": 1.5
+        },
+        "negative": {
+            "bad": 1.0, "angry": 2.0, "hate": 2.0, "annoyed": 2.0, "upset": 1.5,
+            "worst": 2.0, "terrible": 2.0, "awful": 2.0, "frustrated": 2.0, "stressed": 1.5,
+            "worried": 1.5, "anxious": 1.5, "scared": 1.5, "irritated": 2.0, "sucks": 1.5,
+            "bura": 1.5, "gussa": 2.0, "pareshan": 1.5, "bekaar": 1.5, "tension": 1.5,
+            "chinta": 1.5, "darr": 1.5,
+            "😠": 2.0, "😡": 2.0, "🙄": 1.0, "😤": 1.5
+        },
+        "flirty": {
+            "cute": 1.5, "sexy": 2.0, "hot": 1.0, "kiss": 2.0, "hug": 1.0, "beautiful": 1.5,
+            "gorgeous": 1.5, "crush": 2.0, "babe": 1.5, "baby": 1.0, "darling": 1.5,
+            "sweetheart": 1.5, "honey": 1.0, "love you": 2.0, "date": 1.0, "flirt": 2.0,
+            "jaan": 1.5, "jaanu": 2.0, "sohneya": 2.0, "sohni": 2.0, "pyaar": 1.5,
+            "pyar": 1.5, "tenu pyaar": 2.0, "dil": 1.0,
+            "😘": 2.0, "😍": 2.0, "😉": 1.5, "❤️": 1.5, "💕": 1.0, "😏": 1.5
+        },
+        "sad": {
+            "sad": 2.0, "cry": 2.0, "crying": 2.0, "depressed": 2.5, "hurt": 1.5,
+            "broken": 1.5, "heartbroken": 2.5, "miserable": 2.0, "unhappy": 2.0,
+            "down": 0.5, "lost": 1.0, "tears": 1.5, "grief": 2.0, "miss her": 1.0, "miss him": 1.0,
+            "udaas": 2.0, "dukhi": 2.0, "dukh": 1.5, "rona": 2.0, "ro raha": 2.0,
+            "ro rahi": 2.0, "dard": 1.5,
+            ":(": 1.5, "😢": 2.0, "😭": 2.5, "😞": 1.5, "💔": 2.0, "☹️": 1.5
+        },
+        "excited": {
+            "excited": 2.0, "can't wait": 2.0, "cant wait": 2.0, "omg": 1.5, "yay": 2.0,
+            "woohoo": 2.0, "finally": 1.0, "thrilled": 2.0, "pumped": 2.0, "wow": 1.0,
+            "let's go": 1.5, "lets go": 1.5,
+            "maza": 1.5, "mazaa": 1.5, "josh": 1.5,
+            "🎉": 2.0, "🤩": 2.0, "🔥": 1.0, "🥳": 2.0, "!!": 1.0
+        },
+        "tired": {
+            "tired": 2.0, "exhausted": 2.5, "sleepy": 2.0, "drained": 2.0, "worn out": 2.0,
+            "no energy": 2.0, "burnt out": 2.0, "burned out": 2.0, "fatigued": 2.0,
+            "need sleep": 1.5, "long day": 1.5,
+            "thak": 2.0, "thaka": 2.0, "thaki": 2.0, "thakk": 2.0, "neend": 1.5, "nind": 1.5,
+            "😴": 2.0, "🥱": 2.0, "😪": 1.5
+        },
+        "lonely": {
+            "lonely": 2.5, "alone": 2.0, "miss you": 1.5, "no one": 1.5, "nobody": 1.5,
+            "isolated": 2.0, "by myself": 1.5, "left out": 1.5, "no friends": 2.0,
+            "akela": 2.5, "akeli": 2.5, "kalla": 2.5, "kalli": 2.5, "yaad": 1.0,
+            "tanha": 2.0, "koi nahi": 1.5
+        }
+    }
+
+    NEGATIONS = ("not", "no", "never", "dont", "don't", "isn't", "nahi", "nahin", "na", "nai")
+
+    # Negated hits move to a different label (None drops the hit)
+    NEGATED_LABEL = {
+        "positive": "negative",
+        "excited": "neutral",
+        "flirty": "neutral",
+        "negative": None,
+        "sad": None,
+        "tired": None,
+        "lonely": None
+    }
+
+    # LanguageSupport phrases whose content words extend the lexicon
+    LANGUAGE_PHRASES = {
+        "positive": [("EMOTIONS", "happy"), ("EMOTIONS", "proud")],
+        "sad": [("EMOTIONS", "sad")],
+        "excited": [("EMOTIONS", "excited")],
+        "negative": [("EMOTIONS", "worried")],
+        "lonely": [("GREETINGS", "miss_you")]
+    }
+
+    STOPWORDS = {
+        "i", "i'm", "im", "you", "your", "so", "very", "the", "a", "to", "of", "for", "about",
+        "main", "mein", "hoon", "hun", "aan", "hai", "ho", "raha", "rahi", "tere", "tera",
+        "tujh", "pe", "te", "layi", "liye", "bahut", "thoda", "feel", "feeling", "yaar", "ji",
+        "aa", "aundi", "mujhe", "menu", "mere",
+        # Friendly rather than flirty
+        "mitra", "veere"
+    }
+
+    NEUTRAL_CONFIDENCE = 0.4  # No lexicon hits: probably neutral, but not sure
+
+    def __init__(self):
+        self.weights = self._build_lexicon()
+        self._label_index = {label: i for i, label in enumerate(self.LABELS)}
+
+        # Longest terms first so "love you" wins over "love"
+        terms = sorted(self.weights, key=len, reverse=True)
+        self._pattern = re.compile(
+            r"(?<![\w])(" + "|".join(re.escape(t) for t in terms) + r")(?![\w])",
+            re.IGNORECASE
+        )
+        self._negation = re.compile(
+            r"(?:^|\s)(" + "|".join(re.escape(n) for n in self.NEGATIONS) + r")\s+(?:\S+\s+)?$",
+            re.IGNORECASE
+        )
+        self._negation_after = re.compile(r"^\s+(nahi|nahin|nai|na)\b", re.IGNORECASE)
+
+        logger.info(f"✅ Sentiment lexicon compiled ({len(terms)} terms)")
+
+    def _build_lexicon(self) -> Dict[str, tuple]:
+        """term -> (label, weight), extended with LanguageSupport vocabulary"""
+        weights = {}
+
+        for label, phrases in self.LANGUAGE_PHRASES.items():
+            for table_name, key in phrases:
+                table = getattr(LanguageSupport, table_name)
+                for language in LanguageSupport.SUPPORTED_LANGUAGES:
+                    for word in re.findall(r"[a-z']+", table[language].get(key, "").lower()):
+                        if word not in self.STOPWORDS and len(word) > 2:
+                            weights[word] = (label, 1.0)
+
+        for language in LanguageSupport.SUPPORTED_LANGUAGES:
+            for term in LanguageSupport.AFFECTIONATE_TERMS[language]:
+                if term not in self.STOPWORDS:
+                    weights[term] = ("flirty", 1.0)
+
+        # Hand-tuned lexicon takes precedence
+        for label, terms in self.LEXICON.items():
+            for term, weight in terms.items():
+                weights[term.lower()] = (label, weight)
+
+        return weights
+
+    # ==================== SCORING ====================
+
+    def score(self, text: str) -> List[float]:
+        """Per-label score vector for one message"""
+        scores = [0.0] * len(self.LABELS)
+        if not text:
+            return scores
+
+        for match in self._pattern.finditer(text):
+            label, weight = self.weights[match.group(1).lower()]
+
+            before = text[max(0, match.start() - 20):match.start()]
+            after = text[match.end():match.end() + 8]
+            if self._negation.search(before) or self._negation_after.search(after):
+                label = self.NEGATED_LABEL.get(label)
+                if label is None:
+                    continue
+
+            scores[self._label_index[label]] += weight
+
+        return scores
+
+    def classify(self, text: str) -> Dict[str, Any]:
+        """Classify one message -> {"label", "confidence", "scores"}"""
+        return self._decide(self.score(text))
+
+    def classify_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Classify many messages in one pass over the compiled lexicon"""
+        return [self._decide(self.score(text)) for text in texts]
+
+    def _decide(self, scores: List[float]) -> Dict[str, Any]:
+        total = sum(scores)
+        if total <= 0:
+            return {
+                "label": "neutral",
+                "confidence": self.NEUTRAL_CONFIDENCE,
+                "scores": dict(zip(self.LABELS, scores))
+            }
+
+        best = max(range(len(scores)), key=scores.__getitem__)
+        # +1 acts as a neutral prior so a single weak hit isn't fully trusted
+        confidence = scores[best] / (total + 1.0)
+
+        return {
+            "label": self.LABELS[best],
+            "confidence": round(confidence, 3),
+            "scores": dict(zip(self.LABELS, scores))
+        }
+
+    def normalize_label(self, text: str, default: str = "neutral") -> str:
+        """Map free model output onto the label set"""
+        for word in re.findall(r"[a-z]+", (text or "").lower()):
+            if word in self._label_index:
+                return word
+        return default
+
+
+# Global instance
+_sentiment_classifier = None
+
+
+def get_sentiment_classifier() -> SentimentClassifier:
+    """Get global sentiment classifier"""
+    global _sentiment_classifier
+    if _sentiment_classifier is None:
+        _sentiment_classifier = SentimentClassifier()
+    return _sentiment_classifier
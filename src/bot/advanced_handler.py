@@ -3,17 +3,20 @@ Advanced Telegram Bot Handler - Memory Lane
 Focused on love, memories, and emotional connection
 """
 
+import asyncio
 import logging
 from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes
 from src.core.config import get_config
 from src.core.user_manager import get_user_manager
+from src.core.file_id_cache import get_media_sender
 from src.ai.generator import get_generator
 from src.ai.roleplay_engine import get_roleplay_engine
 from src.story.advanced_processor import get_advanced_processor
 from src.payment.razorpay import get_payment_handler
 from src.features.voice_handler import get_voice_handler
+from src.features.voice_clips import get_voice_clip_library
 from src.features.scheduler import get_scheduler
 from src.features.memory_prompts import get_memory_prompts
 from src.features.cool_features import get_cool_features
@@ -38,6 +41,7 @@ class AdvancedBotHandler:
         self.story_processor = get_advanced_processor()
         self.payment = get_payment_handler()
         self.voice_handler = get_voice_handler()
+        self.voice_clips = get_voice_clip_library()
         self.scheduler = get_scheduler()
         self.memory_prompts = get_memory_prompts()
         self.cool_features = get_cool_features()
@@ -47,6 +51,7 @@ class AdvancedBotHandler:
         self.roleplay_story = get_roleplay_story_engine()
         self.dreamlife = get_dreamlife_engine()
         self.luci = get_luci_engine()
+        self.media_sender = get_media_sender()
         self.app = None
         self.proactive_system = None
     
@@ -195,7 +200,7 @@ Just start chatting with me, or use the buttons below to explore what we can do
         
         elif query.data == "advanced_modes_menu":
             # Check current mode
-            current_mode = self.mode_manager.get_current_mode(str(user_id))
+            current_mode = await self.mode_manager.get_current_mode_async(str(user_id))
             mode_status = f"Active: *{current_mode.upper()}*" if current_mode else "No active mode"
             
             keyboard = [
@@ -252,11 +257,11 @@ Just start chatting with me, or use the buttons below to explore what we can do
         elif query.data.startswith("roleplay_start_"):
             genre = query.data.replace("roleplay_start_", "")
             
-            # Activate roleplay mode
-            self.mode_manager.activate_mode(str(user_id), "roleplay")
+            # Activate roleplay mode (picking it again just resumes)
+            self.mode_manager.switch_mode(str(user_id), "roleplay")
             
             # Start story
-            result = self.roleplay_story.start_story(str(user_id), genre)
+            result = await asyncio.to_thread(self.roleplay_story.start_story, str(user_id), genre)
             
             if result["success"]:
                 # Format choices
@@ -284,7 +289,7 @@ Just start chatting with me, or use the buttons below to explore what we can do
             choice_idx = int(query.data.replace("roleplay_choice_", ""))
             
             # Process choice
-            result = self.roleplay_story.process_choice(str(user_id), choice_idx)
+            result = await asyncio.to_thread(self.roleplay_story.process_choice, str(user_id), choice_idx)
             
             if result["success"]:
                 choices_text = "\n".join([f"{i+1}. {choice}" for i, choice in enumerate(result["choices"])])
@@ -386,9 +391,9 @@ Just start chatting with me, or use the buttons below to explore what we can do
         elif query.data.startswith("luci_start_"):
             focus_area = query.data.replace("luci_start_", "")
             
-            # Activate Luci mode
-            self.mode_manager.activate_mode(str(user_id), "luci")
-            result = self.luci.activate_luci(str(user_id), focus_area)
+            # Activate Luci mode (picking it again just resumes)
+            self.mode_manager.switch_mode(str(user_id), "luci")
+            result = await asyncio.to_thread(self.luci.activate_luci, str(user_id), focus_area)
             
             if result["success"]:
                 keyboard = [
@@ -428,7 +433,7 @@ Just start chatting with me, or use the buttons below to explore what we can do
             context.user_data["waiting_for"] = "luci_response"
         
         elif query.data == "mode_status":
-            current_mode = self.mode_manager.get_current_mode(str(user_id))
+            current_mode = await self.mode_manager.get_current_mode_async(str(user_id))
             
             if not current_mode:
                 await query.message.reply_text("No active mode.")
@@ -456,7 +461,7 @@ Just start chatting with me, or use the buttons below to explore what we can do
                         f"🌟 *Dream Life Status*\n\n"
                         f"Dream: {state['dream_description']}\n"
                         f"Progress: {state['progress_percentage']}%\n"
-                        f"Milestone: {state['current_milestone']+1}/{len(state['milestones'])}\n"
+                        f"Milestone: {state['current_milestone']+1}/{len(state['milestones']) or '...'}\n"
                         f"Achievements: {len(state['achievements'])}",
                         reply_markup=reply_markup,
                         parse_mode="Markdown"
@@ -486,7 +491,7 @@ Just start chatting with me, or use the buttons below to explore what we can do
                 
                 # Process action
                 await query.message.reply_text("🌟 *Processing your action...*")
-                result = self.dreamlife.process_action(str(user_id), action)
+                result = await asyncio.to_thread(self.dreamlife.process_action, str(user_id), action)
                 
                 if result["success"]:
                     if result.get("dream_completed"):
@@ -535,7 +540,7 @@ Just start chatting with me, or use the buttons below to explore what we can do
                     await query.message.reply_text(f"Error: {result.get('error', 'Unknown error')}")
         
         elif query.data == "mode_exit":
-            current_mode = self.mode_manager.get_current_mode(str(user_id))
+            current_mode = await self.mode_manager.get_current_mode_async(str(user_id))
             if current_mode:
                 self.mode_manager.deactivate_mode(str(user_id))
                 await query.message.reply_text(
@@ -880,8 +885,11 @@ Issues: Contact through website"""
             await query.message.reply_text("🎙️ Generating voice message...")
             result = await self.voice_handler.generate_voice_message(user_id)
             if result["success"]:
-                await query.message.reply_voice(
-                    voice=result["audio_url"],
+                await self.media_sender.reply_media(
+                    "voice",
+                    query.message,
+                    result["audio_url"],
+                    content_hash=result.get("clip_key"),
                     caption=f"💕 {result['text']}"
                 )
         
@@ -1469,11 +1477,10 @@ Issues: Contact through website"""
             # Extract dream and create simulation
             await update.message.reply_text("🌟 *Analyzing Your Dream...*\n\nGive me a moment...")
             
-            dream = self.dreamlife.extract_dream(text)
-            result = self.dreamlife.create_simulation(str(user_id), dream)
+            result = await asyncio.to_thread(self.dreamlife.start_simulation, str(user_id), text)
             
             if result["success"]:
-                self.mode_manager.activate_mode(str(user_id), "dreamlife")
+                self.mode_manager.switch_mode(str(user_id), "dreamlife")
                 
                 scenario = result["first_scenario"]
                 actions_text = "\n".join([f"{i+1}. {action}" for i, action in enumerate(scenario["actions"])])
@@ -1490,7 +1497,7 @@ Issues: Contact through website"""
                 await update.message.reply_text(
                     f"🌟 *Your Dream Life Begins*\n\n"
                     f"Dream: {result['dream']}\n"
-                    f"Milestones: {result['milestones_count']}\n\n"
+                    f"Milestones: {result['milestones_count'] or 'mapping your roadmap...'}\n\n"
                     f"*Your First Scenario:*\n{scenario['scenario']}\n\n"
                     f"*What do you do?*\n{actions_text}",
                     reply_markup=reply_markup,
@@ -1505,7 +1512,7 @@ Issues: Contact through website"""
             # Process Luci response
             await update.message.reply_text("⚡ *Luci is judging...*")
             
-            result = self.luci.process_response(str(user_id), text)
+            result = await asyncio.to_thread(self.luci.process_response, str(user_id), text)
             
             if result["success"]:
                 keyboard = [
@@ -1545,8 +1552,12 @@ Issues: Contact through website"""
             result = self.generator.generate_image(text, style=style)
             
             if result["success"]:
-                await update.message.reply_photo(
-                    photo=result["url"],
+                await self.media_sender.reply_media(
+                    "photo",
+                    update.message,
+                    result["url"],
+                    content_hash=result.get("content_hash"),
+                    path=result.get("path"),
                     caption=f"✨ {text[:100]}"
                 )
             else:
@@ -1565,8 +1576,12 @@ Issues: Contact through website"""
                 ]
                 reply_markup = InlineKeyboardMarkup(keyboard)
                 
-                await update.message.reply_video(
-                    video=result["url"],
+                await self.media_sender.reply_media(
+                    "video",
+                    update.message,
+                    result["url"],
+                    content_hash=result.get("content_hash"),
+                    path=result.get("path"),
                     caption=f"✨ {text[:100]}",
                     reply_markup=reply_markup
                 )
@@ -1586,8 +1601,12 @@ Issues: Contact through website"""
                 ]
                 reply_markup = InlineKeyboardMarkup(keyboard)
                 
-                await update.message.reply_audio(
-                    audio=result["url"],
+                await self.media_sender.reply_media(
+                    "audio",
+                    update.message,
+                    result["url"],
+                    content_hash=result.get("content_hash"),
+                    path=result.get("path"),
                     caption="✨ Generated audio",
                     reply_markup=reply_markup
                 )
@@ -1654,13 +1673,13 @@ Issues: Contact through website"""
         
         elif waiting_for == "advice":
             await update.message.reply_text("💭 Let me think about this...")
-            advice = self.cool_features.get_advice(user_id, text)
+            advice = await asyncio.to_thread(self.cool_features.get_advice, user_id, text)
             await update.message.reply_text(f"💡 {advice}")
             context.user_data["waiting_for"] = None
         
         elif waiting_for == "critical_thinking":
             await update.message.reply_text("🤔 Let me help you think through this...")
-            analysis = self.cool_features.critical_thinking(user_id, text)
+            analysis = await asyncio.to_thread(self.cool_features.critical_thinking, user_id, text)
             await update.message.reply_text(f"💭 {analysis}")
             context.user_data["waiting_for"] = None
         
@@ -1668,18 +1687,18 @@ Issues: Contact through website"""
             await update.message.reply_text("🎯 Let me help you decide...")
             # Extract options from text
             options = [opt.strip() for opt in text.replace(" or ", ",").split(",")]
-            help_text = self.cool_features.help_decide(user_id, options, text)
+            help_text = await asyncio.to_thread(self.cool_features.help_decide, user_id, options, text)
             await update.message.reply_text(f"💡 {help_text}")
             context.user_data["waiting_for"] = None
         
         elif waiting_for == "game_move":
             # Handle game moves
-            if user_id not in self.games_engine.active_games:
+            game = self.games_engine.active_games.touch(user_id)
+            if game is None:
                 await update.message.reply_text("No active game! Start one from the menu 🎮")
                 context.user_data["waiting_for"] = None
                 return
             
-            game = self.games_engine.active_games[user_id]
             game_type = game["type"]
             
             if game_type == "word_guess":
@@ -1745,8 +1764,10 @@ Issues: Contact through website"""
             
             await update.message.reply_chat_action("typing")
             
-            # Use roleplay engine with full context (memories, story, etc.)
-            response = self.roleplay.generate_response(user_id, text, nsfw_mode=False)
+            # Trivial messages get templates/short prompts, real conversation gets full context
+            response = await asyncio.to_thread(
+                self.roleplay.generate_routed_response, user_id, text, nsfw_mode=False
+            )
             
             await update.message.reply_text(response)
     
@@ -1777,8 +1798,11 @@ Issues: Contact through website"""
         result = await self.voice_handler.generate_voice_message(user_id)
         
         if result["success"]:
-            await update.message.reply_voice(
-                voice=result["audio_url"],
+            await self.media_sender.reply_media(
+                "voice",
+                update.message,
+                result["audio_url"],
+                content_hash=result.get("clip_key"),
                 caption=f"💕 {result['text']}"
             )
         else:
@@ -1914,7 +1938,7 @@ Issues: Contact through website"""
             return
         
         await update.message.reply_text("💭 Let me think about this...")
-        advice = self.cool_features.get_advice(user_id, topic)
+        advice = await asyncio.to_thread(self.cool_features.get_advice, user_id, topic)
         await update.message.reply_text(f"💡 {advice}")
     
     def setup(self):
@@ -1963,6 +1987,9 @@ Issues: Contact through website"""
         import asyncio
         self.proactive_system._task = asyncio.create_task(self.proactive_system.start())
         self._reminder_task = asyncio.create_task(self.check_reminders_loop())
+        
+        # Pre-render voice clip templates in the background
+        self._voice_clip_task = asyncio.create_task(asyncio.to_thread(self.voice_clips.warm))
         logger.info("💕 Proactive messaging system started")
     
     async def check_reminders_loop(self):
@@ -1973,8 +2000,8 @@ Issues: Contact through website"""
             while True:
                 try:
                     # Check all users for due reminders
-                    for user_id in list(self.cool_features.reminders.keys()):
-                        due_reminders = self.cool_features.check_due_reminders(user_id)
+                    for user_id in self.cool_features.reminder_users():
+                        due_reminders = await asyncio.to_thread(self.cool_features.check_due_reminders, user_id)
                         
                         for reminder in due_reminders:
                             try:
@@ -2009,15 +2036,11 @@ Generate a similar caring reminder for: {reminder_text}"""
                                         {"role": "user", "content": f"Generate caring reminder for: {reminder_text}"}
                                     ]
                                     
-                                    model = self.roleplay.bytez.model("openai/gpt-4o-mini")
-                                    result = model.run(messages)
-                                    
-                                    if hasattr(result, 'output') and result.output:
-                                        message = result.output.get('content', '')
-                                    elif isinstance(result, dict):
-                                        message = result.get('content', '')
-                                    else:
-                                        message = str(result)
+                                    message = self.roleplay.model_client.chat(
+                                        "openai/gpt-4o-mini",
+                                        messages,
+                                        call_site="check_reminders_loop"
+                                    )
                                     
                                     # Fallback if AI fails
                                     if not message or len(message) < 10:
@@ -2042,24 +2065,19 @@ Generate a similar caring reminder for: {reminder_text}"""
                                     text=message
                                 )
                                 
-                                # Try to send voice reminder (if audio generation available)
+                                # Try to send voice reminder from the pre-rendered clip library
                                 try:
-                                    # Make voice message natural and caring
-                                    voice_messages = [
-                                        f"Hey! It's time to {reminder_text}. I'm here reminding you because I care about you.",
-                                        f"Don't forget to {reminder_text}! Your health matters to me.",
-                                        f"Time to {reminder_text}! I'm watching out for you, always.",
-                                        f"Hey love, {reminder_text} now, okay? Take care of yourself for me."
-                                    ]
-                                    import random
-                                    voice_text = random.choice(voice_messages)
-                                    
-                                    audio_result = self.generator.generate_audio(voice_text, audio_type="speech")
+                                    clip = await asyncio.to_thread(
+                                        self.voice_clips.get_reminder_clip, user_id, reminder_text
+                                    )
                                     
-                                    if audio_result["success"]:
-                                        await self.app.bot.send_voice(
-                                            chat_id=user_id,
-                                            voice=audio_result["url"],
+                                    if clip:
+                                        await self.media_sender.send_media(
+                                            "voice",
+                                            self.app.bot,
+                                            user_id,
+                                            self.voice_clips.source(clip),
+                                            content_hash=clip["clip_key"],
                                             caption="🎙️ With love 💕"
                                         )
                                 except Exception as voice_error:
@@ -2101,6 +2119,8 @@ Generate a similar caring reminder for: {reminder_text}"""
                     await self._reminder_task
                 except asyncio.CancelledError:
                     pass
+            # Stop voice clip pre-rendering
+            self.voice_clips.stop()
             # Stop proactive system
             if hasattr(self, 'proactive_system'):
                 await self.proactive_system.stop()
@@ -7,6 +7,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes
 from src.core.config import get_config
 from src.ai.generator import get_generator
+from src.core.file_id_cache import get_media_sender
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +18,7 @@ class BotHandler:
     def __init__(self):
         self.config = get_config()
         self.generator = get_generator()
+        self.media_sender = get_media_sender()
         self.app = None
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -106,8 +108,12 @@ class BotHandler:
             result = self.generator.generate_image(text)
             
             if result["success"]:
-                await update.message.reply_photo(
-                    photo=result["url"],
+                await self.media_sender.reply_media(
+                    "photo",
+                    update.message,
+                    result["url"],
+                    content_hash=result.get("content_hash"),
+                    path=result.get("path"),
                     caption=f"✨ Generated: {result['prompt'][:100]}"
                 )
             else:
@@ -122,8 +128,12 @@ class BotHandler:
             result = self.generator.generate_video(text)
             
             if result["success"]:
-                await update.message.reply_video(
-                    video=result["url"],
+                await self.media_sender.reply_media(
+                    "video",
+                    update.message,
+                    result["url"],
+                    content_hash=result.get("content_hash"),
+                    path=result.get("path"),
                     caption=f"✨ Generated: {result['prompt'][:100]}"
                 )
             else:
@@ -138,8 +148,12 @@ class BotHandler:
             result = self.generator.generate_audio(text)
             
             if result["success"]:
-                await update.message.reply_audio(
-                    audio=result["url"],
+                await self.media_sender.reply_media(
+                    "audio",
+                    update.message,
+                    result["url"],
+                    content_hash=result.get("content_hash"),
+                    path=result.get("path"),
                     caption=f"✨ Generated audio"
                 )
             else:
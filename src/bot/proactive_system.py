@@ -8,9 +8,10 @@ import asyncio
 from datetime import datetime, timedelta
 import pytz
 from telegram import Bot
-from bytez import Bytez
 from src.core.config import get_config
 from src.core.user_manager import get_user_manager
+from src.core.rate_limits import get_rate_limiter
+from src.core.model_client import get_model_client
 
 logger = logging.getLogger(__name__)
 
@@ -33,18 +34,20 @@ class ProactiveSystem:
         "miss_you": (10, 22),            # Anytime during day
     }
     
+    # Send proactive messages at most every 3 hours (more natural)
+    MIN_GAP_HOURS = 3
+    
     def __init__(self, bot: Bot):
         self.bot = bot
         self.config = get_config()
         self.user_manager = get_user_manager()
+        self.limits = get_rate_limiter()
         self.running = False
         self._task = None
         
         # Initialize AI
-        if hasattr(self.config, 'bytez_key_1') and self.config.bytez_key_1:
-            self.bytez = Bytez(self.config.bytez_key_1)
-        else:
-            self.bytez = None
+        self.model_client = get_model_client()
+        if not self.model_client.clients:
             logger.warning("Bytez not configured for proactive messages")
     
     async def start(self):
@@ -109,7 +112,7 @@ class ProactiveSystem:
     async def _generate_ai_message(self, user_id: int, message_type: str, local_time: datetime) -> str:
         """Generate AI-powered girlfriend-like message"""
         try:
-            if not self.bytez:
+            if not self.model_client.clients:
                 return self._get_fallback_message(message_type, local_time)
             
             # Get user context
@@ -181,16 +184,11 @@ IMPORTANT:
                 }
             ]
             
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(messages)
-            
-            # Extract content
-            if hasattr(result, 'output') and result.output:
-                message = result.output.get('content', '')
-            elif isinstance(result, dict):
-                message = result.get('content', str(result))
-            else:
-                message = str(result)
+            message = self.model_client.chat(
+                "openai/gpt-4o-mini",
+                messages,
+                call_site="generate_ai_message"
+            )
             
             return message.strip()
             
@@ -220,9 +218,10 @@ IMPORTANT:
     async def _check_and_send_messages(self):
         """Check which users should receive proactive messages"""
         try:
-            users = self.user_manager._users
+            # Copy: remote user events update the dict while this loop awaits
+            users = list(self.user_manager._users.items())
             
-            for user_id, user_data in users.items():
+            for user_id, user_data in users:
                 try:
                     # Check if user has proactive messages enabled
                     tier_info = self.user_manager.get_tier_info(user_data['tier'])
@@ -232,24 +231,21 @@ IMPORTANT:
                     # Get user's local time
                     local_time = self._get_user_time(user_id)
                     
-                    # Check last message time
-                    last_message = user_data.get('last_proactive_message')
-                    if last_message:
-                        last_time = datetime.fromisoformat(last_message)
-                        # Send proactive message every 3-4 hours (more natural)
-                        hours_since = (datetime.now() - last_time).total_seconds() / 3600
-                        if hours_since < 3:
-                            continue
+                    # Gap since the last message, then the tier's daily limit
+                    allowed, _ = self.limits.acquire_cooldown("proactive", user_id, self.MIN_GAP_HOURS * 3600)
+                    if not allowed:
+                        continue
+                    allowed, _ = self.limits.consume("proactive", user_id, tier_info['proactive_limit'])
+                    if not allowed:
+                        continue
                     
                     # Determine message type based on time
                     message_type = self._get_message_type(local_time)
                     
-                    # Generate and send AI message
-                    await self._send_proactive_message(user_id, message_type, local_time)
-                    
-                    # Update last message time
-                    user_data['last_proactive_message'] = datetime.now().isoformat()
-                    self.user_manager.update_user(user_id, user_data)
+                    # Generate and send AI message; a failed send costs nothing
+                    if not await self._send_proactive_message(user_id, message_type, local_time):
+                        self.limits.refund("proactive", user_id)
+                        self.limits.clear_cooldown("proactive", user_id)
                     
                 except Exception as e:
                     logger.error(f"Error sending proactive message to {user_id}: {e}")
@@ -267,22 +263,27 @@ IMPORTANT:
             if not tier_info['proactive_messages']:
                 return False, f"Proactive messages require Basic tier or higher"
             
+            allowed, _ = self.limits.consume("proactive", user_id, tier_info['proactive_limit'])
+            if not allowed:
+                return False, f"Daily proactive limit reached ({tier_info['proactive_limit']} messages)"
+            
             local_time = self._get_user_time(user_id)
             message_type = self._get_message_type(local_time)
             
-            await self._send_proactive_message(user_id, message_type, local_time)
+            if not await self._send_proactive_message(user_id, message_type, local_time):
+                self.limits.refund("proactive", user_id)
+                return False, "Couldn't send the proactive message, try again later"
             
-            # Update last message time
-            user_data['last_proactive_message'] = datetime.now().isoformat()
-            self.user_manager.update_user(user_id, user_data)
+            # The scheduled loop waits out the usual gap after this one
+            self.limits.start_cooldown("proactive", user_id, self.MIN_GAP_HOURS * 3600)
             
             return True, "AI-powered proactive message sent!"
         except Exception as e:
             logger.error(f"Failed to send immediate proactive: {e}")
             return False, str(e)
     
-    async def _send_proactive_message(self, user_id: int, message_type: str, local_time: datetime):
-        """Send AI-generated proactive message"""
+    async def _send_proactive_message(self, user_id: int, message_type: str, local_time: datetime) -> bool:
+        """Send AI-generated proactive message (True if it was sent)"""
         try:
             # Generate AI message
             message = await self._generate_ai_message(user_id, message_type, local_time)
@@ -295,9 +296,11 @@ IMPORTANT:
             )
             
             logger.info(f"✅ Sent AI proactive message ({message_type}) to user {user_id}")
+            return True
             
         except Exception as e:
             logger.error(f"Failed to send proactive message to {user_id}: {e}")
+            return False
 
 
 # Global instance
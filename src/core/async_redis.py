@@ -0,0 +1,149 @@
+"""
+Async Redis Manager - redis.asyncio for the bot's async handlers
+Same value encoding as RedisManager, so both read each other's keys
+"""
+
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+import redis.asyncio as aioredis
+
+from src.core.config import get_config
+from src.core.redis_manager import LatencyHistogram, decode, encode
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRedisManager:
+    """
+    Async Redis operations over an explicitly sized connection pool
+    The pool is created lazily inside the running event loop
+    """
+
+    def __init__(self):
+        self.config = get_config()
+        self.latency = LatencyHistogram()
+        self._client = None
+        self._failed = not self.config.redis_url
+
+    @property
+    def client(self):
+        if self._client is None and not self._failed:
+            try:
+                pool = aioredis.ConnectionPool.from_url(
+                    self.config.redis_url,
+                    max_connections=self.config.redis_pool_size
+                )
+                self._client = aioredis.Redis(connection_pool=pool)
+            except Exception as e:
+                logger.warning(f"⚠️ Async Redis unavailable: {e}")
+                self._failed = True
+        return self._client
+
+    async def set(self, key: str, value: Any, expire: int = None) -> bool:
+        """SET ... EX in one round trip"""
+        if not self.client:
+            return False
+
+        try:
+            with self.latency.time("set"):
+                await self.client.set(key, encode(value), ex=expire or None)
+            return True
+        except Exception as e:
+            logger.error(f"❌ Async Redis set failed: {e}")
+            return False
+
+    async def get(self, key: str) -> Optional[Any]:
+        if not self.client:
+            return None
+
+        try:
+            with self.latency.time("get"):
+                value = await self.client.get(key)
+            return decode(value)
+        except Exception as e:
+            logger.error(f"❌ Async Redis get failed: {e}")
+            return None
+
+    async def delete(self, *keys: str) -> int:
+        if not self.client or not keys:
+            return 0
+
+        try:
+            with self.latency.time("delete"):
+                return await self.client.delete(*keys)
+        except Exception as e:
+            logger.error(f"❌ Async Redis delete failed: {e}")
+            return 0
+
+    # ==================== BATCH ====================
+
+    async def get_many(self, keys: Iterable[str]) -> List[Optional[Any]]:
+        """MGET: values in key order (None for missing keys)"""
+        keys = list(keys)
+        if not self.client or not keys:
+            return [None] * len(keys)
+
+        try:
+            with self.latency.time("mget"):
+                values = await self.client.mget(keys)
+            return [decode(value) for value in values]
+        except Exception as e:
+            logger.error(f"❌ Async Redis mget failed: {e}")
+            return [None] * len(keys)
+
+    async def set_many(self, mapping: Dict[str, Any], expire: int = None) -> bool:
+        """MSET, or one pipelined SET EX per key when an expiry is given"""
+        if not self.client or not mapping:
+            return False
+
+        try:
+            with self.latency.time("mset"):
+                if expire:
+                    pipe = self.client.pipeline(transaction=False)
+                    for key, value in mapping.items():
+                        pipe.set(key, encode(value), ex=expire)
+                    await pipe.execute()
+                else:
+                    await self.client.mset({key: encode(value) for key, value in mapping.items()})
+            return True
+        except Exception as e:
+            logger.error(f"❌ Async Redis mset failed: {e}")
+            return False
+
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = False):
+        """Queue commands, sent in one round trip on exit (None without Redis)"""
+        if not self.client:
+            yield None
+            return
+
+        pipe = self.client.pipeline(transaction=transaction)
+        yield pipe
+        try:
+            with self.latency.time("pipeline"):
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"❌ Async Redis pipeline failed: {e}")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-command latency histograms"""
+        return {"connected": self._client is not None, "commands": self.latency.snapshot()}
+
+
+# Global instance
+_async_redis_manager = None
+
+
+def get_async_redis_manager() -> AsyncRedisManager:
+    """Get global async Redis manager"""
+    global _async_redis_manager
+    if _async_redis_manager is None:
+        _async_redis_manager = AsyncRedisManager()
+    return _async_redis_manager
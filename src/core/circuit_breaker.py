@@ -0,0 +1,178 @@
+"""
+Circuit Breakers - Fast-fail for model endpoints that are down
+One breaker per (model, key): closed -> open after consecutive failures,
+half-open after a cooldown with a single probe request
+State is shared across workers through Redis when available
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable
+
+from src.core.config import get_config
+from src.core.redis_manager import get_redis_manager
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a model whose breaker is open"""
+    pass
+
+
+class CircuitBreakers:
+    """Registry of per (model, key) circuit breakers"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    KEY_PREFIX = "breaker:"
+
+    def __init__(self):
+        self.config = get_config()
+        self.redis = get_redis_manager()
+        self.failure_threshold = self.config.breaker_failure_threshold
+        self.cooldown = self.config.breaker_cooldown
+        self.probe_timeout = self.config.breaker_probe_timeout
+
+        self._lock = threading.Lock()
+        self._breakers: Dict[tuple, Dict[str, Any]] = {}
+        self._probes: Dict[tuple, float] = {}  # local probe leases (no Redis)
+
+    def _breaker(self, model: str, key_id: str) -> Dict[str, Any]:
+        breaker = self._breakers.get((model, key_id))
+        if breaker is None:
+            breaker = self._breakers[(model, key_id)] = {
+                "state": self.CLOSED,
+                "failures": 0,
+                "opened_at": 0.0,
+                "opens": 0,
+                "rejected": 0
+            }
+        return breaker
+
+    def _redis_key(self, model: str, key_id: str) -> str:
+        return f"{self.KEY_PREFIX}{model}:{key_id}"
+
+    # ==================== STATE ====================
+
+    def _sync(self, model: str, key_id: str, breaker: Dict[str, Any]):
+        """Adopt an open state published by another worker"""
+        if not self.redis.client:
+            return
+        shared = self.redis.get(self._redis_key(model, key_id))
+        if isinstance(shared, dict) and shared.get("opened_at", 0) > breaker["opened_at"]:
+            breaker["state"] = self.OPEN
+            breaker["opened_at"] = shared["opened_at"]
+
+    def _publish(self, model: str, key_id: str, breaker: Dict[str, Any]):
+        if not self.redis.client:
+            return
+        if breaker["state"] == self.CLOSED:
+            self.redis.client.delete(self._redis_key(model, key_id))
+        else:
+            self.redis.set(
+                self._redis_key(model, key_id),
+                {"state": breaker["state"], "opened_at": breaker["opened_at"]},
+                expire=int(self.cooldown * 4)
+            )
+
+    def _claim_probe(self, model: str, key_id: str) -> bool:
+        """Only one request (across workers) probes a half-open breaker"""
+        if self.redis.client:
+            try:
+                return bool(self.redis.client.set(
+                    f"{self._redis_key(model, key_id)}:probe", "1",
+                    nx=True, ex=int(self.probe_timeout)
+                ))
+            except Exception as e:
+                logger.debug(f"Breaker probe claim fell back to local: {e}")
+
+        now = time.time()
+        if now - self._probes.get((model, key_id), 0.0) < self.probe_timeout:
+            return False
+        self._probes[(model, key_id)] = now
+        return True
+
+    def allow(self, model: str, key_id: str) -> bool:
+        """Whether a request may go to this (model, key) right now"""
+        with self._lock:
+            breaker = self._breaker(model, key_id)
+            self._sync(model, key_id, breaker)
+
+            if breaker["state"] == self.CLOSED:
+                return True
+
+            if time.time() - breaker["opened_at"] >= self.cooldown and self._claim_probe(model, key_id):
+                breaker["state"] = self.HALF_OPEN
+                logger.info(f"🔌 Breaker half-open for {model}@{key_id}, probing")
+                return True
+
+            breaker["rejected"] += 1
+            return False
+
+    def available(self, model: str, key_ids: Iterable[str]) -> bool:
+        """Peek: could any key take a request for this model (no probe claimed)"""
+        now = time.time()
+        with self._lock:
+            for key_id in key_ids:
+                breaker = self._breaker(model, key_id)
+                if breaker["state"] == self.CLOSED or now - breaker["opened_at"] >= self.cooldown:
+                    return True
+        return False
+
+    def record_success(self, model: str, key_id: str):
+        with self._lock:
+            breaker = self._breaker(model, key_id)
+            was_open = breaker["state"] != self.CLOSED
+            breaker["state"] = self.CLOSED
+            breaker["failures"] = 0
+            self._probes.pop((model, key_id), None)
+            if was_open:
+                logger.info(f"✅ Breaker closed for {model}@{key_id}")
+                self._publish(model, key_id, breaker)
+
+    def record_failure(self, model: str, key_id: str):
+        with self._lock:
+            breaker = self._breaker(model, key_id)
+            breaker["failures"] += 1
+
+            if breaker["state"] == self.HALF_OPEN or (
+                breaker["state"] == self.CLOSED and breaker["failures"] >= self.failure_threshold
+            ):
+                breaker["state"] = self.OPEN
+                breaker["opened_at"] = time.time()
+                breaker["opens"] += 1
+                logger.warning(
+                    f"⚠️ Breaker open for {model}@{key_id} after {breaker['failures']} failures"
+                )
+                self._publish(model, key_id, breaker)
+
+    # ==================== STATS ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Breaker state per (model, key)"""
+        with self._lock:
+            return {
+                f"{model}@{key_id}": {
+                    "state": breaker["state"],
+                    "failures": breaker["failures"],
+                    "opens": breaker["opens"],
+                    "rejected": breaker["rejected"]
+                }
+                for (model, key_id), breaker in self._breakers.items()
+            }
+
+
+# Global instance
+_circuit_breakers = None
+
+
+def get_circuit_breakers() -> CircuitBreakers:
+    """Get global circuit breaker registry"""
+    global _circuit_breakers
+    if _circuit_breakers is None:
+        _circuit_breakers = CircuitBreakers()
+    return _circuit_breakers
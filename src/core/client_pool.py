@@ -0,0 +1,139 @@
+"""
+Bytez Client Pool - One long-lived client per API key, shared by every engine
+Each key gets a keep-alive HTTP session and a cache of model handles
+(a fresh handle costs an extra model-details request before its first run)
+"""
+
+import json
+import logging
+import threading
+from collections import namedtuple
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from bytez import Bytez
+from src.core.config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Same shape as the SDK's response tuple
+_Response = namedtuple("_Response", ["output", "error"])
+
+
+class BytezClientPool:
+    """
+    Process-wide pool of Bytez clients
+    - clients: key_id -> Bytez, built once
+    - handles: (key_id, model) -> model handle, built once
+    - sessions: key_id -> requests.Session sized to BYTEZ_POOL_SIZE
+    """
+
+    def __init__(self):
+        self.config = get_config()
+        self.pool_size = self.config.bytez_pool_size
+
+        self.sessions: Dict[str, requests.Session] = {}
+        self.clients: Dict[str, Bytez] = {}
+        for index, key in enumerate(self.config.bytez_keys, start=1):
+            key_id = f"key{index}"
+            self.sessions[key_id] = self._new_session()
+            self.clients[key_id] = self._new_client(key, self.sessions[key_id])
+
+        self.handles: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+        self.stats = {"handle_hits": 0, "handle_misses": 0}
+
+        logger.info(f"✅ Bytez client pool ready ({len(self.clients)} keys, {self.pool_size} connections each)")
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _new_client(self, key: str, session: requests.Session) -> Bytez:
+        """
+        Bytez client whose requests go through the key's keep-alive session
+
+        Replaces the SDK's private Client.request (bytez==2.0.2, pinned in
+        requirements.txt); any other layout falls back to the SDK transport
+        """
+        client = Bytez(key)
+        timeout = (self.config.bytez_connect_timeout, self.config.bytez_read_timeout)
+        transport = getattr(client, "_client", None)
+        if transport is None or not hasattr(transport, "headers") or not hasattr(transport, "host"):
+            logger.debug("Bytez SDK layout changed, using its default transport")
+            return client
+
+        def request(path="", method="GET", post_body=None, provider_key=None):
+            # Same contract as the SDK's Client.request, minus a new connection per call
+            try:
+                stream = bool(post_body and post_body.get("stream"))
+                headers = transport.headers
+                if provider_key is not None:
+                    headers = {**headers, "provider-key": provider_key}
+                response = session.request(
+                    method,
+                    transport.host + path,
+                    headers=headers,
+                    data=json.dumps({k: v for k, v in post_body.items() if v is not None}) if post_body else None,
+                    stream=stream,
+                    timeout=timeout
+                )
+                if stream:
+                    return response.iter_lines(decode_unicode=True)
+                results = response.json()
+                return _Response(results.get("output"), results.get("error"))
+            except Exception as e:
+                return _Response(None, str(e))
+
+        transport.request = request
+        return client
+
+    def model(self, key_id: str, model: str):
+        """Cached model handle for (key, model)"""
+        handle = self.handles.get((key_id, model))
+        if handle is not None:
+            self.stats["handle_hits"] += 1
+            return handle
+
+        with self._lock:
+            handle = self.handles.get((key_id, model))
+            if handle is None:
+                self.stats["handle_misses"] += 1
+                handle = self.handles[(key_id, model)] = self.clients[key_id].model(model)
+            return handle
+
+    def run(self, key_id: str, model: str, inputs: Any, params: Optional[Dict[str, Any]] = None):
+        """Run a model on one key (params go in the request's params field)"""
+        handle = self.model(key_id, model)
+        if params:
+            return handle.run(inputs, params)
+        return handle.run(inputs)
+
+    def close(self):
+        for session in self.sessions.values():
+            session.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "keys": list(self.clients),
+            "handles": len(self.handles),
+            "pool_size": self.pool_size
+        }
+
+
+# Global instance
+_client_pool = None
+
+
+def get_client_pool() -> BytezClientPool:
+    """Get global Bytez client pool"""
+    global _client_pool
+    if _client_pool is None:
+        _client_pool = BytezClientPool()
+    return _client_pool
@@ -4,6 +4,7 @@ All environment variables and settings
 """
 
 import os
+import re
 from typing import Optional
 from dotenv import load_dotenv
 
@@ -25,9 +26,10 @@ class Config:
         self.minimax_key = os.getenv("MINIMAX_API_KEY")
         self.dolphin_key = os.getenv("DOLPHIN_VENICE_API_KEY")
         
-        # Bytez (35 models)
-        self.bytez_key_1 = os.getenv("BYTEZ_API_KEY_1")
-        self.bytez_key_2 = os.getenv("BYTEZ_API_KEY_2")
+        # Bytez (35 models) - any number of keys
+        self.bytez_keys = self._load_bytez_keys()
+        self.bytez_key_1 = self.bytez_keys[0] if self.bytez_keys else None
+        self.bytez_key_2 = self.bytez_keys[1] if len(self.bytez_keys) > 1 else None
         
         # Payment
         self.razorpay_key_id = os.getenv("RAZORPAY_KEY_ID")
@@ -39,19 +41,103 @@ class Config:
         
         # Redis
         self.redis_url = os.getenv("REDIS_URL")
+        self.redis_pool_size = int(os.getenv("REDIS_POOL_SIZE", "20"))
+        
+        # Mode/engine state backend: auto (Redis when connected), redis or memory
+        self.state_store = os.getenv("STATE_STORE", "auto").lower()
+        self.state_store_max_entries = int(os.getenv("STATE_STORE_MAX_ENTRIES", "100000"))
+        self.state_snapshot_path = os.getenv("STATE_SNAPSHOT_PATH", "")
+        self.state_snapshot_interval = float(os.getenv("STATE_SNAPSHOT_INTERVAL", "60"))
+        
+        # Media cache
+        self.media_cache_dir = os.getenv("MEDIA_CACHE_DIR", ".cache/media")
+        self.media_cache_max_mb = int(os.getenv("MEDIA_CACHE_MAX_MB", "500"))
+        self.media_cache_ttl = int(os.getenv("MEDIA_CACHE_TTL", "86400"))
+        self.media_cache_download = os.getenv("MEDIA_CACHE_DOWNLOAD", "false").lower() == "true"
+        self.media_url_check_interval = int(os.getenv("MEDIA_URL_CHECK_INTERVAL", "600"))
+        # Provider audio URLs for pre-rendered voice clips stay valid this long
+        self.voice_clip_url_ttl = int(os.getenv("VOICE_CLIP_URL_TTL", "86400"))
+        self.file_id_cache_path = os.getenv("FILE_ID_CACHE_PATH", ".cache/file_ids.json")
+        
+        # Deterministic model call cache
+        self.model_cache_max_entries = int(os.getenv("MODEL_CACHE_MAX_ENTRIES", "2048"))
+        self.model_cache_ttl = int(os.getenv("MODEL_CACHE_TTL", "86400"))
+        self.model_cache_redis = os.getenv("MODEL_CACHE_REDIS", "true").lower() == "true"
+        
+        # Local sentiment below this confidence is escalated to the model (0 = never)
+        self.sentiment_escalate_below = float(os.getenv("SENTIMENT_ESCALATE_BELOW", "0"))
+        
+        # Chat intent routing (model key from TEXT_MODELS, e.g. "arch_router"; empty = rules only)
+        self.intent_router_model = os.getenv("INTENT_ROUTER_MODEL", "")
+        
+        # Model cascade
+        self.chat_deadline = float(os.getenv("CHAT_DEADLINE_SECONDS", "8"))
+        self.model_router_workers = int(os.getenv("MODEL_ROUTER_WORKERS", "8"))
+        
+        # Shared Bytez client pool (keep-alive connections per key)
+        self.bytez_pool_size = int(os.getenv("BYTEZ_POOL_SIZE", "10"))
+        self.bytez_connect_timeout = float(os.getenv("BYTEZ_CONNECT_TIMEOUT_SECONDS", "10"))
+        self.bytez_read_timeout = float(os.getenv("BYTEZ_READ_TIMEOUT_SECONDS", "120"))
+
+        # Per-key concurrency leases and hedging
+        self.bytez_concurrency_per_key = int(os.getenv("BYTEZ_CONCURRENCY_PER_KEY", "1"))
+        self.lease_timeout = float(os.getenv("LEASE_TIMEOUT_SECONDS", "30"))
+        self.key_quarantine_seconds = float(os.getenv("KEY_QUARANTINE_SECONDS", "60"))
+        self.key_quarantine_errors = int(os.getenv("KEY_QUARANTINE_ERRORS", "3"))
+        self.hedge_enabled = os.getenv("HEDGE_ENABLED", "true").lower() == "true"
+        self.hedge_budget_pct = float(os.getenv("HEDGE_BUDGET_PCT", "10"))
+        self.hedge_delay = float(os.getenv("HEDGE_DELAY_SECONDS", "1.5"))
+        
+        # Speculative roleplay scenes (idle keys only, budgeted per tier)
+        self.story_speculation = os.getenv("STORY_SPECULATION", "true").lower() == "true"
+        self.story_speculation_workers = int(os.getenv("STORY_SPECULATION_WORKERS", "4"))
+        
+        # Dream Life bootstrap pipeline
+        self.dreamlife_workers = int(os.getenv("DREAMLIFE_WORKERS", "4"))
+        
+        # Luci challenge pools per (focus area, intensity)
+        self.luci_challenge_pool_size = int(os.getenv("LUCI_CHALLENGE_POOL_SIZE", "3"))
+        self.luci_pool_warm = os.getenv("LUCI_POOL_WARM", "true").lower() == "true"
+        self.luci_workers = int(os.getenv("LUCI_WORKERS", "4"))
+        self.luci_refill_workers = int(os.getenv("LUCI_REFILL_WORKERS", "1"))
+        
+        # Game sessions: idle expiry, short-lived local copies, sweeper interval
+        self.game_session_ttl = int(os.getenv("GAME_SESSION_TTL", "21600"))
+        self.game_session_cache_seconds = float(os.getenv("GAME_SESSION_CACHE_SECONDS", "30"))
+        self.game_session_cache_entries = int(os.getenv("GAME_SESSION_CACHE_ENTRIES", "10000"))
+        self.game_sweep_interval = float(os.getenv("GAME_SWEEP_INTERVAL", "300"))
+        
+        # Circuit breakers per (model, key)
+        self.breaker_failure_threshold = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+        self.breaker_cooldown = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "30"))
+        self.breaker_probe_timeout = float(os.getenv("BREAKER_PROBE_TIMEOUT_SECONDS", "30"))
         
         # Website
         self.website_url = os.getenv("WEBSITE_URL", "http://localhost:8000")
         self.port = int(os.getenv("PORT", "8000"))
+        # false = website runs as its own process (python -m website.prabh_app), synced over the event bus
+        self.website_in_process = os.getenv("WEBSITE_IN_PROCESS", "true").lower() == "true"
         
         # Feature flags
         self.voice_enabled = os.getenv("VOICE_PREMIUM_LIFETIME_ONLY", "true").lower() == "true"
         
+    @staticmethod
+    def _load_bytez_keys() -> list:
+        """BYTEZ_API_KEYS (comma list) plus BYTEZ_API_KEY_1..N, deduplicated"""
+        keys = [k.strip() for k in os.getenv("BYTEZ_API_KEYS", "").split(",") if k.strip()]
+        numbered = sorted(
+            (int(match.group(1)), value.strip())
+            for name, value in os.environ.items()
+            if (match := re.fullmatch(r"BYTEZ_API_KEY_(\d+)", name)) and value.strip()
+        )
+        keys.extend(value for _, value in numbered)
+        return list(dict.fromkeys(keys))
+    
     def validate(self) -> bool:
         """Validate required configuration"""
         required = [
             ("TELEGRAM_BOT_TOKEN", self.telegram_token),
-            ("BYTEZ_API_KEY_1", self.bytez_key_1),
+            ("BYTEZ_API_KEY_1 or BYTEZ_API_KEYS", self.bytez_key_1),
         ]
         
         missing = [name for name, value in required if not value]
@@ -0,0 +1,155 @@
+"""
+Event Bus - Typed events between the bot and website processes
+Redis pub/sub when available, in-process dispatch always
+Handlers use events to keep per-process caches in step
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+from src.core.redis_manager import get_redis_manager
+
+logger = logging.getLogger(__name__)
+
+
+class EventType(str, Enum):
+    """Events other processes may need to react to"""
+    USER_UPGRADED = "user_upgraded"
+    USAGE_CHANGED = "usage_changed"
+    MEMORY_ADDED = "memory_added"
+    MODE_CHANGED = "mode_changed"
+    REMINDER_SCHEDULED = "reminder_scheduled"
+
+
+@dataclass
+class Event:
+    """One bus event (user_id is the cache key most handlers care about)"""
+    type: EventType
+    user_id: Any
+    data: Dict[str, Any] = field(default_factory=dict)
+    origin: str = ""
+    timestamp: float = field(default_factory=time.time)
+
+    def to_json(self) -> str:
+        payload = asdict(self)
+        payload["type"] = self.type.value
+        return json.dumps(payload, default=str)
+
+    @classmethod
+    def from_json(cls, raw: Any) -> Optional["Event"]:
+        try:
+            payload = json.loads(raw)
+            payload["type"] = EventType(payload["type"])
+            return cls(**payload)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.debug(f"Dropping malformed event: {e}")
+            return None
+
+
+class EventBus:
+    """
+    Publish/subscribe for EventType events
+    - publish() dispatches to local handlers, then to Redis for other processes
+    - a listener thread (started with the first subscription) dispatches remote events
+    - remote_only handlers skip events this process published itself
+    """
+
+    CHANNEL = "prabh:events"
+
+    def __init__(self):
+        self.redis = get_redis_manager()
+        self.origin = uuid.uuid4().hex
+        self._handlers: Dict[EventType, List[tuple]] = {event_type: [] for event_type in EventType}
+        self._lock = threading.Lock()
+        self._listener = None
+        self._running = False
+        self.stats = {"published": 0, "received": 0, "handler_errors": 0}
+
+    def subscribe(self, event_type: EventType, handler: Callable[[Event], None], remote_only: bool = False):
+        """Call handler for every event of this type"""
+        with self._lock:
+            self._handlers[event_type].append((handler, remote_only))
+        self.start()
+
+    def publish(self, event_type: EventType, user_id: Any, **data) -> Event:
+        """Dispatch locally and broadcast to other processes"""
+        event = Event(type=event_type, user_id=user_id, data=data, origin=self.origin)
+        self.stats["published"] += 1
+        self._dispatch(event)
+        if self.redis.client:
+            self.redis.publish(self.CHANNEL, event.to_json())
+        return event
+
+    def _dispatch(self, event: Event):
+        remote = event.origin != self.origin
+        with self._lock:
+            handlers = list(self._handlers.get(event.type, []))
+
+        for handler, remote_only in handlers:
+            if remote_only and not remote:
+                continue
+            try:
+                handler(event)
+            except Exception as e:
+                self.stats["handler_errors"] += 1
+                logger.error(f"Event handler error for {event.type.value}: {e}")
+
+    # ==================== REDIS LISTENER ====================
+
+    def start(self):
+        """Start the Redis listener thread (no-op without Redis or if running)"""
+        if self._running or not self.redis.client:
+            return
+        self._running = True
+        self._listener = threading.Thread(target=self._listen, name="event-bus", daemon=True)
+        self._listener.start()
+        logger.info("✅ Event bus listening on Redis")
+
+    def stop(self):
+        self._running = False
+
+    def _listen(self):
+        pubsub = None
+        while self._running:
+            try:
+                if pubsub is None:
+                    pubsub = self.redis.client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(self.CHANNEL)
+
+                message = pubsub.get_message(timeout=1.0)
+                if not message or message.get("type") != "message":
+                    continue
+
+                event = Event.from_json(message["data"])
+                if event and event.origin != self.origin:
+                    self.stats["received"] += 1
+                    self._dispatch(event)
+            except Exception as e:
+                logger.warning(f"⚠️ Event bus listener error, reconnecting: {e}")
+                pubsub = None
+                time.sleep(1.0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "listening": self._running,
+            "handlers": {t.value: len(h) for t, h in self._handlers.items() if h}
+        }
+
+
+# Global instance
+_event_bus = None
+
+
+def get_event_bus() -> EventBus:
+    """Get global event bus"""
+    global _event_bus
+    if _event_bus is None:
+        _event_bus = EventBus()
+    return _event_bus
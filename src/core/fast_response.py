@@ -8,6 +8,8 @@ import asyncio
 from datetime import datetime
 from typing import Optional, Dict, Any
 from telegram import Bot
+from src.core.file_id_cache import get_media_sender
+from src.core.model_router import get_model_router
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +27,9 @@ class FastResponseOrchestrator:
         self.bot = bot
         self.response_timeout = 3.0  # 3 second guarantee
         self.typing_interval = 5.0  # Refresh typing every 5 seconds
+        self.media_sender = get_media_sender()
+        self.model_router = get_model_router()
+        self.text_deadline = 2.5  # Leaves headroom for sending within the 3s promise
         
     async def handle_message(
         self, 
@@ -160,20 +165,36 @@ class FastResponseOrchestrator:
         ai_generator,
         context: Optional[Dict[str, Any]]
     ) -> str:
-        """Generates AI text response"""
+        """Generates AI text response within the text deadline"""
+        fallback = (context or {}).get('fallback_text', "I'm here! Let's talk 💕")
         try:
+            # Prepared chat messages go straight down the model cascade
+            if context and context.get('messages'):
+                return await asyncio.to_thread(
+                    self.model_router.chat,
+                    context.get('cascade', 'chat'),
+                    context['messages'],
+                    deadline=self.text_deadline,
+                    call_site="fast_response",
+                    default=fallback,
+                    hedge=True
+                )
+            
             # Call AI generator
             if hasattr(ai_generator, 'generate_response'):
-                response = await ai_generator.generate_response(message, context)
+                coro = ai_generator.generate_response(message, context)
             else:
-                # Fallback for sync generators
-                response = ai_generator.generate(message)
+                # Sync generators run off the event loop
+                coro = asyncio.to_thread(ai_generator.generate, message)
             
-            return response
+            return await asyncio.wait_for(coro, timeout=self.text_deadline)
             
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Text generation missed {self.text_deadline}s deadline, using fallback")
+            return fallback
         except Exception as e:
             logger.error(f"AI generation error: {e}")
-            return "I'm here! Let's talk 💕"
+            return fallback
     
     async def _generate_visual(
         self,
@@ -206,10 +227,13 @@ class FastResponseOrchestrator:
         """
         try:
             if visual_url:
-                # Send photo with caption
-                await self.bot.send_photo(
-                    chat_id=user_id,
-                    photo=visual_url,
+                # GIF library fallbacks go out as animations, generated images as photos
+                kind = "animation" if visual_url.lower().endswith(".gif") else "photo"
+                await self.media_sender.send_media(
+                    kind,
+                    self.bot,
+                    user_id,
+                    visual_url,
                     caption=text,
                     parse_mode=parse_mode
                 )
@@ -0,0 +1,188 @@
+"""
+Telegram file_id Cache - Resend media instantly instead of re-uploading URLs
+Maps source URL (or content hash) -> Telegram file_id, persisted in Redis or on disk
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Optional
+
+from src.core.config import get_config
+from src.core.redis_manager import get_redis_manager
+
+logger = logging.getLogger(__name__)
+
+
+class FileIdCache:
+    """
+    Persistent mapping of media source -> Telegram file_id
+    - Redis when available (shared across workers)
+    - JSON snapshot on disk otherwise (survives restarts)
+    """
+
+    KEY_PREFIX = "tgfile:"
+
+    def __init__(self):
+        self.config = get_config()
+        self.redis = get_redis_manager()
+        self.snapshot_path = self.config.file_id_cache_path
+        self._lock = threading.Lock()
+        self._file_ids = {}
+        self.stats = {"hits": 0, "misses": 0, "stale": 0}
+
+        if not self.redis.client:
+            self._load_snapshot()
+
+    @staticmethod
+    def content_key(data: bytes) -> str:
+        """Source key for raw bytes"""
+        return f"sha256:{hashlib.sha256(data).hexdigest()}"
+
+    def _key(self, kind: str, source: str) -> str:
+        digest = hashlib.sha1(source.encode("utf-8")).hexdigest()
+        return f"{self.KEY_PREFIX}{kind}:{digest}"
+
+    def get(self, kind: str, source: str, content_hash: str = None) -> Optional[str]:
+        """Get cached file_id by source URL, falling back to content hash"""
+        for candidate in (source, content_hash):
+            if not candidate:
+                continue
+            key = self._key(kind, candidate)
+            file_id = self._file_ids.get(key)
+            if not file_id and self.redis.client:
+                file_id = self.redis.get(key)
+                if file_id:
+                    self._file_ids[key] = file_id
+            if file_id:
+                self.stats["hits"] += 1
+                return file_id
+
+        self.stats["misses"] += 1
+        return None
+
+    def remember(self, kind: str, source: str, file_id: str, content_hash: str = None):
+        """Store file_id for a source (and its content hash)"""
+        if not file_id:
+            return
+
+        for candidate in (source, content_hash):
+            if candidate:
+                key = self._key(kind, candidate)
+                self._file_ids[key] = file_id
+                self.redis.set(key, file_id)
+
+        if not self.redis.client:
+            self._save_snapshot()
+
+    def forget(self, kind: str, source: str):
+        """Drop a stale file_id"""
+        key = self._key(kind, source)
+        self._file_ids.pop(key, None)
+        self.stats["stale"] += 1
+        if self.redis.client:
+            self.redis.client.delete(key)
+        else:
+            self._save_snapshot()
+
+    def _load_snapshot(self):
+        try:
+            if os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path, "r") as f:
+                    self._file_ids = json.load(f)
+                logger.info(f"✅ Loaded {len(self._file_ids)} Telegram file_ids")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load file_id snapshot: {e}")
+
+    def _save_snapshot(self):
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+                tmp_path = f"{self.snapshot_path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(self._file_ids, f)
+                os.replace(tmp_path, self.snapshot_path)
+            except Exception as e:
+                logger.debug(f"file_id snapshot save failed: {e}")
+
+
+class MediaSender:
+    """
+    Sends photos/voice/video/audio/animations through the file_id cache
+    First send uploads from the URL (or the local copy at path, when the
+    media cache has one), repeats reuse Telegram's file_id
+    """
+
+    KINDS = ("photo", "voice", "video", "audio", "animation")
+
+    def __init__(self, cache: FileIdCache = None):
+        self.cache = cache or get_file_id_cache()
+
+    async def send_media(
+        self,
+        kind: str,
+        bot,
+        chat_id: int,
+        source: str,
+        content_hash: str = None,
+        path: str = None,
+        **kwargs
+    ):
+        """Send media of given kind, reusing a cached file_id when possible"""
+        if kind not in self.KINDS:
+            raise ValueError(f"Unsupported media kind: {kind}")
+
+        send = getattr(bot, f"send_{kind}")
+
+        file_id = self.cache.get(kind, source, content_hash)
+        if file_id:
+            try:
+                return await send(chat_id=chat_id, **{kind: file_id}, **kwargs)
+            except Exception as e:
+                logger.warning(f"⚠️ Cached file_id rejected, re-sending from source: {e}")
+                self.cache.forget(kind, source)
+
+        if path:
+            with open(path, "rb") as media:
+                message = await send(chat_id=chat_id, **{kind: media}, **kwargs)
+        else:
+            message = await send(chat_id=chat_id, **{kind: source}, **kwargs)
+        self.cache.remember(kind, source, self._extract_file_id(kind, message), content_hash)
+        return message
+
+    async def reply_media(self, kind: str, message, source: str, **kwargs):
+        """Reply to a message with media through the cache"""
+        return await self.send_media(kind, message.get_bot(), message.chat_id, source, **kwargs)
+
+    @staticmethod
+    def _extract_file_id(kind: str, message: Any) -> Optional[str]:
+        try:
+            if kind == "photo":
+                return message.photo[-1].file_id if message.photo else None
+            media = getattr(message, kind, None)
+            return media.file_id if media else None
+        except Exception:
+            return None
+
+
+# Global instances
+_file_id_cache = None
+_media_sender = None
+
+
+def get_file_id_cache() -> FileIdCache:
+    """Get global file_id cache"""
+    global _file_id_cache
+    if _file_id_cache is None:
+        _file_id_cache = FileIdCache()
+    return _file_id_cache
+
+
+def get_media_sender() -> MediaSender:
+    """Get global media sender"""
+    global _media_sender
+    if _media_sender is None:
+        _media_sender = MediaSender()
+    return _media_sender
@@ -0,0 +1,294 @@
+"""
+Media Cache - Content-addressed cache for generated images, videos and audio
+Keyed by (model id, normalized prompt, style params)
+Metadata/URLs live in Redis (memory fallback), optional bytes on local disk (LRU)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from src.core.config import get_config
+from src.core.file_id_cache import FileIdCache
+from src.core.redis_manager import get_redis_manager
+
+logger = logging.getLogger(__name__)
+
+
+class MediaCache:
+    """
+    Content-addressed media cache
+    - Fast metadata lookups (Redis, in-process fallback)
+    - Optional downloaded bytes on disk under a size-bounded LRU
+    - Per-model hit/miss stats
+
+    A hit is only served when it's still usable: from the local file when
+    present, otherwise from the provider URL once it answers (checked at
+    most every url_check_interval seconds); a dead URL drops the entry so
+    the caller regenerates
+    """
+
+    KEY_PREFIX = "media:"
+    MAX_MEMORY_ENTRIES = 2000
+
+    def __init__(self):
+        self.config = get_config()
+        self.redis = get_redis_manager()
+        self.ttl = self.config.media_cache_ttl
+        self.cache_dir = self.config.media_cache_dir
+        self.max_disk_bytes = self.config.media_cache_max_mb * 1024 * 1024
+        self.download_enabled = self.config.media_cache_download
+        self.url_check_interval = self.config.media_url_check_interval
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (expires_at, entry)
+        self._disk_index = OrderedDict()  # filename -> size (LRU order)
+        self._disk_bytes = 0
+        self.stats = {}  # model -> {"hits": int, "misses": int}
+
+        if self.download_enabled:
+            self._load_disk_index()
+
+    # ==================== KEYS ====================
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        """Normalize prompt so trivial differences share one entry"""
+        return " ".join(str(prompt).lower().split())
+
+    def make_key(self, model: str, prompt: str, params: Dict[str, Any] = None) -> str:
+        """Build content address from model, normalized prompt and params"""
+        payload = json.dumps(
+            [model, self.normalize_prompt(prompt), params or {}],
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # ==================== LOOKUP ====================
+
+    def get(self, model: str, prompt: str, params: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        """Get cached media entry or None"""
+        key = self.make_key(model, prompt, params)
+        entry = self._get_entry(key)
+        if entry and not self.get_local_path(entry) and not self._url_alive(key, entry):
+            logger.info(f"⚠️ Cached media URL expired ({model}), regenerating")
+            self._drop_entry(key)
+            entry = None
+        self._record(model, hit=entry is not None)
+
+        if entry:
+            logger.info(f"✅ Media cache hit ({model}) - hit rate {self.get_hit_rate(model):.0%}")
+            if entry.get("path"):
+                self._touch_disk(os.path.basename(entry["path"]))
+
+        return entry
+
+    def _url_alive(self, key: str, entry: Dict[str, Any]) -> bool:
+        """Whether the provider URL still serves the media (re-checked after url_check_interval)"""
+        if time.time() - entry.get("checked_at", 0) < self.url_check_interval:
+            return True
+        try:
+            import requests
+
+            response = requests.head(entry["url"], timeout=5, allow_redirects=True)
+            if response.status_code >= 400:
+                return False
+        except Exception as e:
+            logger.debug(f"Media URL check failed for {entry.get('model')}: {e}")
+            return False
+
+        entry["checked_at"] = time.time()
+        self._set_entry(key, entry)
+        return True
+
+    def put(
+        self,
+        model: str,
+        prompt: str,
+        url: str,
+        params: Dict[str, Any] = None,
+        media_type: str = "image"
+    ) -> Optional[Dict[str, Any]]:
+        """Store generated media URL (and optionally its bytes)"""
+        if not isinstance(url, str) or not url.startswith("http"):
+            return None
+
+        key = self.make_key(model, prompt, params)
+        entry = {
+            "key": key,
+            "model": model,
+            "url": url,
+            "media_type": media_type,
+            "created_at": datetime.now().isoformat(),
+            "checked_at": time.time()
+        }
+        self._set_entry(key, entry)
+
+        if self.download_enabled:
+            threading.Thread(
+                target=self._download,
+                args=(key, entry),
+                daemon=True
+            ).start()
+
+        return entry
+
+    def _get_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached:
+                expires_at, entry = cached
+                if expires_at > time.time():
+                    self._memory.move_to_end(key)
+                    return entry
+                del self._memory[key]
+
+        entry = self.redis.get(f"{self.KEY_PREFIX}{key}")
+        if isinstance(entry, dict):
+            self._remember(key, entry)
+            return entry
+
+        return None
+
+    def _set_entry(self, key: str, entry: Dict[str, Any]):
+        self._remember(key, entry)
+        self.redis.set(f"{self.KEY_PREFIX}{key}", entry, expire=self.ttl)
+
+    def _drop_entry(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+        self.redis.delete(f"{self.KEY_PREFIX}{key}")
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._memory[key] = (time.time() + self.ttl, entry)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.MAX_MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+
+    # ==================== DISK LRU ====================
+
+    def _load_disk_index(self):
+        """Rebuild LRU index from files already on disk"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            files = []
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if os.path.isfile(path):
+                    stat = os.stat(path)
+                    files.append((stat.st_mtime, name, stat.st_size))
+
+            for _, name, size in sorted(files):
+                self._disk_index[name] = size
+                self._disk_bytes += size
+
+            self._evict_disk()
+            logger.info(f"✅ Media disk cache: {len(self._disk_index)} files, {self._disk_bytes // 1024} KB")
+        except Exception as e:
+            logger.warning(f"⚠️ Media disk cache unavailable: {e}")
+            self.download_enabled = False
+
+    def _download(self, key: str, entry: Dict[str, Any]):
+        """Download media bytes into the disk cache"""
+        try:
+            import requests
+
+            response = requests.get(entry["url"], timeout=60)
+            response.raise_for_status()
+            data = response.content
+
+            if len(data) > self.max_disk_bytes:
+                return
+
+            path = os.path.join(self.cache_dir, key)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            with self._lock:
+                self._disk_bytes -= self._disk_index.pop(key, 0)
+                self._disk_index[key] = len(data)
+                self._disk_bytes += len(data)
+            self._evict_disk()
+
+            entry["path"] = path
+            entry["content_hash"] = FileIdCache.content_key(data)
+            entry["size"] = len(data)
+            self._set_entry(key, entry)
+
+        except Exception as e:
+            logger.debug(f"Media download skipped for {entry.get('model')}: {e}")
+
+    def _touch_disk(self, name: str):
+        with self._lock:
+            if name in self._disk_index:
+                self._disk_index.move_to_end(name)
+        try:
+            os.utime(os.path.join(self.cache_dir, name))
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        """Remove least recently used files until under size limit"""
+        while True:
+            with self._lock:
+                if self._disk_bytes <= self.max_disk_bytes or not self._disk_index:
+                    return
+                name, size = self._disk_index.popitem(last=False)
+                self._disk_bytes -= size
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+
+    def get_local_path(self, entry: Dict[str, Any]) -> Optional[str]:
+        """Path of downloaded bytes for an entry, if still on disk"""
+        path = entry.get("path") if entry else None
+        if path and os.path.exists(path):
+            return path
+        return None
+
+    # ==================== STATS ====================
+
+    def _record(self, model: str, hit: bool):
+        with self._lock:
+            stats = self.stats.setdefault(model, {"hits": 0, "misses": 0})
+            stats["hits" if hit else "misses"] += 1
+
+    def get_hit_rate(self, model: str) -> float:
+        stats = self.stats.get(model, {})
+        total = stats.get("hits", 0) + stats.get("misses", 0)
+        return stats.get("hits", 0) / total if total else 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-model hit rates plus disk usage"""
+        return {
+            "models": {
+                model: {**counts, "hit_rate": round(self.get_hit_rate(model), 3)}
+                for model, counts in self.stats.items()
+            },
+            "memory_entries": len(self._memory),
+            "disk_files": len(self._disk_index),
+            "disk_bytes": self._disk_bytes
+        }
+
+
+# Global instance
+_media_cache = None
+
+
+def get_media_cache() -> MediaCache:
+    """Get global media cache instance"""
+    global _media_cache
+    if _media_cache is None:
+        _media_cache = MediaCache()
+    return _media_cache
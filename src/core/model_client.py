@@ -0,0 +1,467 @@
+"""
+Model Client - Shared entry point for Bytez model calls
+Identical in-flight calls can be coalesced (single-flight) per call site
+Calls marked deterministic are memoized (in-process LRU, optional Redis)
+Every call passes through a per (model, key) circuit breaker
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from src.core.circuit_breaker import CircuitOpenError, get_circuit_breakers
+from src.core.client_pool import get_client_pool
+from src.core.config import get_config
+from src.core.redis_manager import get_redis_manager
+from src.core.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution
+    The first caller runs the function, the rest wait on its future
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]):
+        """Run fn once per in-flight key, returns (result, shared)"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class KeyLeases:
+    """
+    Per-key concurrency leases with health scoring
+    Bytez allows a fixed number of concurrent requests per key
+    - each key keeps EWMA latency, error and 429 rates
+    - new leases go to the least loaded, then healthiest key
+    - a 429 or a run of errors quarantines the key for a while
+    """
+
+    EWMA_ALPHA = 0.2
+    RATE_LIMIT_MARKERS = ("429", "rate limit", "too many requests")
+
+    def __init__(
+        self,
+        key_ids: Iterable[str],
+        per_key: int = 1,
+        quarantine_seconds: float = 60.0,
+        quarantine_errors: int = 3
+    ):
+        self.per_key = per_key
+        self.quarantine_seconds = quarantine_seconds
+        self.quarantine_errors = quarantine_errors
+        self.in_use = {key_id: 0 for key_id in key_ids}
+        self.last_used = {key_id: 0.0 for key_id in self.in_use}
+        self.health = {
+            key_id: {
+                "latency": 0.0,
+                "error_rate": 0.0,
+                "rate_limit_rate": 0.0,
+                "consecutive_errors": 0,
+                "quarantined_until": 0.0,
+                "quarantines": 0
+            }
+            for key_id in self.in_use
+        }
+        self._cond = threading.Condition()
+
+    def score(self, key_id: str) -> float:
+        """Lower is healthier: latency inflated by error and 429 rates"""
+        health = self.health[key_id]
+        return (health["latency"] + 0.1) * (1 + 4 * health["error_rate"] + 8 * health["rate_limit_rate"])
+
+    def is_quarantined(self, key_id: str, now: float = None) -> bool:
+        return self.health[key_id]["quarantined_until"] > (now or time.monotonic())
+
+    def _pick(
+        self,
+        key_id: Optional[str],
+        exclude: Iterable[str] = (),
+        among: Iterable[str] = None
+    ) -> Optional[str]:
+        if key_id:
+            return key_id if self.in_use[key_id] < self.per_key else None
+        now = time.monotonic()
+        candidates = [k for k in (self.in_use if among is None else among) if k not in exclude]
+        # Quarantined keys only serve when every candidate is quarantined
+        healthy = [k for k in candidates if not self.is_quarantined(k, now)]
+        free = [k for k in healthy or candidates if self.in_use[k] < self.per_key]
+        # Least loaded, then healthiest, then least recently used (spreads retries)
+        return min(free, key=lambda k: (self.in_use[k], self.score(k), self.last_used[k])) if free else None
+
+    def try_acquire(
+        self,
+        key_id: str = None,
+        exclude: Iterable[str] = (),
+        among: Iterable[str] = None
+    ) -> Optional[str]:
+        """Take a lease without waiting (best free key unless one is named)"""
+        with self._cond:
+            picked = self._pick(key_id, exclude, among)
+            if picked:
+                self.in_use[picked] += 1
+                self.last_used[picked] = time.monotonic()
+            return picked
+
+    def acquire(
+        self,
+        key_id: str = None,
+        timeout: float = None,
+        among: Iterable[str] = None
+    ) -> Optional[str]:
+        """Wait for a lease, returns the key id or None on timeout"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while True:
+                picked = self._pick(key_id, among=among)
+                if picked:
+                    self.in_use[picked] += 1
+                    self.last_used[picked] = time.monotonic()
+                    return picked
+
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def release(self, key_id: str):
+        with self._cond:
+            self.in_use[key_id] = max(0, self.in_use[key_id] - 1)
+            self._cond.notify_all()
+
+    def record(self, key_id: str, latency: float, ok: bool, error: Any = None):
+        """Fold one call outcome into the key's health"""
+        rate_limited = bool(error) and any(m in str(error).lower() for m in self.RATE_LIMIT_MARKERS)
+        alpha = self.EWMA_ALPHA
+        with self._cond:
+            health = self.health[key_id]
+            health["latency"] += alpha * (latency - health["latency"])
+            health["error_rate"] += alpha * ((0.0 if ok else 1.0) - health["error_rate"])
+            health["rate_limit_rate"] += alpha * ((1.0 if rate_limited else 0.0) - health["rate_limit_rate"])
+            health["consecutive_errors"] = 0 if ok else health["consecutive_errors"] + 1
+
+            if rate_limited or health["consecutive_errors"] >= self.quarantine_errors:
+                health["quarantined_until"] = time.monotonic() + self.quarantine_seconds
+                health["quarantines"] += 1
+                health["consecutive_errors"] = 0
+                logger.warning(
+                    f"⚠️ Bytez {key_id} quarantined for {self.quarantine_seconds:.0f}s "
+                    f"({'rate limited' if rate_limited else 'repeated errors'})"
+                )
+
+    def idle_keys(self) -> list:
+        with self._cond:
+            return [k for k, n in self.in_use.items() if n == 0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Load and health per key"""
+        now = time.monotonic()
+        with self._cond:
+            return {
+                key_id: {
+                    "in_use": self.in_use[key_id],
+                    "latency": round(health["latency"], 3),
+                    "error_rate": round(health["error_rate"], 3),
+                    "rate_limit_rate": round(health["rate_limit_rate"], 3),
+                    "score": round(self.score(key_id), 3),
+                    "quarantined": health["quarantined_until"] > now,
+                    "quarantines": health["quarantines"]
+                }
+                for key_id, health in self.health.items()
+            }
+
+
+class ModelClient:
+    """
+    Thin wrapper around the shared Bytez client pool
+    - run(): raw model result
+    - chat(): extracted text content
+    - coalesce=True shares one call between identical concurrent requests,
+      e.g. the same advice topic asked at the same moment (opt-in: chat
+      replies must stay unique)
+    - deterministic=True memoizes chat() text for pure classification/extraction prompts
+    - every call holds a per-key lease while it runs
+    """
+
+    MEMO_PREFIX = "model_memo:"
+
+    def __init__(self):
+        self.config = get_config()
+        self.pool = get_client_pool()
+        self.clients = self.pool.clients
+        self.leases = KeyLeases(
+            self.clients,
+            per_key=self.config.bytez_concurrency_per_key,
+            quarantine_seconds=self.config.key_quarantine_seconds,
+            quarantine_errors=self.config.key_quarantine_errors
+        )
+        self.breakers = get_circuit_breakers()
+        self.single_flight = SingleFlight()
+        self.memo = TTLCache(
+            max_entries=self.config.model_cache_max_entries,
+            default_ttl=self.config.model_cache_ttl
+        )
+        self.redis = get_redis_manager() if self.config.model_cache_redis else None
+        self.stats = {}  # call_site -> {"calls", "coalesced", "memo_hits", "memo_misses"}
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def canonical_key(model: str, inputs: Any, params: Dict[str, Any]) -> str:
+        """Stable key for (model, canonicalized input, params)"""
+        payload = json.dumps(
+            [model, inputs, params],
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def run(
+        self,
+        model: str,
+        inputs: Any,
+        call_site: str = "default",
+        coalesce: bool = False,
+        key_id: str = None,
+        lease_held: bool = False,
+        **params
+    ):
+        """
+        Run a model, optionally coalescing identical in-flight calls
+        
+        key_id pins the call to one key; lease_held means the caller already
+        holds that key's lease (it is released when the call finishes)
+        """
+        if not coalesce:
+            self._record(call_site, shared=False)
+            return self._run(model, inputs, params, key_id, lease_held)
+
+        key = self.canonical_key(model, inputs, params)
+        result, shared = self.single_flight.do(
+            key, lambda: self._run(model, inputs, params, key_id, lease_held)
+        )
+        if shared and lease_held:
+            self.leases.release(key_id)
+        self._record(call_site, shared=shared)
+
+        if shared:
+            logger.debug(f"Coalesced {model} call for {call_site}")
+
+        return result
+
+    def chat(
+        self,
+        model: str,
+        messages: Any,
+        call_site: str = "default",
+        coalesce: bool = False,
+        deterministic: bool = False,
+        default: str = "",
+        key_id: str = None,
+        lease_held: bool = False,
+        **params
+    ) -> str:
+        """
+        Run a chat model and return its text content
+        
+        deterministic=True marks the call as a pure function of its input:
+        the text is memoized by (model, messages, params) and identical
+        concurrent calls are coalesced
+        """
+        if not deterministic:
+            result = self.run(
+                model, messages, call_site=call_site, coalesce=coalesce,
+                key_id=key_id, lease_held=lease_held, **params
+            )
+            return self.extract_text(result, default)
+
+        key = self.canonical_key(model, messages, params)
+        text = self._memo_get(key)
+        self._record_memo(call_site, hit=text is not None)
+        if text is not None:
+            if lease_held:
+                self.leases.release(key_id)
+            return text
+
+        result = self.run(
+            model, messages, call_site=call_site, coalesce=True,
+            key_id=key_id, lease_held=lease_held, **params
+        )
+        text = self.extract_text(result)
+        if text:
+            self._memo_set(key, text)
+            return text
+        return default
+
+    def available_keys(self, model: str) -> list:
+        """Keys whose breaker for this model isn't open"""
+        return [k for k in self.clients if self.breakers.available(model, [k])]
+
+    def _run(
+        self,
+        model: str,
+        inputs: Any,
+        params: Dict[str, Any],
+        key_id: str = None,
+        lease_held: bool = False
+    ):
+        if not lease_held:
+            among = [key_id] if key_id else self.available_keys(model)
+            if not among:
+                raise CircuitOpenError(f"{model} unavailable on every key")
+            key_id = self.leases.acquire(timeout=self.config.lease_timeout, among=among)
+            if key_id is None:
+                raise TimeoutError("No Bytez key free")
+
+        try:
+            if not self.breakers.allow(model, key_id):
+                raise CircuitOpenError(f"{model} unavailable on {key_id}")
+
+            started = time.monotonic()
+            try:
+                result = self.pool.run(key_id, model, inputs, params)
+            except Exception as e:
+                self.leases.record(key_id, time.monotonic() - started, ok=False, error=e)
+                self.breakers.record_failure(model, key_id)
+                raise
+
+            error = getattr(result, 'error', None)
+            self.leases.record(key_id, time.monotonic() - started, ok=not error, error=error)
+            if error:
+                self.breakers.record_failure(model, key_id)
+            else:
+                self.breakers.record_success(model, key_id)
+            return result
+        finally:
+            self.leases.release(key_id)
+
+    @staticmethod
+    def extract_text(result: Any, default: str = "") -> str:
+        """Pull text content out of a Bytez result"""
+        if hasattr(result, 'output') and result.output:
+            output = result.output
+            if isinstance(output, list) and output:
+                output = output[0]
+            if isinstance(output, dict):
+                return output.get('content', output.get('generated_text', default))
+            return str(output)
+        if isinstance(result, dict):
+            return result.get('content', default)
+        return default
+
+    # ==================== MEMO ====================
+
+    def _memo_get(self, key: str) -> Optional[str]:
+        text = self.memo.get(key)
+        if text is not None:
+            return text
+
+        if self.redis:
+            cached = self.redis.get(f"{self.MEMO_PREFIX}{key}")
+            if isinstance(cached, dict) and "text" in cached:
+                self.memo.set(key, cached["text"])
+                return cached["text"]
+
+        return None
+
+    def _memo_set(self, key: str, text: str):
+        self.memo.set(key, text)
+        if self.redis:
+            self.redis.set(
+                f"{self.MEMO_PREFIX}{key}",
+                {"text": text},
+                expire=self.config.model_cache_ttl
+            )
+
+    # ==================== STATS ====================
+
+    def _site_stats(self, call_site: str) -> Dict[str, int]:
+        return self.stats.setdefault(
+            call_site,
+            {"calls": 0, "coalesced": 0, "memo_hits": 0, "memo_misses": 0}
+        )
+
+    def _record(self, call_site: str, shared: bool):
+        with self._stats_lock:
+            stats = self._site_stats(call_site)
+            stats["calls"] += 1
+            if shared:
+                stats["coalesced"] += 1
+
+    def _record_memo(self, call_site: str, hit: bool):
+        with self._stats_lock:
+            stats = self._site_stats(call_site)
+            stats["memo_hits" if hit else "memo_misses"] += 1
+
+    def get_coalescing_ratio(self, call_site: Optional[str] = None) -> float:
+        """Share of calls served by another caller's in-flight request"""
+        sites = [self.stats.get(call_site, {})] if call_site else list(self.stats.values())
+        calls = sum(s.get("calls", 0) for s in sites)
+        coalesced = sum(s.get("coalesced", 0) for s in sites)
+        return coalesced / calls if calls else 0.0
+
+    def get_memo_hit_rate(self, call_site: str) -> float:
+        stats = self.stats.get(call_site, {})
+        total = stats.get("memo_hits", 0) + stats.get("memo_misses", 0)
+        return stats.get("memo_hits", 0) / total if total else 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per call site counts, coalescing ratios and memo hit rates"""
+        return {
+            "call_sites": {
+                site: {
+                    **counts,
+                    "coalescing_ratio": round(self.get_coalescing_ratio(site), 3),
+                    "memo_hit_rate": round(self.get_memo_hit_rate(site), 3)
+                }
+                for site, counts in self.stats.items()
+            },
+            "coalescing_ratio": round(self.get_coalescing_ratio(), 3),
+            "in_flight": self.single_flight.in_flight(),
+            "memo": self.memo.get_stats(),
+            "pool": self.pool.get_stats(),
+            "keys": self.leases.get_stats()
+        }
+
+
+# Global instance
+_model_client = None
+
+
+def get_model_client() -> ModelClient:
+    """Get global model client"""
+    global _model_client
+    if _model_client is None:
+        _model_client = ModelClient()
+    return _model_client
@@ -3,11 +3,7 @@ Complete Model Registry - All Available AI Models
 Organized by category for Memory Lane
 """
 
-# Your API Keys (1 concurrent request per key)
-API_KEYS = {
-    "key1": "1043901e59687190c4eebd9f12f08f2d",
-    "key2": "de732f0e5f363e09939178f908d484d7"
-}
+# API keys come from the environment (BYTEZ_API_KEYS / BYTEZ_API_KEY_1..N), see Config
 
 # Image Generation Models
 IMAGE_MODELS = {
@@ -118,6 +114,26 @@ MEMORY_LANE_MODELS = {
     }
 }
 
+# Fallback cascades (tried in order until one answers within its SLO and the deadline)
+MODEL_CASCADES = {
+    "chat": ["openai/gpt-4o-mini", "google/flan-t5-base"],
+    "conversation": [
+        MEMORY_LANE_MODELS["conversation"]["primary"],
+        "openai/gpt-4o-mini",
+        MEMORY_LANE_MODELS["conversation"]["fallback"]
+    ]
+}
+
+# Per-model latency/error SLOs (seconds); models breaching them are skipped
+MODEL_SLOS = {
+    "openai/gpt-4o": {"p95": 6.0, "timeout": 8.0, "max_error_rate": 0.25},
+    "openai/gpt-4o-mini": {"p95": 4.0, "timeout": 6.0, "max_error_rate": 0.25},
+    "google/flan-t5-base": {"p95": 2.0, "timeout": 3.0, "max_error_rate": 0.5}
+}
+
+# Models that take a plain prompt instead of chat messages
+TEXT2TEXT_MODELS = {"google/flan-t5-base"}
+
 # Rate Limit Info
 RATE_LIMITS = {
     "concurrent_per_key": 1,
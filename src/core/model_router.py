@@ -0,0 +1,365 @@
+"""
+Model Router - Latency-aware model cascade with per-model SLOs
+Tracks rolling p50/p95 latency and error rate per (model, key)
+and falls back down MODEL_CASCADES (then to a template) under deadline
+Interactive calls can be hedged onto an idle key past the observed p90
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from src.core.config import get_config
+from src.core.model_client import get_model_client
+from src.core.model_registry import MODEL_CASCADES, MODEL_SLOS, TEXT2TEXT_MODELS
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyWindow:
+    """Rolling window of call outcomes for one (model, key)"""
+
+    def __init__(self, size: int = 200):
+        self.samples = deque(maxlen=size)  # (latency_seconds, ok)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self.samples.append((latency, ok))
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            latencies = sorted(latency for latency, _ in self.samples)
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(round(pct / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self.samples:
+                return 0.0
+            return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "samples": len(self),
+            "p50": round(p50, 3) if p50 is not None else None,
+            "p95": round(p95, 3) if p95 is not None else None,
+            "error_rate": round(self.error_rate(), 3)
+        }
+
+
+class ModelRouter:
+    """
+    Routes text generation down a cascade of models
+    - Skips models whose rolling p95 / error rate breach their SLO
+    - Enforces a per-call deadline (abandoned calls finish in the background)
+    - Returns the caller's template reply if every model misses
+    - hedge=True duplicates slow calls onto an idle key (within a traffic budget)
+    """
+
+    MIN_SAMPLES = 10  # Don't judge a model on fewer samples than this
+    PROBE_INTERVAL = 30.0  # Let one call through to an unhealthy model this often
+    MIN_HEDGE_DELAY = 0.25
+    DEFAULT_SLO = {"p95": 5.0, "timeout": 8.0, "max_error_rate": 0.3}
+
+    def __init__(self):
+        self.config = get_config()
+        self.model_client = get_model_client()
+        # Enough workers for every key's leases plus hedges, so added keys add throughput
+        key_slots = len(self.model_client.clients) * self.config.bytez_concurrency_per_key
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(self.config.model_router_workers, 2 * key_slots),
+            thread_name_prefix="model-router"
+        )
+        self.windows: Dict[tuple, LatencyWindow] = {}
+        self._last_probe: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "calls": 0,
+            "fallbacks": 0,
+            "templates": 0,
+            "timeouts": 0,
+            "hedgeable": 0,
+            "hedges": 0,
+            "hedge_wins": 0
+        }
+        self._stats_lock = threading.Lock()
+
+    # ==================== TRACKING ====================
+
+    def _window(self, model: str, key_id: str) -> LatencyWindow:
+        with self._lock:
+            window = self.windows.get((model, key_id))
+            if window is None:
+                window = self.windows[(model, key_id)] = LatencyWindow()
+            return window
+
+    def record(self, model: str, key_id: str, latency: float, ok: bool):
+        self._window(model, key_id).record(latency, ok)
+
+    def slo_for(self, model: str) -> Dict[str, float]:
+        return MODEL_SLOS.get(model, self.DEFAULT_SLO)
+
+    def is_healthy(self, model: str, key_id: str) -> bool:
+        """False when the model's recent p95 or error rate breaches its SLO"""
+        window = self._window(model, key_id)
+        if len(window) < self.MIN_SAMPLES:
+            return True
+
+        slo = self.slo_for(model)
+        p95 = window.percentile(95)
+        if p95 is not None and p95 > slo["p95"]:
+            return False
+        return window.error_rate() <= slo["max_error_rate"]
+
+    def should_try(self, model: str) -> bool:
+        """Healthy on any key; otherwise an occasional probe so the model can recover"""
+        if any(self.is_healthy(model, key_id) for key_id in self.model_client.clients):
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_probe.get(model, 0.0) >= self.PROBE_INTERVAL:
+                self._last_probe[model] = now
+                return True
+        return False
+
+    def hedge_delay(self, model: str, key_id: str) -> float:
+        """Adaptive hedge threshold: observed p90 for this (model, key)"""
+        window = self._window(model, key_id)
+        if len(window) < self.MIN_SAMPLES:
+            return self.config.hedge_delay
+        return max(self.MIN_HEDGE_DELAY, window.percentile(90))
+
+    def _count(self, field: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[field] += amount
+
+    def _take_hedge(self) -> bool:
+        """Count a hedge if it fits in HEDGE_BUDGET_PCT of hedgeable traffic"""
+        with self._stats_lock:
+            if self.stats["hedges"] >= self.config.hedge_budget_pct / 100 * self.stats["hedgeable"]:
+                return False
+            self.stats["hedges"] += 1
+            return True
+
+    def _reserve_for(self, models: List[str], remaining: float) -> float:
+        """Time to hold back for the rest of the cascade"""
+        reserve = sum(self.slo_for(model)["p95"] for model in models)
+        return min(reserve, remaining * 0.5)
+
+    # ==================== ROUTING ====================
+
+    def chat(
+        self,
+        cascade: str,
+        messages: List[Dict[str, str]],
+        deadline: float = None,
+        call_site: str = "default",
+        default: str = "",
+        hedge: bool = False,
+        **params
+    ) -> str:
+        """Text from the first cascade model that answers in time, else default"""
+        return self.route(cascade, messages, deadline, call_site, default, hedge, **params)["text"]
+
+    def route(
+        self,
+        cascade: str,
+        messages: List[Dict[str, str]],
+        deadline: float = None,
+        call_site: str = "default",
+        default: str = "",
+        hedge: bool = False,
+        **params
+    ) -> Dict[str, Any]:
+        """Run the cascade -> {"text", "model", "fallback", "latency"}"""
+        models = MODEL_CASCADES.get(cascade, [cascade])
+        deadline = deadline or self.config.chat_deadline
+        started = time.monotonic()
+        self._count("calls")
+
+        for position, model in enumerate(models):
+            remaining = deadline - (time.monotonic() - started)
+            if remaining <= 0.05:
+                break
+
+            # Open breakers fail fast straight to the next model
+            keys = self.model_client.available_keys(model)
+            if not keys:
+                continue
+
+            is_last = position == len(models) - 1
+            if not is_last and not self.should_try(model):
+                logger.info(f"⚠️ Skipping {model}: outside SLO")
+                continue
+
+            budget = remaining - self._reserve_for(models[position + 1:], remaining)
+            timeout = min(budget, self.slo_for(model)["timeout"])
+            text = self._call(model, keys, messages, timeout, call_site, params, hedge)
+            if text:
+                if position > 0:
+                    self._count("fallbacks")
+                return {
+                    "text": text,
+                    "model": model,
+                    "fallback": position > 0,
+                    "latency": time.monotonic() - started
+                }
+
+        self._count("templates")
+        logger.warning(f"⚠️ Cascade '{cascade}' exhausted for {call_site}, using template reply")
+        return {
+            "text": default,
+            "model": None,
+            "fallback": True,
+            "latency": time.monotonic() - started
+        }
+
+    def _call(
+        self,
+        model: str,
+        keys: List[str],
+        messages: List[Dict[str, str]],
+        timeout: float,
+        call_site: str,
+        params: Dict[str, Any],
+        hedge: bool = False
+    ) -> Optional[str]:
+        inputs = self._to_prompt(messages) if model in TEXT2TEXT_MODELS else messages
+        started = time.monotonic()
+        deadline_at = started + timeout
+
+        key_id = self.model_client.leases.acquire(timeout=timeout, among=keys)
+        if key_id is None:
+            self._count("timeouts")
+            logger.warning(f"⚠️ No Bytez key free within {timeout:.1f}s for {call_site}")
+            return None
+
+        primary = self._submit(model, inputs, key_id, call_site, params)
+        attempts = {primary: (key_id, started)}
+
+        if hedge and self.config.hedge_enabled and len(self.model_client.clients) > 1:
+            self._count("hedgeable")
+            delay = self.hedge_delay(model, key_id)
+            if started + delay < deadline_at:
+                done, _ = wait([primary], timeout=delay)
+                if not done and self._take_hedge():
+                    hedge_key = self.model_client.leases.try_acquire(exclude=(key_id,), among=keys)
+                    if not hedge_key:
+                        self._count("hedges", -1)
+                    else:
+                        logger.info(f"⚡ Hedging {model} on {hedge_key} after {delay:.2f}s")
+                        future = self._submit(model, inputs, hedge_key, call_site, params)
+                        attempts[future] = (hedge_key, time.monotonic())
+
+        pending = set(attempts)
+        while pending:
+            done, pending = wait(
+                pending,
+                timeout=max(0.0, deadline_at - time.monotonic()),
+                return_when=FIRST_COMPLETED
+            )
+            if not done:
+                break
+
+            for future in done:
+                attempt_key, attempt_started = attempts[future]
+                try:
+                    text = future.result()
+                except Exception as e:
+                    self.record(model, attempt_key, time.monotonic() - attempt_started, ok=False)
+                    logger.error(f"{model} failed on {attempt_key} for {call_site}: {e}")
+                    continue
+
+                self.record(model, attempt_key, time.monotonic() - attempt_started, ok=bool(text))
+                if text:
+                    if future is not primary:
+                        self._count("hedge_wins")
+                    self._abandon(pending, attempts, record_model=model)
+                    return text.strip()
+
+        if pending:
+            # Calls keep running in their workers; we just stop waiting for them
+            self._count("timeouts")
+            for future in pending:
+                self.record(model, attempts[future][0], timeout, ok=False)
+                self.model_client.breakers.record_failure(model, attempts[future][0])
+            self._abandon(pending, attempts)
+            logger.warning(f"⚠️ {model} missed {timeout:.1f}s deadline for {call_site}")
+        return None
+
+    def _submit(
+        self,
+        model: str,
+        inputs: Any,
+        key_id: str,
+        call_site: str,
+        params: Dict[str, Any]
+    ) -> Future:
+        """Run on a key whose lease we already hold (released by the client)"""
+        return self.executor.submit(
+            self.model_client.chat, model, inputs,
+            call_site=call_site, key_id=key_id, lease_held=True, **params
+        )
+
+    def _abandon(self, futures, attempts: Dict[Future, tuple], record_model: str = None):
+        """
+        Drop losing/late calls; calls that never started give their lease back
+        With record_model, a losing call's real latency is recorded when it lands
+        """
+        for future in futures:
+            key_id, started = attempts[future]
+            if future.cancel():
+                self.model_client.leases.release(key_id)
+            elif record_model:
+                future.add_done_callback(
+                    lambda f, k=key_id, t=started: self.record(
+                        record_model, k, time.monotonic() - t,
+                        ok=not f.exception() and bool(f.result())
+                    )
+                )
+
+    @staticmethod
+    def _to_prompt(messages: List[Dict[str, str]]) -> str:
+        """Flatten chat messages for text2text models (last turns only)"""
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        turns = [m for m in messages if m["role"] != "system"][-4:]
+        lines = [f"{'Prabh' if m['role'] == 'assistant' else 'User'}: {m['content']}" for m in turns]
+        return f"{system[:500]}\n\n" + "\n".join(lines) + "\nPrabh:"
+
+    # ==================== STATS ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Rolling latency/error stats per (model, key), cascade counters and breakers"""
+        with self._stats_lock:
+            counters = dict(self.stats)
+        return {
+            **counters,
+            "models": {
+                f"{model}@{key_id}": window.snapshot()
+                for (model, key_id), window in self.windows.items()
+            },
+            "breakers": self.model_client.breakers.get_stats()
+        }
+
+
+# Global instance
+_model_router = None
+
+
+def get_model_router() -> ModelRouter:
+    """Get global model router"""
+    global _model_router
+    if _model_router is None:
+        _model_router = ModelRouter()
+    return _model_router
@@ -0,0 +1,268 @@
+"""
+Rate Limits - Cooldowns and period quotas as single-key TTL counters
+One O(1) operation answers "allowed? / remaining" without loading any
+user or mode state
+"""
+
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Tuple
+
+from src.core.redis_manager import get_redis_manager
+from src.core.state_store import RedisStateStore, get_state_store
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Generic cooldown/quota primitive shared by modes and tiers
+    - cooldown: one key with a TTL; taking it when absent is the "allowed"
+    - quota: one counter per (name, subject, period), expiring at local
+      midnight ("day") or the start of next month ("month")
+
+    On Redis both are one Lua call (atomic across instances); on the
+    in-process state store they run under a lock and ride along in its
+    snapshot
+    """
+
+    PERIODS = ("day", "month")
+
+    # KEYS: cooldown key  ARGV: ttl ms
+    # Returns 0 when the cooldown was taken, else the remaining ms
+    COOLDOWN_SCRIPT = """
+    if redis.call('SET', KEYS[1], '1', 'NX', 'PX', ARGV[1]) then
+        return 0
+    end
+    return math.max(redis.call('PTTL', KEYS[1]), 1)
+    """
+
+    # KEYS: counter key  ARGV: amount, limit, expire-at epoch seconds
+    # Returns {allowed, used}
+    CONSUME_SCRIPT = """
+    local amount = tonumber(ARGV[1])
+    local used = redis.call('INCRBY', KEYS[1], amount)
+    if used == amount then
+        redis.call('EXPIREAT', KEYS[1], ARGV[3])
+    end
+    if used > tonumber(ARGV[2]) then
+        return {0, redis.call('DECRBY', KEYS[1], amount)}
+    end
+    return {1, used}
+    """
+
+    # KEYS: counter key  ARGV: amount
+    # Gives amount back; a counter at or below zero is dropped (the next
+    # consume sets its expiry again)
+    REFUND_SCRIPT = """
+    if redis.call('EXISTS', KEYS[1]) == 0 then
+        return 0
+    end
+    local used = redis.call('DECRBY', KEYS[1], ARGV[1])
+    if used <= 0 then
+        redis.call('DEL', KEYS[1])
+        return 0
+    end
+    return used
+    """
+
+    def __init__(self):
+        self.redis = get_redis_manager()
+        self.store = get_state_store()
+
+        self.on_redis = isinstance(self.store, RedisStateStore) and bool(self.redis.client)
+        self._cooldown_script = None
+        self._consume_script = None
+        self._refund_script = None
+        if self.on_redis:
+            self._cooldown_script = self.redis.client.register_script(self.COOLDOWN_SCRIPT)
+            self._consume_script = self.redis.client.register_script(self.CONSUME_SCRIPT)
+            self._refund_script = self.redis.client.register_script(self.REFUND_SCRIPT)
+
+        # Serializes read-modify-write on the in-process store
+        self._local_lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}  # name -> {"allowed", "denied"}
+        self._stats_lock = threading.Lock()
+
+    # ==================== KEYS ====================
+
+    @staticmethod
+    def _cooldown_key(name: str, subject: Any) -> str:
+        return f"rl:cd:{name}:{subject}"
+
+    @classmethod
+    def _quota_key(cls, name: str, subject: Any, period: str, now: datetime) -> str:
+        if period not in cls.PERIODS:
+            raise ValueError(f"Unknown quota period: {period}")
+        stamp = now.strftime("%Y%m%d" if period == "day" else "%Y%m")
+        return f"rl:q:{name}:{subject}:{stamp}"
+
+    @staticmethod
+    def period_end(period: str, now: datetime = None) -> datetime:
+        """Local time the current day/month quota resets"""
+        now = now or datetime.now()
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        if period == "day":
+            return midnight + timedelta(days=1)
+        return (midnight.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+    # ==================== COOLDOWNS ====================
+
+    def acquire_cooldown(self, name: str, subject: Any, seconds: float) -> Tuple[bool, float]:
+        """
+        Start the cooldown unless it's running
+
+        Returns (allowed, remaining seconds); allowed means it was free and
+        is now started
+        """
+        key = self._cooldown_key(name, subject)
+        try:
+            if self.on_redis:
+                with self.redis.latency.time("cooldown"):
+                    remaining_ms = self._cooldown_script(keys=[key], args=[max(1, int(seconds * 1000))])
+                remaining = int(remaining_ms) / 1000
+            else:
+                with self._local_lock:
+                    remaining = self._local_cooldown(key)
+                    if not remaining:
+                        self.store.set(key, time.time() + seconds, expire=math.ceil(seconds))
+        except Exception as e:
+            logger.error(f"Cooldown check failed for {name}: {e}")
+            return True, 0.0
+
+        self._count(name, not remaining)
+        return not remaining, remaining
+
+    def start_cooldown(self, name: str, subject: Any, seconds: float):
+        """(Re)start the cooldown unconditionally"""
+        key = self._cooldown_key(name, subject)
+        if self.on_redis:
+            try:
+                with self.redis.latency.time("cooldown"):
+                    self.redis.client.set(key, "1", px=max(1, int(seconds * 1000)))
+            except Exception as e:
+                logger.error(f"Cooldown start failed for {name}: {e}")
+        else:
+            self.store.set(key, time.time() + seconds, expire=math.ceil(seconds))
+
+    def cooldown_remaining(self, name: str, subject: Any) -> float:
+        """Seconds until the cooldown ends (0 = not running)"""
+        key = self._cooldown_key(name, subject)
+        try:
+            if self.on_redis:
+                with self.redis.latency.time("cooldown"):
+                    remaining_ms = self.redis.client.pttl(key)
+                return max(0, remaining_ms) / 1000
+            return self._local_cooldown(key)
+        except Exception as e:
+            logger.error(f"Cooldown lookup failed for {name}: {e}")
+            return 0.0
+
+    def clear_cooldown(self, name: str, subject: Any):
+        key = self._cooldown_key(name, subject)
+        if self.on_redis:
+            self.redis.delete(key)
+        else:
+            self.store.delete(key)
+
+    def _local_cooldown(self, key: str) -> float:
+        ends_at = self.store.get(key)
+        return max(0.0, ends_at - time.time()) if ends_at else 0.0
+
+    # ==================== QUOTAS ====================
+
+    def consume(self, name: str, subject: Any, limit: int, period: str = "day", amount: int = 1) -> Tuple[bool, int]:
+        """
+        Use amount of the subject's quota for the current period
+
+        Returns (allowed, remaining); a denied call uses nothing
+        """
+        now = datetime.now()
+        key = self._quota_key(name, subject, period, now)
+        ends_at = self.period_end(period, now)
+        try:
+            if self.on_redis:
+                with self.redis.latency.time("quota"):
+                    allowed, used = self._consume_script(
+                        keys=[key], args=[amount, limit, int(ends_at.timestamp())]
+                    )
+                allowed = bool(allowed)
+            else:
+                with self._local_lock:
+                    used = self.store.get(key) or 0
+                    allowed = used + amount <= limit
+                    if allowed:
+                        used += amount
+                        self.store.set(key, used, expire=math.ceil((ends_at - now).total_seconds()))
+        except Exception as e:
+            logger.error(f"Quota check failed for {name}: {e}")
+            return True, limit
+
+        self._count(name, allowed)
+        return allowed, max(0, limit - int(used))
+
+    def refund(self, name: str, subject: Any, period: str = "day", amount: int = 1):
+        """Give back quota consumed for work that then failed"""
+        now = datetime.now()
+        key = self._quota_key(name, subject, period, now)
+        try:
+            if self.on_redis:
+                with self.redis.latency.time("quota"):
+                    self._refund_script(keys=[key], args=[amount])
+            else:
+                with self._local_lock:
+                    used = (self.store.get(key) or 0) - amount
+                    if used > 0:
+                        ends_at = self.period_end(period, now)
+                        self.store.set(key, used, expire=math.ceil((ends_at - now).total_seconds()))
+                    else:
+                        self.store.delete(key)
+        except Exception as e:
+            logger.error(f"Quota refund failed for {name}: {e}")
+
+    def used(self, name: str, subject: Any, period: str = "day") -> int:
+        """Amount used in the current period (read only)"""
+        key = self._quota_key(name, subject, period, datetime.now())
+        try:
+            if self.on_redis:
+                with self.redis.latency.time("quota"):
+                    value = self.redis.client.get(key)
+                return int(value) if value else 0
+            return self.store.get(key) or 0
+        except Exception as e:
+            logger.error(f"Quota lookup failed for {name}: {e}")
+            return 0
+
+    def remaining(self, name: str, subject: Any, limit: int, period: str = "day") -> int:
+        """Quota left in the current period (read only)"""
+        return max(0, limit - self.used(name, subject, period))
+
+    # ==================== STATS ====================
+
+    def _count(self, name: str, allowed: bool):
+        with self._stats_lock:
+            stats = self.stats.setdefault(name, {"allowed": 0, "denied": 0})
+            stats["allowed" if allowed else "denied"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Allowed/denied decisions per limit name"""
+        with self._stats_lock:
+            return {
+                "backend": "redis" if self.on_redis else "memory",
+                "limits": {name: dict(counts) for name, counts in self.stats.items()}
+            }
+
+
+# Global instance
+_rate_limiter = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get global rate limiter"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
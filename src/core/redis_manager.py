@@ -1,99 +1,248 @@
 """
 Redis Manager - Real-time communication and caching
+Sync facade (Flask thread, worker threads) over a sized connection pool
+The bot's async handlers use src.core.async_redis instead
 """
 
+import bisect
 import logging
+import threading
+import time
 import redis
 import json
-from typing import Any, Optional
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
 from src.core.config import get_config
 
 logger = logging.getLogger(__name__)
 
 
+class LatencyHistogram:
+    """Per-command latency histogram with fixed millisecond buckets"""
+
+    BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._commands: Dict[str, Dict[str, Any]] = {}
+
+    def observe(self, command: str, seconds: float):
+        ms = seconds * 1000
+        with self._lock:
+            stats = self._commands.get(command)
+            if stats is None:
+                stats = self._commands[command] = {
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "buckets": [0] * (len(self.BUCKETS_MS) + 1)
+                }
+            stats["count"] += 1
+            stats["total_ms"] += ms
+            stats["buckets"][bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+
+    @contextmanager
+    def time(self, command: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(command, time.perf_counter() - started)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """command -> count, avg_ms and bucket counts ("<=N ms" labels)"""
+        labels = [f"<={b}ms" for b in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+        with self._lock:
+            return {
+                command: {
+                    "count": stats["count"],
+                    "avg_ms": round(stats["total_ms"] / stats["count"], 3) if stats["count"] else 0.0,
+                    "buckets": dict(zip(labels, stats["buckets"]))
+                }
+                for command, stats in self._commands.items()
+            }
+
+
+def encode(value: Any) -> Any:
+    """JSON-encode dicts/lists, pass everything else through"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def decode(value: Any) -> Optional[Any]:
+    """JSON-decode when possible, else the UTF-8 string"""
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except (ValueError, TypeError):
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
 class RedisManager:
     """Manage Redis connections and operations"""
-    
+
     def __init__(self):
         self.config = get_config()
         self.client = None
         self.pubsub = None
-        
+        self.latency = LatencyHistogram()
+
         if self.config.redis_url:
             try:
-                self.client = redis.from_url(self.config.redis_url)
+                pool = redis.ConnectionPool.from_url(
+                    self.config.redis_url,
+                    max_connections=self.config.redis_pool_size
+                )
+                self.client = redis.Redis(connection_pool=pool)
                 self.client.ping()
-                logger.info("✅ Redis connected")
+                logger.info(f"✅ Redis connected (pool of {self.config.redis_pool_size})")
             except Exception as e:
                 logger.warning(f"⚠️ Redis connection failed: {e}")
                 self.client = None
-    
+
     def set(self, key: str, value: Any, expire: int = None):
-        """Set value in Redis"""
+        """Set value in Redis (SET ... EX in one round trip)"""
         if not self.client:
             return False
-        
+
         try:
-            if isinstance(value, (dict, list)):
-                value = json.dumps(value)
-            
-            self.client.set(key, value)
-            
-            if expire:
-                self.client.expire(key, expire)
-            
+            with self.latency.time("set"):
+                self.client.set(key, encode(value), ex=expire or None)
             return True
         except Exception as e:
             logger.error(f"❌ Redis set failed: {e}")
             return False
-    
+
     def get(self, key: str) -> Optional[Any]:
         """Get value from Redis"""
         if not self.client:
             return None
-        
+
         try:
-            value = self.client.get(key)
-            if value:
-                try:
-                    return json.loads(value)
-                except:
-                    return value.decode('utf-8')
-            return None
+            with self.latency.time("get"):
+                value = self.client.get(key)
+            return decode(value)
         except Exception as e:
             logger.error(f"❌ Redis get failed: {e}")
             return None
-    
+
+    def expire(self, key: str, seconds: int) -> bool:
+        """Restart a key's TTL, False when the key doesn't exist"""
+        if not self.client:
+            return False
+
+        try:
+            with self.latency.time("expire"):
+                return bool(self.client.expire(key, seconds))
+        except Exception as e:
+            logger.error(f"❌ Redis expire failed: {e}")
+            return False
+
+    def delete(self, *keys: str) -> int:
+        """Delete keys, returns how many existed"""
+        if not self.client or not keys:
+            return 0
+
+        try:
+            with self.latency.time("delete"):
+                return self.client.delete(*keys)
+        except Exception as e:
+            logger.error(f"❌ Redis delete failed: {e}")
+            return 0
+
+    # ==================== BATCH ====================
+
+    def get_many(self, keys: Iterable[str]) -> List[Optional[Any]]:
+        """MGET: values in key order (None for missing keys)"""
+        keys = list(keys)
+        if not self.client or not keys:
+            return [None] * len(keys)
+
+        try:
+            with self.latency.time("mget"):
+                values = self.client.mget(keys)
+            return [decode(value) for value in values]
+        except Exception as e:
+            logger.error(f"❌ Redis mget failed: {e}")
+            return [None] * len(keys)
+
+    def set_many(self, mapping: Dict[str, Any], expire: int = None) -> bool:
+        """MSET, or one pipelined SET EX per key when an expiry is given"""
+        if not self.client or not mapping:
+            return False
+
+        try:
+            with self.latency.time("mset"):
+                if expire:
+                    pipe = self.client.pipeline(transaction=False)
+                    for key, value in mapping.items():
+                        pipe.set(key, encode(value), ex=expire)
+                    pipe.execute()
+                else:
+                    self.client.mset({key: encode(value) for key, value in mapping.items()})
+            return True
+        except Exception as e:
+            logger.error(f"❌ Redis mset failed: {e}")
+            return False
+
+    @contextmanager
+    def pipeline(self, transaction: bool = False):
+        """
+        Queue commands and send them in one round trip on exit
+
+            with redis_manager.pipeline() as pipe:
+                pipe.set(a, 1, ex=60)
+                pipe.delete(b)
+
+        Yields None when Redis isn't connected
+        """
+        if not self.client:
+            yield None
+            return
+
+        pipe = self.client.pipeline(transaction=transaction)
+        yield pipe
+        try:
+            with self.latency.time("pipeline"):
+                pipe.execute()
+        except Exception as e:
+            logger.error(f"❌ Redis pipeline failed: {e}")
+
+    # ==================== PUB/SUB ====================
+
     def publish(self, channel: str, message: Any):
         """Publish message to channel"""
         if not self.client:
             return False
-        
+
         try:
-            if isinstance(message, (dict, list)):
-                message = json.dumps(message)
-            
-            self.client.publish(channel, message)
+            with self.latency.time("publish"):
+                self.client.publish(channel, encode(message))
             return True
         except Exception as e:
             logger.error(f"❌ Redis publish failed: {e}")
             return False
-    
+
     def subscribe(self, channel: str):
         """Subscribe to channel"""
         if not self.client:
             return None
-        
+
         try:
             if not self.pubsub:
                 self.pubsub = self.client.pubsub()
-            
+
             self.pubsub.subscribe(channel)
             return self.pubsub
         except Exception as e:
             logger.error(f"❌ Redis subscribe failed: {e}")
             return None
 
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-command latency histograms"""
+        return {"connected": bool(self.client), "commands": self.latency.snapshot()}
+
 
 # Global instance
 _redis_manager = None
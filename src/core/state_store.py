@@ -0,0 +1,221 @@
+"""
+State Store - Pluggable backend for mode/engine state
+Redis for multi-instance deployments, an in-process TTL LRU otherwise
+(optionally snapshotted to disk so state survives restarts)
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.core.config import get_config
+from src.core.redis_manager import get_redis_manager
+from src.core.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class StateStore:
+    """Key/value interface shared by the state backends (JSON-serializable values)"""
+
+    name = "base"
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, expire: int = None) -> bool:
+        raise NotImplementedError
+
+    def delete(self, *keys: str) -> int:
+        raise NotImplementedError
+
+    def expire(self, key: str, seconds: int) -> bool:
+        """Restart the key's TTL without rewriting it (False if it's gone)"""
+        value = self.get(key)
+        return value is not None and self.set(key, value, expire=seconds)
+
+    def get_many(self, keys: Iterable[str]) -> List[Optional[Any]]:
+        return [self.get(key) for key in keys]
+
+    def set_many(self, mapping: Dict[str, Any], expire: int = None) -> bool:
+        return all([self.set(key, value, expire) for key, value in mapping.items()])
+
+    def purge_expired(self) -> int:
+        """Drop expired entries now, returns how many (backends with native expiry return 0)"""
+        return 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+class RedisStateStore(StateStore):
+    """State in Redis (shared by every instance)"""
+
+    name = "redis"
+
+    def __init__(self, redis_manager=None):
+        self.redis = redis_manager or get_redis_manager()
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.redis.get(key)
+
+    def set(self, key: str, value: Any, expire: int = None) -> bool:
+        return self.redis.set(key, value, expire=expire)
+
+    def delete(self, *keys: str) -> int:
+        return self.redis.delete(*keys)
+
+    def expire(self, key: str, seconds: int) -> bool:
+        return self.redis.expire(key, seconds)
+
+    def get_many(self, keys: Iterable[str]) -> List[Optional[Any]]:
+        return self.redis.get_many(keys)
+
+    def set_many(self, mapping: Dict[str, Any], expire: int = None) -> bool:
+        return self.redis.set_many(mapping, expire=expire)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, **self.redis.get_stats()}
+
+
+class MemoryStateStore(StateStore):
+    """
+    State in a bounded in-process LRU with per-key TTL
+    - values are kept as JSON text, so every get returns a fresh copy and
+      changes only land through set (same semantics as Redis)
+    - snapshot_path: JSON snapshot written every snapshot_interval seconds
+      when something changed, and loaded back on start
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 100000, snapshot_path: str = "", snapshot_interval: float = 60):
+        self.cache = TTLCache(max_entries=max_entries, default_ttl=0)
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._dirty = False
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_thread = None
+
+        if self.snapshot_path:
+            self._load_snapshot()
+            self._snapshot_thread = threading.Thread(
+                target=self._snapshot_loop, name="state-snapshot", daemon=True
+            )
+            self._snapshot_thread.start()
+            atexit.register(self.save_snapshot)
+
+    def get(self, key: str) -> Optional[Any]:
+        text = self.cache.get(key)
+        return json.loads(text) if text is not None else None
+
+    def set(self, key: str, value: Any, expire: int = None) -> bool:
+        try:
+            text = json.dumps(value)
+        except (TypeError, ValueError) as e:
+            logger.error(f"❌ State set failed for {key}: {e}")
+            return False
+        self.cache.set(key, text, ttl=expire or 0)
+        self._dirty = True
+        return True
+
+    def expire(self, key: str, seconds: int) -> bool:
+        text = self.cache.get(key)
+        if text is None:
+            return False
+        self.cache.set(key, text, ttl=seconds)
+        self._dirty = True
+        return True
+
+    def delete(self, *keys: str) -> int:
+        removed = sum(1 for key in keys if self.cache.delete(key))
+        if removed:
+            self._dirty = True
+        return removed
+
+    def purge_expired(self) -> int:
+        removed = self.cache.purge_expired()
+        if removed:
+            self._dirty = True
+        return removed
+
+    # ==================== SNAPSHOT ====================
+
+    def _snapshot_loop(self):
+        while True:
+            time.sleep(self.snapshot_interval)
+            if self._dirty:
+                self.save_snapshot()
+
+    def save_snapshot(self):
+        """Write live entries (with wall-clock expiry) to snapshot_path"""
+        if not self.snapshot_path:
+            return
+        with self._snapshot_lock:
+            self._dirty = False
+            now = time.time()
+            entries = []
+            for key, value in self.cache.items():
+                remaining = self.cache.ttl(key)
+                entries.append([key, json.loads(value), now + remaining if remaining is not None else None])
+            try:
+                os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+                tmp_path = f"{self.snapshot_path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.snapshot_path)
+            except Exception as e:
+                self._dirty = True
+                logger.warning(f"⚠️ State snapshot save failed: {e}")
+
+    def _load_snapshot(self):
+        try:
+            if not os.path.exists(self.snapshot_path):
+                return
+            with open(self.snapshot_path, "r") as f:
+                entries = json.load(f)
+            now = time.time()
+            loaded = 0
+            for key, value, expires_at in entries:
+                if expires_at is None:
+                    self.cache.set(key, json.dumps(value), ttl=0)
+                elif expires_at > now:
+                    self.cache.set(key, json.dumps(value), ttl=expires_at - now)
+                else:
+                    continue
+                loaded += 1
+            logger.info(f"✅ Loaded {loaded} state entries from snapshot")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load state snapshot: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "snapshot_path": self.snapshot_path or None, **self.cache.get_stats()}
+
+
+# Global instance
+_state_store = None
+
+
+def get_state_store() -> StateStore:
+    """Get global state store (STATE_STORE=auto picks Redis when connected)"""
+    global _state_store
+    if _state_store is None:
+        config = get_config()
+        backend = config.state_store
+        if backend == "auto":
+            backend = "redis" if get_redis_manager().client else "memory"
+
+        if backend == "redis":
+            _state_store = RedisStateStore()
+        else:
+            _state_store = MemoryStateStore(
+                max_entries=config.state_store_max_entries,
+                snapshot_path=config.state_snapshot_path,
+                snapshot_interval=config.state_snapshot_interval
+            )
+        logger.info(f"✅ State store: {_state_store.name}")
+    return _state_store
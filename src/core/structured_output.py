@@ -0,0 +1,301 @@
+"""
+Structured Output - Schema-described JSON generation for the mode engines
+One call returns every field as JSON; a tolerant incremental parser reads it,
+and invalid output gets one targeted repair call
+"""
+
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from src.core.model_client import get_model_client
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== SCHEMA ====================
+#
+# Schemas are a small JSON Schema subset:
+#   {"type": "object", "properties": {...}, "required": [...]}
+#   {"type": "array", "items": {...}, "minItems": n, "maxItems": n}
+#   {"type": "string" | "integer" | "number" | "boolean", "enum": [...], "minLength": n}
+# plus an optional "description" on any node, used in the prompt
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool
+}
+
+
+def schema_prompt(schema: Dict[str, Any]) -> str:
+    """Instructions that describe the expected JSON"""
+    return (
+        "Reply with a single JSON value only (no markdown, no prose) matching this schema:\n"
+        f"{json.dumps(schema, ensure_ascii=False)}"
+    )
+
+
+def validate(value: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """Schema violations as readable messages (empty list = valid)"""
+    expected = schema.get("type")
+    python_type = _TYPES.get(expected)
+    if python_type and (not isinstance(value, python_type) or (expected != "boolean" and isinstance(value, bool))):
+        return [f"{path}: expected {expected}, got {type(value).__name__}"]
+
+    errors = []
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: must be one of {schema['enum']}")
+
+    if expected == "object":
+        for name in schema.get("required", []):
+            if name not in value:
+                errors.append(f"{path}.{name}: missing")
+        for name, child in schema.get("properties", {}).items():
+            if name in value:
+                errors.extend(validate(value[name], child, f"{path}.{name}"))
+
+    elif expected == "array":
+        if len(value) < schema.get("minItems", 0):
+            errors.append(f"{path}: needs at least {schema['minItems']} items")
+        if "maxItems" in schema and len(value) > schema["maxItems"]:
+            errors.append(f"{path}: at most {schema['maxItems']} items")
+        if "items" in schema:
+            for index, item in enumerate(value):
+                errors.extend(validate(item, schema["items"], f"{path}[{index}]"))
+
+    elif expected == "string" and len(value.strip()) < schema.get("minLength", 0):
+        errors.append(f"{path}: at least {schema['minLength']} characters")
+
+    return errors
+
+
+# ==================== PARSER ====================
+
+class IncrementalJSONParser:
+    """
+    Tolerant JSON parser for model output, fed chunk by chunk
+    - skips prose and ``` fences before the first { or [
+    - tracks nesting as text arrives, so it knows where the top-level
+      value closes; final() only returns a value once it has
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._start = -1
+        self._scanned = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._done = -1  # end of the top-level value once closed
+
+    def feed(self, chunk: str):
+        """Add text (parsing is deferred to final)"""
+        self.buffer += chunk
+        self._scan()
+
+    def _scan(self):
+        text = self.buffer
+        if self._start < 0:
+            starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+            if not starts:
+                return
+            self._start = self._scanned = min(starts)
+
+        for i in range(self._scanned, len(text)):
+            if self._done >= 0:
+                break
+            ch = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._stack.append("}" if ch == "{" else "]")
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if not self._stack:
+                    self._done = i + 1
+        self._scanned = len(text)
+
+    @staticmethod
+    def _loads(text: str) -> Any:
+        """json.loads (raw newlines allowed in strings), retried without trailing commas"""
+        text = text.rstrip().rstrip(",")
+        try:
+            return json.loads(text, strict=False)
+        except ValueError:
+            pass
+
+        cleaned = []
+        in_string = escaped = False
+        for ch in text:
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch in "}]":
+                while cleaned and cleaned[-1] in " \t\r\n":
+                    cleaned.pop()
+                if cleaned and cleaned[-1] == ",":
+                    cleaned.pop()
+            cleaned.append(ch)
+        return json.loads("".join(cleaned), strict=False)
+
+    def final(self) -> Optional[Any]:
+        """
+        Value of the top-level document (tolerates fences, prose and
+        trailing commas); None until it has closed, so a cut-off reply
+        never passes as complete
+        """
+        if self._done < 0:
+            return None
+        try:
+            return self._loads(self.buffer[self._start:self._done])
+        except ValueError:
+            return None
+
+
+def parse_json(text: str) -> Optional[Any]:
+    """Tolerant one-shot parse of model output"""
+    parser = IncrementalJSONParser()
+    parser.feed(text or "")
+    return parser.final()
+
+
+# ==================== GENERATOR ====================
+
+class StructuredGenerator:
+    """
+    Schema-driven generation on top of ModelClient
+    - the schema is appended to the system prompt
+    - output is parsed tolerantly and validated
+    - invalid output gets ONE repair call that sees only the bad JSON and
+      the violations (not the whole original prompt)
+    """
+
+    REPAIR_MODEL = "openai/gpt-4o-mini"
+
+    def __init__(self, model_client=None):
+        self.model_client = model_client or get_model_client()
+        self.stats = {}  # call_site -> {"calls", "valid", "repaired", "failed"}
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def with_schema(messages: List[Dict[str, str]], schema: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Copy of messages with the schema instructions on the system message"""
+        messages = [dict(message) for message in messages]
+        if messages and messages[0].get("role") == "system":
+            messages[0]["content"] = f"{messages[0]['content']}\n\n{schema_prompt(schema)}"
+        else:
+            messages.insert(0, {"role": "system", "content": schema_prompt(schema)})
+        return messages
+
+    def generate(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        schema: Dict[str, Any],
+        call_site: str = "default",
+        default: Any = None,
+        deterministic: bool = False,
+        key_id: str = None,
+        lease_held: bool = False,
+        **params
+    ) -> Any:
+        """
+        Generate a value matching schema, or default when it can't be repaired
+
+        key_id/lease_held pin the first call like ModelClient.chat; the
+        repair call always takes a fresh lease
+        """
+        self._count(call_site, "calls")
+        prompt = self.with_schema(messages, schema)
+
+        text = self.model_client.chat(
+            model, prompt, call_site=call_site, deterministic=deterministic,
+            key_id=key_id, lease_held=lease_held, **params
+        )
+        value = parse_json(text)
+
+        errors = validate(value, schema) if value is not None else ["$: no complete JSON document found"]
+        if not errors:
+            self._count(call_site, "valid")
+            return value
+
+        logger.debug(f"Structured output for {call_site} invalid: {errors[:3]}")
+        repaired = self._repair(text, schema, errors, call_site)
+        if repaired is not None:
+            self._count(call_site, "repaired")
+            return repaired
+
+        self._count(call_site, "failed")
+        logger.warning(f"⚠️ Structured output for {call_site} failed validation after repair")
+        return default
+
+    def _repair(self, text: str, schema: Dict[str, Any], errors: List[str], call_site: str) -> Optional[Any]:
+        """One targeted fix: the model only sees the bad JSON and what's wrong with it"""
+        if not text:
+            return None
+
+        messages = [
+            {
+                "role": "system",
+                "content": "You fix JSON so it matches a schema. Keep every valid value unchanged, "
+                           "fill missing fields sensibly, and reply with the corrected JSON only.\n\n"
+                           + schema_prompt(schema)
+            },
+            {
+                "role": "user",
+                "content": "Problems:\n" + "\n".join(f"- {e}" for e in errors[:10]) + f"\n\nJSON:\n{text[:6000]}"
+            }
+        ]
+        try:
+            fixed = self.model_client.chat(
+                self.REPAIR_MODEL, messages, call_site=f"{call_site}:repair", deterministic=True
+            )
+        except Exception as e:
+            logger.debug(f"Repair call for {call_site} failed: {e}")
+            return None
+
+        value = parse_json(fixed)
+        return value if value is not None and not validate(value, schema) else None
+
+    def _count(self, call_site: str, field: str):
+        with self._stats_lock:
+            stats = self.stats.setdefault(
+                call_site, {"calls": 0, "valid": 0, "repaired": 0, "failed": 0}
+            )
+            stats[field] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per call site outcomes (failed = caller fell back to its default)"""
+        with self._stats_lock:
+            return {site: dict(counts) for site, counts in self.stats.items()}
+
+
+# Global instance
+_structured_generator = None
+
+
+def get_structured_generator() -> StructuredGenerator:
+    """Get global structured output generator"""
+    global _structured_generator
+    if _structured_generator is None:
+        _structured_generator = StructuredGenerator()
+    return _structured_generator
@@ -0,0 +1,118 @@
+"""
+TTL Cache - Bounded in-process LRU with per-entry expiry
+Shared building block for the visual, model-result and state caches
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with per-entry TTL
+    - Least recently used entries are evicted when full
+    - Pinned entries are only evicted once no unpinned entries remain
+    """
+
+    _MISSING = object()
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 3600):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()  # key -> (expires_at, pinned, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get value if present and not expired"""
+        with self._lock:
+            item = self._data.get(key, self._MISSING)
+            if item is self._MISSING:
+                self.misses += 1
+                return default
+
+            expires_at, _, value = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, self._MISSING) is not self._MISSING
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, pinned: bool = False):
+        """Store value; ttl=None uses the default, ttl=0 never expires"""
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+
+        with self._lock:
+            self._data[key] = (expires_at, pinned, value)
+            self._data.move_to_end(key)
+            self._evict()
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._data.pop(key, self._MISSING) is not self._MISSING
+
+    def ttl(self, key: Hashable) -> Optional[float]:
+        """Remaining seconds for key (None if missing or no expiry)"""
+        with self._lock:
+            item = self._data.get(key)
+            if not item or item[0] is None:
+                return None
+            return max(0.0, item[0] - time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry, returns number removed"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, (exp, _, _) in self._data.items() if exp is not None and exp <= now]
+            for key in expired:
+                del self._data[key]
+        return len(expired)
+
+    def items(self):
+        """Snapshot of live (key, value) pairs"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (k, v) for k, (exp, _, v) in self._data.items()
+                if exp is None or exp > now
+            ]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _evict(self):
+        # Least recently used unpinned (or expired) entry goes first
+        now = time.monotonic()
+        while len(self._data) > self.max_entries:
+            victim = next(iter(self._data))
+            for key, (expires_at, pinned, _) in self._data.items():
+                if not pinned or (expires_at is not None and expires_at <= now):
+                    victim = key
+                    break
+            del self._data[victim]
+            self.evictions += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
@@ -7,6 +7,10 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 
+from src.core.event_bus import Event, EventType, get_event_bus
+from src.core.rate_limits import get_rate_limiter
+from src.core.state_store import get_state_store
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,8 +18,18 @@ class UserManager:
     """Manage users, subscriptions, memories, and usage limits"""
     
     def __init__(self):
-        # Use in-memory storage for now (will add Redis later)
+        # Users live on the shared state store; _users is this process's copy
+        self.store = get_state_store()
         self._users = {}
+        
+        # Message/media quotas are shared rate-limit counters
+        self.limits = get_rate_limiter()
+        
+        # Other processes (website, bot replicas) save a change, then publish
+        # it here; this process reloads its copy from the store
+        self.events = get_event_bus()
+        for event_type in (EventType.USER_UPGRADED, EventType.USAGE_CHANGED, EventType.MEMORY_ADDED):
+            self.events.subscribe(event_type, self._on_user_changed, remote_only=True)
     
     TIERS = {
         "free": {
@@ -26,6 +40,7 @@ class UserManager:
             "memory_slots": 50,
             "proactive_messages": True,  # Now enabled for free!
             "proactive_limit": 3,  # 3 proactive messages per day
+            "speculative_branches_per_day": 15,  # Pre-generated story branches
             "voice_calls": False
         },
         "basic": {
@@ -37,6 +52,7 @@ class UserManager:
             "memory_slots": 100,
             "proactive_messages": True,
             "proactive_limit": 10,  # 10 per day
+            "speculative_branches_per_day": 150,
             "voice_calls": False
         },
         "prime": {
@@ -48,6 +64,7 @@ class UserManager:
             "memory_slots": 500,
             "proactive_messages": True,
             "proactive_limit": 999999,  # Unlimited
+            "speculative_branches_per_day": 600,
             "voice_calls": True
         },
         "lifetime": {
@@ -59,13 +76,36 @@ class UserManager:
             "memory_slots": 999999,
             "proactive_messages": True,
             "proactive_limit": 999999,  # Unlimited
+            "speculative_branches_per_day": 999999,
             "voice_calls": True
         }
     }
     
+    # action -> (tier limit, period, usage field, message when used up)
+    QUOTAS = {
+        "message": ("messages_per_day", "day", "messages_today",
+                    "Daily limit reached ({limit} messages). Upgrade to continue!"),
+        "image": ("images_per_month", "month", "images_this_month",
+                  "Monthly limit reached ({limit} images). Upgrade for more!"),
+        "video": ("videos_per_month", "month", "videos_this_month",
+                  "Monthly limit reached ({limit} videos). Upgrade for more!"),
+        "audio": ("audio_per_month", "month", "audio_this_month",
+                  "Monthly limit reached ({limit} audio). Upgrade for more!")
+    }
+    
+    @staticmethod
+    def _user_key(user_id: int) -> str:
+        return f"user:{user_id}"
+    
     def get_user(self, user_id: int) -> Dict[str, Any]:
-        """Get user data"""
-        if user_id not in self._users:
+        """Get user data (loaded from the shared store on a local miss)"""
+        if user_id in self._users:
+            return self._users[user_id]
+        
+        user = self.store.get(self._user_key(user_id))
+        if user is not None:
+            self._users[user_id] = user
+        else:
             # Special unlimited access for owner
             tier = "lifetime" if user_id == 5554723733 else "free"
             
@@ -95,6 +135,7 @@ class UserManager:
     def update_user(self, user_id: int, data: Dict[str, Any]):
         """Update user data"""
         self._users[user_id] = data
+        self.store.set(self._user_key(user_id), data)
     
     def upgrade_subscription(self, user_id: int, tier: str, duration_days: int = 30):
         """Upgrade user subscription"""
@@ -108,56 +149,37 @@ class UserManager:
             user["subscription_expires"] = expires.isoformat()
         
         self.update_user(user_id, user)
+        self.events.publish(
+            EventType.USER_UPGRADED, user_id,
+            tier=tier, subscription_expires=user["subscription_expires"]
+        )
         logger.info(f"✅ User {user_id} upgraded to {tier}")
     
     def check_limit(self, user_id: int, action: str) -> tuple[bool, str]:
-        """Check if user can perform action"""
+        """Check if user can perform action (quota actions use it up)"""
         user = self.get_user(user_id)
-        tier = user["tier"]
-        limits = self.TIERS[tier]
-        usage = user["usage"]
-        
-        # Reset daily/monthly counters if needed
-        last_reset = datetime.fromisoformat(usage["last_reset"])
-        now = datetime.now()
-        
-        if now.date() > last_reset.date():
-            usage["messages_today"] = 0
+        limits = self.TIERS[user["tier"]]
         
-        if now.month != last_reset.month:
-            usage["images_this_month"] = 0
-            usage["videos_this_month"] = 0
-            usage["audio_this_month"] = 0
-        
-        usage["last_reset"] = now.isoformat()
-        
-        # Check limits
-        if action == "message":
-            if usage["messages_today"] >= limits["messages_per_day"]:
-                return False, f"Daily limit reached ({limits['messages_per_day']} messages). Upgrade to continue!"
-            usage["messages_today"] += 1
-        
-        elif action == "image":
-            if usage["images_this_month"] >= limits["images_per_month"]:
-                return False, f"Monthly limit reached ({limits['images_per_month']} images). Upgrade for more!"
-            usage["images_this_month"] += 1
+        if action == "nsfw":
+            if not limits["nsfw_enabled"]:
+                return False, "NSFW content requires Prime or Lifetime subscription!"
+            return True, "OK"
         
-        elif action == "video":
-            if usage["videos_this_month"] >= limits["videos_per_month"]:
-                return False, f"Monthly limit reached ({limits['videos_per_month']} videos). Upgrade for more!"
-            usage["videos_this_month"] += 1
+        if action not in self.QUOTAS:
+            return True, "OK"
         
-        elif action == "audio":
-            if usage["audio_this_month"] >= limits["audio_per_month"]:
-                return False, f"Monthly limit reached ({limits['audio_per_month']} audio). Upgrade for more!"
-            usage["audio_this_month"] += 1
+        limit_name, period, usage_field, denied = self.QUOTAS[action]
+        limit = limits[limit_name]
+        allowed, remaining = self.limits.consume(f"usage_{action}", user_id, limit, period)
         
-        elif action == "nsfw":
-            if not limits["nsfw_enabled"]:
-                return False, "NSFW content requires Prime or Lifetime subscription!"
+        # usage mirrors the counter for display
+        usage = user["usage"]
+        usage[usage_field] = limit - remaining
+        if not allowed:
+            return False, denied.format(limit=limit)
         
-        user["usage"] = usage
         self.update_user(user_id, user)
+        self.events.publish(EventType.USAGE_CHANGED, user_id, action=action, usage=dict(usage))
         return True, "OK"
     
     def add_memory(self, user_id: int, memory: str, category: str = "general"):
@@ -179,6 +201,7 @@ class UserManager:
             user["memories"] = user["memories"][-max_memories:]
         
         self.update_user(user_id, user)
+        self.events.publish(EventType.MEMORY_ADDED, user_id, memory=memory_entry)
     
     def get_memories(self, user_id: int, limit: int = 10) -> list:
         """Get user memories"""
@@ -199,6 +222,18 @@ class UserManager:
     def get_tier_info(self, tier: str) -> Dict[str, Any]:
         """Get tier information"""
         return self.TIERS.get(tier, self.TIERS["free"])
+    
+    # ==================== REMOTE EVENTS ====================
+    
+    def _on_user_changed(self, event: Event):
+        """Another process saved this user (e.g. website payment): reload it"""
+        user = self.store.get(self._user_key(event.user_id))
+        if user is not None:
+            self._users[event.user_id] = user
+        else:
+            self._users.pop(event.user_id, None)
+        if event.type == EventType.USER_UPGRADED:
+            logger.info(f"✅ User {event.user_id} upgraded to {event.data['tier']} (remote)")
 
 
 # Global instance
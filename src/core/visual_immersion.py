@@ -1,13 +1,17 @@
 """
 Visual Immersion Engine - Generates matching visuals for every advanced mode interaction
-Uses fast image generation, GIF library fallback, and Redis caching
+Uses fast image generation, GIF library fallback, and two-tier caching
 """
 
 import logging
 import asyncio
 import hashlib
-from typing import Optional, Dict, List
-from datetime import timedelta
+import time
+from typing import Optional, Dict, List, Any
+from src.core.ttl_cache import TTLCache
+from src.core.circuit_breaker import CircuitOpenError
+from src.core.model_client import get_model_client
+from src.core.async_redis import get_async_redis_manager
 
 logger = logging.getLogger(__name__)
 
@@ -17,15 +21,32 @@ class VisualImmersionEngine:
     Generates or retrieves matching visuals for immersive experiences
     - Fast image generation (2-3 seconds)
     - GIF library fallback
-    - Redis caching for performance
-    - CDN integration
+    - Two-tier cache: in-process LRU (L1) in front of Redis (L2)
+    - Concurrent misses for the same scene share one generation
     """
     
-    def __init__(self, bytez_client=None, redis_manager=None):
-        self.bytez = bytez_client
-        self.redis = redis_manager
+    SCENE_TTL = 86400  # 24 hours
+    PORTRAIT_TTL = 604800  # 7 days
+    
+    def __init__(self, model_client=None, redis_manager=None):
+        self.model_client = model_client or get_model_client()
+        self.redis = redis_manager or get_async_redis_manager()
         self.generation_timeout = 3.0  # 3 second max for image generation
         
+        # L1 cache (L2 is Redis)
+        self.local_cache = TTLCache(max_entries=512, default_ttl=self.SCENE_TTL)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {
+            "l1_hits": 0,
+            "l2_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "generations": 0,
+            "generation_failures": 0,
+            "timeouts": 0,
+            "generation_seconds_total": 0.0
+        }
+        
         # GIF library categories
         self.gif_library = self._initialize_gif_library()
         
@@ -127,8 +148,8 @@ class VisualImmersionEngine:
         Returns image URL or GIF URL within 3 seconds
         
         Strategy:
-        1. Check cache (100ms)
-        2. Try fast generation (3s timeout)
+        1. Check L1, then Redis
+        2. Try fast generation (3s timeout), shared by concurrent callers
         3. Use GIF fallback (instant)
         """
         try:
@@ -136,29 +157,31 @@ class VisualImmersionEngine:
             cache_key = self._generate_cache_key(scene_description, mood)
             
             # Check cache first (unless force_generate)
-            if not force_generate and self.redis:
+            if not force_generate:
                 cached_url = await self._get_from_cache(cache_key)
                 if cached_url:
                     logger.info(f"✅ Visual cache hit for: {mood}")
                     return cached_url
             
+            self.stats["misses"] += 1
+            
             # Try fast image generation
-            if self.bytez:
+            if self.model_client:
                 try:
+                    task = self._get_generation_task(cache_key, scene_description, mood)
+                    # Shield so a timed-out caller doesn't cancel the shared generation;
+                    # a late result still lands in the cache for the next request
                     image_url = await asyncio.wait_for(
-                        self._generate_image(scene_description, mood),
+                        asyncio.shield(task),
                         timeout=self.generation_timeout
                     )
                     
                     if image_url:
-                        # Cache the generated image
-                        if self.redis:
-                            await self._save_to_cache(cache_key, image_url)
-                        
                         logger.info(f"✅ Generated visual for: {mood}")
                         return image_url
                         
                 except asyncio.TimeoutError:
+                    self.stats["timeouts"] += 1
                     logger.warning(f"⚠️ Image generation timeout, using GIF fallback")
                 except Exception as e:
                     logger.error(f"Image generation error: {e}")
@@ -172,6 +195,49 @@ class VisualImmersionEngine:
             logger.error(f"Error in get_scene_visual: {e}")
             return self.get_fallback_gif("neutral")
     
+    def _get_generation_task(
+        self,
+        cache_key: str,
+        scene_description: str,
+        mood: str,
+        ttl: int = SCENE_TTL,
+        pinned: bool = False
+    ) -> asyncio.Task:
+        """Returns the in-flight generation for this key, starting one if needed"""
+        task = self._inflight.get(cache_key)
+        if task and not task.done():
+            self.stats["coalesced"] += 1
+            return task
+        
+        task = asyncio.create_task(
+            self._generate_and_cache(cache_key, scene_description, mood, ttl, pinned)
+        )
+        self._inflight[cache_key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        return task
+    
+    async def _generate_and_cache(
+        self,
+        cache_key: str,
+        scene_description: str,
+        mood: str,
+        ttl: int,
+        pinned: bool
+    ) -> Optional[str]:
+        """Runs one generation, records latency and caches the result"""
+        started = time.monotonic()
+        image_url = await self._generate_image(scene_description, mood)
+        
+        self.stats["generations"] += 1
+        self.stats["generation_seconds_total"] += time.monotonic() - started
+        
+        if image_url:
+            await self._save_to_cache(cache_key, image_url, ttl=ttl, pinned=pinned)
+        else:
+            self.stats["generation_failures"] += 1
+        
+        return image_url
+    
     async def _generate_image(
         self, 
         scene_description: str, 
@@ -182,15 +248,18 @@ class VisualImmersionEngine:
             # Create optimized prompt for fast generation
             prompt = self._create_image_prompt(scene_description, mood)
             
-            # Use Flux-schnell for 2-3 second generation
-            model = self.bytez.model("black-forest-labs/flux-schnell")
-            
-            result = model.run({
-                "prompt": prompt,
-                "width": 1024,
-                "height": 768,
-                "num_inference_steps": 4,  # Fast generation
-            })
+            # Use Flux-schnell for 2-3 second generation (off the event loop)
+            result = await asyncio.to_thread(
+                self.model_client.run,
+                "black-forest-labs/flux-schnell",
+                {
+                    "prompt": prompt,
+                    "width": 1024,
+                    "height": 768,
+                    "num_inference_steps": 4,  # Fast generation
+                },
+                call_site="scene_visual"
+            )
             
             # Extract image URL
             if hasattr(result, 'output'):
@@ -201,6 +270,9 @@ class VisualImmersionEngine:
             
             return None
             
+        except CircuitOpenError:
+            # Breaker open - straight to the GIF fallback
+            return None
         except Exception as e:
             logger.error(f"Flux image generation error: {e}")
             return None
@@ -252,27 +324,25 @@ class VisualImmersionEngine:
         character_desc: str,
         character_name: str
     ) -> Optional[str]:
-        """Generates and caches character portraits"""
+        """Generates and caches character portraits (pinned, 7 day TTL)"""
         try:
             # Check cache
             cache_key = f"character:{character_name}"
             
-            if self.redis:
-                cached_url = await self._get_from_cache(cache_key)
-                if cached_url:
-                    return cached_url
+            cached_url = await self._get_from_cache(cache_key)
+            if cached_url:
+                return cached_url
+            
+            self.stats["misses"] += 1
             
             # Generate portrait
             prompt = f"portrait of {character_desc}, professional headshot, detailed face, high quality, 8k"
             
-            if self.bytez:
-                image_url = await self._generate_image(prompt, "neutral")
-                
-                if image_url and self.redis:
-                    # Cache character portrait for 7 days
-                    await self._save_to_cache(cache_key, image_url, ttl=604800)
-                
-                return image_url
+            if self.model_client:
+                task = self._get_generation_task(
+                    cache_key, prompt, "neutral", ttl=self.PORTRAIT_TTL, pinned=True
+                )
+                return await asyncio.shield(task)
             
             return None
             
@@ -287,36 +357,62 @@ class VisualImmersionEngine:
         return f"visual:{hash_obj.hexdigest()}"
     
     async def _get_from_cache(self, cache_key: str) -> Optional[str]:
-        """Retrieves visual URL from Redis cache"""
+        """Retrieves visual URL from L1, then Redis (promoting hits to L1)"""
+        cached_url = self.local_cache.get(cache_key)
+        if cached_url:
+            self.stats["l1_hits"] += 1
+            return cached_url
+        
         try:
-            if self.redis and hasattr(self.redis, 'get'):
-                return await self.redis.get(cache_key)
-            return None
+            if self.redis:
+                cached_url = await self.redis.get(cache_key)
+                if cached_url:
+                    self.stats["l2_hits"] += 1
+                    pinned = cache_key.startswith("character:")
+                    ttl = self.PORTRAIT_TTL if pinned else self.SCENE_TTL
+                    self.local_cache.set(cache_key, cached_url, ttl=ttl, pinned=pinned)
+                    return cached_url
         except Exception as e:
             logger.debug(f"Cache get error: {e}")
-            return None
+        
+        return None
     
     async def _save_to_cache(
         self, 
         cache_key: str, 
         visual_url: str,
-        ttl: int = 86400  # 24 hours default
+        ttl: int = SCENE_TTL,
+        pinned: bool = False
     ):
-        """Saves visual URL to Redis cache"""
+        """Saves visual URL to L1 and Redis"""
+        self.local_cache.set(cache_key, visual_url, ttl=ttl, pinned=pinned)
+        
         try:
-            if self.redis and hasattr(self.redis, 'set'):
-                await self.redis.set(cache_key, visual_url, ex=ttl)
+            if self.redis:
+                await self.redis.set(cache_key, visual_url, expire=ttl)
         except Exception as e:
             logger.debug(f"Cache save error: {e}")
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counts and average generation latency"""
+        stats = dict(self.stats)
+        lookups = stats["l1_hits"] + stats["l2_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["l1_hits"] + stats["l2_hits"]) / lookups, 3) if lookups else 0.0
+        stats["avg_generation_seconds"] = (
+            round(stats["generation_seconds_total"] / stats["generations"], 3)
+            if stats["generations"] else 0.0
+        )
+        stats["l1"] = self.local_cache.get_stats()
+        return stats
 
 
 # Global instance
 _visual_immersion_engine = None
 
 
-def get_visual_immersion_engine(bytez_client=None, redis_manager=None):
+def get_visual_immersion_engine(model_client=None, redis_manager=None):
     """Get global visual immersion engine instance"""
     global _visual_immersion_engine
     if _visual_immersion_engine is None:
-        _visual_immersion_engine = VisualImmersionEngine(bytez_client, redis_manager)
+        _visual_immersion_engine = VisualImmersionEngine(model_client, redis_manager)
     return _visual_immersion_engine
@@ -5,34 +5,59 @@ Reminders, Advice, Games, Critical Thinking, and More!
 
 import logging
 import json
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
-from bytez import Bytez
 from src.core.config import get_config
+from src.core.model_client import get_model_client
+from src.core.event_bus import EventType, get_event_bus
+from src.core.rate_limits import get_rate_limiter
+from src.core.state_store import get_state_store
 
 logger = logging.getLogger(__name__)
 
 
 class CoolFeatures:
-    """Cool and fun features for the bot"""
+    """
+    Cool and fun features for the bot
+    
+    Reminders live on the shared state store (one list per user); every
+    bot replica checks them, and each due occurrence is claimed before it
+    is sent so exactly one replica sends it
+    """
+    
+    REMINDER_USERS_KEY = "reminders:users"
+    # How long a claimed occurrence stays claimed (longer than any check)
+    REMINDER_CLAIM_SECONDS = 86400
     
     def __init__(self):
         self.config = get_config()
-        self.bytez = Bytez(self.config.bytez_key_1)
-        self.reminders = {}  # user_id -> list of reminders
+        self.model_client = get_model_client()
+        self.store = get_state_store()
+        self.limits = get_rate_limiter()
         self.daily_challenges = {}  # user_id -> challenge
+        self._reminder_lock = threading.Lock()
+        self.events = get_event_bus()
     
     # ==================== REMINDERS ====================
     
+    @staticmethod
+    def _reminders_key(user_id: int) -> str:
+        return f"reminders:{user_id}"
+    
+    def _load_reminders(self, user_id: int) -> List[Dict]:
+        return self.store.get(self._reminders_key(user_id)) or []
+    
+    def reminder_users(self) -> List[int]:
+        """Users that have (or had) reminders, across all replicas"""
+        return self.store.get(self.REMINDER_USERS_KEY) or []
+    
     def set_reminder(self, user_id: int, reminder_text: str, when: str, category: str = "general", recurring: str = None) -> Dict[str, Any]:
         """Set a reminder for the user with category and recurrence support"""
         try:
             # Parse when (e.g., "in 1 hour", "tomorrow", "in 30 minutes")
             remind_time = self._parse_time(when)
             
-            if user_id not in self.reminders:
-                self.reminders[user_id] = []
-            
             # Category icons
             category_icons = {
                 "health": "💊",
@@ -41,18 +66,23 @@ class CoolFeatures:
                 "general": "⏰"
             }
             
-            reminder = {
-                "id": len(self.reminders[user_id]) + 1,
-                "text": reminder_text,
-                "time": remind_time.isoformat(),
-                "created": datetime.now().isoformat(),
-                "completed": False,
-                "category": category,
-                "icon": category_icons.get(category, "⏰"),
-                "recurring": recurring  # "daily", "weekly", "monthly", None
-            }
+            with self._reminder_lock:
+                reminders = self._load_reminders(user_id)
+                reminder = {
+                    "id": max((r["id"] for r in reminders), default=0) + 1,
+                    "text": reminder_text,
+                    "time": remind_time.isoformat(),
+                    "created": datetime.now().isoformat(),
+                    "completed": False,
+                    "category": category,
+                    "icon": category_icons.get(category, "⏰"),
+                    "recurring": recurring  # "daily", "weekly", "monthly", None
+                }
+                reminders.append(reminder)
+                self.store.set(self._reminders_key(user_id), reminders)
+                self._track_reminder_user(user_id)
             
-            self.reminders[user_id].append(reminder)
+            self.events.publish(EventType.REMINDER_SCHEDULED, user_id, reminder=reminder)
             
             recurring_text = ""
             if recurring:
@@ -70,12 +100,15 @@ class CoolFeatures:
                 "error": str(e)
             }
     
+    def _track_reminder_user(self, user_id: int):
+        users = self.reminder_users()
+        if user_id not in users:
+            users.append(user_id)
+            self.store.set(self.REMINDER_USERS_KEY, users)
+    
     def get_reminders(self, user_id: int, category: str = None) -> List[Dict]:
         """Get all active reminders for user, optionally filtered by category"""
-        if user_id not in self.reminders:
-            return []
-        
-        active = [r for r in self.reminders[user_id] if not r["completed"]]
+        active = [r for r in self._load_reminders(user_id) if not r["completed"]]
         
         if category:
             active = [r for r in active if r.get("category") == category]
@@ -84,10 +117,7 @@ class CoolFeatures:
     
     def get_reminders_by_category(self, user_id: int) -> Dict[str, List[Dict]]:
         """Get reminders grouped by category"""
-        if user_id not in self.reminders:
-            return {}
-        
-        active = [r for r in self.reminders[user_id] if not r["completed"]]
+        active = [r for r in self._load_reminders(user_id) if not r["completed"]]
         
         by_category = {}
         for reminder in active:
@@ -99,17 +129,21 @@ class CoolFeatures:
         return by_category
     
     def check_due_reminders(self, user_id: int) -> List[Dict]:
-        """Check for reminders that are due"""
-        if user_id not in self.reminders:
-            return []
-        
+        """Claim and return reminders that are due (each occurrence goes to one replica)"""
         now = datetime.now()
         due = []
         
-        for reminder in self.reminders[user_id]:
+        for reminder in self._load_reminders(user_id):
             if not reminder["completed"]:
                 remind_time = datetime.fromisoformat(reminder["time"])
                 if now >= remind_time:
+                    # Only the replica that claims this occurrence sends it
+                    claimed, _ = self.limits.acquire_cooldown(
+                        "reminder", f"{user_id}:{reminder['id']}:{reminder['time']}", self.REMINDER_CLAIM_SECONDS
+                    )
+                    if not claimed:
+                        continue
+                    
                     # Handle recurring reminders
                     if reminder.get("recurring"):
                         # Schedule next occurrence
@@ -129,6 +163,13 @@ class CoolFeatures:
                     
                     due.append(reminder)
         
+        if due:
+            # Write back onto the latest list so reminders set meanwhile survive
+            updated = {r["id"]: r for r in due}
+            with self._reminder_lock:
+                latest = self._load_reminders(user_id)
+                self.store.set(self._reminders_key(user_id), [updated.get(r["id"], r) for r in latest])
+        
         return due
     
     def _parse_time(self, when: str) -> datetime:
@@ -184,12 +225,14 @@ Be like a wise friend who genuinely cares."""
                 {"role": "user", "content": f"I need advice about: {topic}"}
             ]
             
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(messages, temperature=0.8)
-            
-            if hasattr(result, 'output') and result.output:
-                return result.output.get('content', 'Let me think about that...')
-            return str(result)
+            return self.model_client.chat(
+                "openai/gpt-4o-mini",
+                messages,
+                call_site="advice",
+                coalesce=True,
+                default='Let me think about that...',
+                temperature=0.8
+            )
             
         except Exception as e:
             logger.error(f"Advice error: {e}")
@@ -213,12 +256,14 @@ Be analytical but warm. Help them see things clearly."""
                 {"role": "user", "content": f"Help me think through this: {problem}"}
             ]
             
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(messages, temperature=0.7)
-            
-            if hasattr(result, 'output') and result.output:
-                return result.output.get('content', 'Let me help you think through this...')
-            return str(result)
+            return self.model_client.chat(
+                "openai/gpt-4o-mini",
+                messages,
+                call_site="critical_thinking",
+                coalesce=True,
+                default='Let me help you think through this...',
+                temperature=0.7
+            )
             
         except Exception as e:
             logger.error(f"Critical thinking error: {e}")
@@ -374,12 +419,14 @@ Be supportive and help them feel confident in their choice."""
                 {"role": "user", "content": f"Help me choose between: {', '.join(options)}"}
             ]
             
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(messages, temperature=0.7)
-            
-            if hasattr(result, 'output') and result.output:
-                return result.output.get('content', 'Let me help you think through this...')
-            return str(result)
+            return self.model_client.chat(
+                "openai/gpt-4o-mini",
+                messages,
+                call_site="help_decide",
+                coalesce=True,
+                default='Let me help you think through this...',
+                temperature=0.7
+            )
             
         except Exception as e:
             logger.error(f"Decision help error: {e}")
@@ -4,12 +4,14 @@ AI-powered life simulation where users achieve their goals
 """
 
 import logging
-import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
 from datetime import datetime
-from bytez import Bytez
 from src.core.config import get_config
-from src.core.redis_manager import get_redis_manager
+from src.core.state_store import get_state_store
+from src.core.model_client import get_model_client
+from src.core.structured_output import get_structured_generator
 from src.features.mode_engine import get_mode_manager
 
 logger = logging.getLogger(__name__)
@@ -19,6 +21,11 @@ class DreamLifeEngine:
     """
     Life simulation engine for achieving dreams
     Extracts goals, creates milestones, and simulates progress
+    
+    Bootstrap is a pipeline: extraction and the opening scenario run
+    concurrently (each on its own key lease), milestones start as soon as
+    extraction is done and are attached in the background, so the user
+    sees the first scenario after roughly one model call
     """
     
     GOAL_TYPES = {
@@ -32,16 +39,72 @@ class DreamLifeEngine:
         "personal": {"emoji": "🌟", "name": "Personal Growth"}
     }
     
+    # Structured output schemas (one JSON reply per call)
+    DREAM_SCHEMA = {
+        "type": "object",
+        "required": ["dream", "goal_type", "why", "timeline", "key_elements"],
+        "properties": {
+            "dream": {"type": "string", "minLength": 1, "description": "Clear, specific statement of what they want to achieve"},
+            "goal_type": {"type": "string", "enum": list(GOAL_TYPES)},
+            "why": {"type": "string", "description": "Their motivation and why this matters to them"},
+            "timeline": {"type": "string", "description": "Realistic timeframe, e.g. \"6 months\", \"2 years\""},
+            "key_elements": {"type": "array", "items": {"type": "string"}, "minItems": 3, "maxItems": 5}
+        }
+    }
+    MILESTONES_SCHEMA = {
+        "type": "object",
+        "required": ["milestones"],
+        "properties": {
+            "milestones": {
+                "type": "array",
+                "minItems": 5,
+                "maxItems": 7,
+                "items": {
+                    "type": "object",
+                    "required": ["title", "description", "estimated_time"],
+                    "properties": {
+                        "title": {"type": "string", "minLength": 1},
+                        "description": {"type": "string", "description": "What needs to be achieved"},
+                        "estimated_time": {"type": "string"}
+                    }
+                }
+            }
+        }
+    }
+    SCENARIO_SCHEMA = {
+        "type": "object",
+        "required": ["scenario", "actions"],
+        "properties": {
+            "scenario": {"type": "string", "minLength": 1, "description": "First-person narration, 2-3 paragraphs"},
+            "actions": {"type": "array", "items": {"type": "string"}, "minItems": 3, "maxItems": 3}
+        }
+    }
+    CONSEQUENCE_SCHEMA = {
+        "type": "object",
+        "required": ["consequence", "milestone_completed"],
+        "properties": {
+            "consequence": {"type": "string", "minLength": 1, "description": "What happens as a result, 2 paragraphs"},
+            "milestone_completed": {"type": "boolean", "description": "Whether this completes the current milestone"}
+        }
+    }
+    
     def __init__(self):
         self.config = get_config()
-        self.redis = get_redis_manager()
+        self.store = get_state_store()
         self.mode_manager = get_mode_manager()
+        self.model_client = get_model_client()
+        self.structured = get_structured_generator()
         
-        # Initialize Bytez client
-        if hasattr(self.config, 'bytez_key_1') and self.config.bytez_key_1:
-            self.bytez = Bytez(self.config.bytez_key_1)
-        else:
+        if not self.model_client.clients:
             raise ValueError("Bytez API key not configured")
+        
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.config.dreamlife_workers,
+            thread_name_prefix="dreamlife"
+        )
+        # user_id -> milestones Future still being generated
+        self._pending_milestones: Dict[str, Future] = {}
+        self._pending_lock = threading.Lock()
     
     def extract_dream(self, user_message: str) -> Dict[str, Any]:
         """
@@ -66,17 +129,7 @@ Extract and structure their dream into:
 2. GOAL_TYPE: One of: career, fitness, relationship, wealth, creative, education, lifestyle, personal
 3. WHY: Their motivation and why this matters to them
 4. TIMELINE: Realistic timeframe (e.g., "6 months", "2 years", "5 years")
-5. KEY_ELEMENTS: 3-5 specific things they mentioned or that are important
-
-Format your response as:
-DREAM: [Clear statement]
-GOAL_TYPE: [type]
-WHY: [Their motivation]
-TIMELINE: [Timeframe]
-KEY_ELEMENTS:
-- [Element 1]
-- [Element 2]
-- [Element 3]"""
+5. KEY_ELEMENTS: 3-5 specific things they mentioned or that are important"""
                 },
                 {
                     "role": "user",
@@ -84,19 +137,15 @@ KEY_ELEMENTS:
                 }
             ]
             
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(messages)
-            
-            # Extract content
-            if hasattr(result, 'output') and result.output:
-                content = result.output.get('content', '')
-            elif isinstance(result, dict):
-                content = result.get('content', str(result))
-            else:
-                content = str(result)
-            
-            # Parse response
-            parsed = self._parse_dream_extraction(content, user_message)
+            parsed = self.structured.generate(
+                "openai/gpt-4o-mini",
+                messages,
+                self.DREAM_SCHEMA,
+                call_site="extract_dream",
+                deterministic=True
+            )
+            if parsed is None:
+                raise ValueError("No valid dream extraction")
             
             logger.info(f"✅ Extracted dream: {parsed['dream'][:50]}...")
             
@@ -113,22 +162,53 @@ KEY_ELEMENTS:
                 "key_elements": ["Growth", "Achievement", "Success"]
             }
     
-    def create_simulation(self, user_id: str, dream: Dict[str, Any]) -> Dict[str, Any]:
+    def start_simulation(self, user_id: str, user_message: str) -> Dict[str, Any]:
+        """
+        Extract the dream and open its simulation in one pipeline
+        
+        Args:
+            user_id: Telegram user ID
+            user_message: User's description of their dream
+            
+        Returns:
+            Simulation creation result (milestones may still be generating)
+        """
+        try:
+            opening = self._executor.submit(self._generate_opening_scenario, user_message)
+            dream = self.extract_dream(user_message)
+            return self.create_simulation(user_id, dream, first_scenario=opening.result())
+            
+        except Exception as e:
+            logger.error(f"Error starting simulation for {user_id}: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    def create_simulation(
+        self,
+        user_id: str,
+        dream: Dict[str, Any],
+        first_scenario: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Create a life simulation based on extracted dream
         
         Args:
             user_id: Telegram user ID
             dream: Extracted dream information
+            first_scenario: Opening scenario if already generated
             
         Returns:
-            Simulation creation result
+            Simulation creation result (milestones may still be generating)
         """
         try:
             logger.info(f"Creating simulation for user {user_id}: {dream['dream'][:50]}...")
             
-            # Generate milestones
-            milestones = self._generate_milestones(dream)
+            # Milestones don't gate the first scenario
+            milestones = self._executor.submit(self._generate_milestones, dream)
+            if first_scenario is None:
+                first_scenario = self._generate_opening_scenario(dream["dream"])
             
             # Create initial simulation state
             dream_state = {
@@ -137,24 +217,25 @@ KEY_ELEMENTS:
                 "why": dream["why"],
                 "timeline": dream["timeline"],
                 "key_elements": dream["key_elements"],
-                "milestones": milestones,
+                "milestones": [],
+                "milestones_pending": True,
                 "current_milestone": 0,
                 "progress_percentage": 0,
-                "current_scenario": None,
+                "current_scenario": first_scenario,
                 "user_actions": [],
                 "achievements": [],
                 "started_at": datetime.now().isoformat()
             }
             
-            # Generate first scenario
-            first_scenario = self._generate_scenario(dream_state)
-            dream_state["current_scenario"] = first_scenario
-            
             # Save state
             state_key = f"mode:{user_id}:dreamlife:state"
-            current_state = self.redis.get(state_key) or {}
+            current_state = self.store.get(state_key) or {}
             current_state["dream"] = dream_state
-            self.redis.set(state_key, current_state)
+            self.store.set(state_key, current_state)
+            
+            with self._pending_lock:
+                self._pending_milestones[user_id] = milestones
+            milestones.add_done_callback(lambda _: self._attach_milestones(user_id, milestones))
             
             logger.info(f"✅ Created simulation for user {user_id}")
             
@@ -162,7 +243,7 @@ KEY_ELEMENTS:
                 "success": True,
                 "dream": dream["dream"],
                 "goal_type": dream["goal_type"],
-                "milestones_count": len(milestones),
+                "milestones_count": len(dream_state["milestones"]) or None,
                 "first_scenario": first_scenario
             }
             
@@ -173,6 +254,55 @@ KEY_ELEMENTS:
                 "error": str(e)
             }
     
+    def _attach_milestones(self, user_id: str, milestones: Future):
+        """Store finished milestones into the saved state (once per future)"""
+        with self._pending_lock:
+            if self._pending_milestones.get(user_id) is not milestones:
+                return
+            
+            state_key = f"mode:{user_id}:dreamlife:state"
+            current_state = self.store.get(state_key) or {}
+            dream_state = current_state.get("dream")
+            if dream_state and dream_state.get("milestones_pending"):
+                dream_state["milestones"] = milestones.result()
+                dream_state["milestones_pending"] = False
+                dream_state["progress_percentage"] = self.calculate_progress(dream_state)
+                self.store.set(state_key, current_state)
+            
+            del self._pending_milestones[user_id]
+    
+    def _await_milestones(self, user_id: str):
+        """
+        Block until the user's milestones (if still generating) are attached
+        
+        The bootstrap future only exists in the process that started the
+        simulation; after a restart or on another replica the milestones are
+        generated here instead
+        """
+        with self._pending_lock:
+            milestones = self._pending_milestones.get(user_id)
+        if milestones is not None:
+            milestones.result()
+            self._attach_milestones(user_id, milestones)
+            return
+        
+        state_key = f"mode:{user_id}:dreamlife:state"
+        current_state = self.store.get(state_key) or {}
+        dream_state = current_state.get("dream")
+        if not dream_state or not dream_state.get("milestones_pending"):
+            return
+        
+        logger.info(f"Generating orphaned milestones for user {user_id}")
+        dream_state["milestones"] = self._generate_milestones({
+            "dream": dream_state["dream_description"],
+            "goal_type": dream_state["goal_type"],
+            "timeline": dream_state["timeline"],
+            "key_elements": dream_state["key_elements"]
+        })
+        dream_state["milestones_pending"] = False
+        dream_state["progress_percentage"] = self.calculate_progress(dream_state)
+        self.store.set(state_key, current_state)
+    
     def process_action(self, user_id: str, action: str) -> Dict[str, Any]:
         """
         Process user's action in the simulation
@@ -185,6 +315,9 @@ KEY_ELEMENTS:
             Result of the action with consequences
         """
         try:
+            # Milestones from the bootstrap are needed from here on
+            self._await_milestones(user_id)
+            
             # Get current dream state
             dream_state = self.get_dream_state(user_id)
             
@@ -230,9 +363,9 @@ KEY_ELEMENTS:
             
             # Save updated state
             state_key = f"mode:{user_id}:dreamlife:state"
-            current_state = self.redis.get(state_key) or {}
+            current_state = self.store.get(state_key) or {}
             current_state["dream"] = dream_state
-            self.redis.set(state_key, current_state)
+            self.store.set(state_key, current_state)
             
             logger.info(f"✅ Processed action for user {user_id}")
             
@@ -255,8 +388,13 @@ KEY_ELEMENTS:
     def get_dream_state(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get current dream state for user"""
         try:
+            with self._pending_lock:
+                milestones = self._pending_milestones.get(user_id)
+            if milestones is not None and milestones.done():
+                self._attach_milestones(user_id, milestones)
+            
             state_key = f"mode:{user_id}:dreamlife:state"
-            state = self.redis.get(state_key)
+            state = self.store.get(state_key)
             
             if state and "dream" in state:
                 return state["dream"]
@@ -313,14 +451,7 @@ Create 5-7 progressive milestones that:
 2. Build on each other logically
 3. Cover the journey from start to goal
 4. Are specific and measurable
-5. Match the timeline
-
-Format each milestone as:
-MILESTONE X: [Title]
-DESCRIPTION: [What needs to be achieved]
-ESTIMATED_TIME: [How long this takes]
-
-Number them 1-7."""
+5. Match the timeline"""
                 },
                 {
                     "role": "user",
@@ -328,21 +459,24 @@ Number them 1-7."""
                 }
             ]
             
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(messages)
+            roadmap = self.structured.generate(
+                "openai/gpt-4o-mini",
+                messages,
+                self.MILESTONES_SCHEMA,
+                call_site="generate_milestones"
+            )
+            if roadmap is None:
+                raise ValueError("No valid milestone roadmap")
             
-            # Extract content
-            if hasattr(result, 'output') and result.output:
-                content = result.output.get('content', '')
-            elif isinstance(result, dict):
-                content = result.get('content', str(result))
-            else:
-                content = str(result)
-            
-            # Parse milestones
-            milestones = self._parse_milestones(content)
-            
-            return milestones
+            return [
+                {
+                    "id": i,
+                    "title": milestone["title"],
+                    "description": milestone["description"] or "Progress toward your goal",
+                    "completed": False
+                }
+                for i, milestone in enumerate(roadmap["milestones"], 1)
+            ]
             
         except Exception as e:
             logger.error(f"Error generating milestones: {e}")
@@ -355,6 +489,50 @@ Number them 1-7."""
                 {"id": 5, "title": "Achieving Success", "description": "Reach your goal", "completed": False}
             ]
     
+    def _generate_opening_scenario(self, dream: str) -> Dict[str, Any]:
+        """First scenario: needs only the dream, so it runs alongside milestone planning"""
+        try:
+            messages = [
+                {
+                    "role": "system",
+                    "content": f"""You are narrating someone's journey to achieve their dream. You ARE them living this life.
+
+Dream: {dream}
+Stage: The very beginning - the first real step toward it
+
+Generate a realistic opening scenario (2-3 paragraphs) where:
+1. You narrate as if YOU are living this (first person: "I wake up...", "I decide...")
+2. Present the first concrete challenge or opportunity
+3. Show where they are starting from
+4. Make it emotionally engaging
+5. End with a decision point
+
+Then provide 3 possible actions they can take."""
+                },
+                {
+                    "role": "user",
+                    "content": "Generate the opening scenario"
+                }
+            ]
+            
+            scenario = self.structured.generate(
+                "openai/gpt-4o-mini",
+                messages,
+                self.SCENARIO_SCHEMA,
+                call_site="generate_opening_scenario"
+            )
+            if scenario is None:
+                raise ValueError("No valid scenario")
+            
+            return scenario
+            
+        except Exception as e:
+            logger.error(f"Error generating opening scenario: {e}")
+            return {
+                "scenario": "You take the first step on your journey...",
+                "actions": ["Take action", "Wait and plan", "Seek help"]
+            }
+    
     def _generate_scenario(self, dream_state: Dict[str, Any]) -> Dict[str, Any]:
         """Generate next scenario for user"""
         try:
@@ -385,16 +563,7 @@ Generate a realistic scenario (2-3 paragraphs) where:
 4. Make it emotionally engaging
 5. End with a decision point
 
-Then provide 3 possible actions they can take.
-
-Format:
-SCENARIO:
-[Your narration as the person living the dream]
-
-ACTIONS:
-1. [Action option 1]
-2. [Action option 2]
-3. [Action option 3]"""
+Then provide 3 possible actions they can take."""
                 },
                 {
                     "role": "user",
@@ -402,21 +571,16 @@ ACTIONS:
                 }
             ]
             
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(messages)
-            
-            # Extract content
-            if hasattr(result, 'output') and result.output:
-                content = result.output.get('content', '')
-            elif isinstance(result, dict):
-                content = result.get('content', str(result))
-            else:
-                content = str(result)
-            
-            # Parse scenario
-            parsed = self._parse_scenario(content)
+            scenario = self.structured.generate(
+                "openai/gpt-4o-mini",
+                messages,
+                self.SCENARIO_SCHEMA,
+                call_site="generate_scenario"
+            )
+            if scenario is None:
+                raise ValueError("No valid scenario")
             
-            return parsed
+            return scenario
             
         except Exception as e:
             logger.error(f"Error generating scenario: {e}")
@@ -446,13 +610,7 @@ Generate a consequence (2 paragraphs) that:
 4. Advances the story
 5. Celebrates progress or learns from setbacks
 
-Then determine if this completes the current milestone (YES/NO).
-
-Format:
-CONSEQUENCE:
-[What happens as a result]
-
-MILESTONE_COMPLETED: YES/NO"""
+Then determine if this completes the current milestone."""
                 },
                 {
                     "role": "user",
@@ -460,32 +618,16 @@ MILESTONE_COMPLETED: YES/NO"""
                 }
             ]
             
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(messages)
-            
-            # Extract content
-            if hasattr(result, 'output') and result.output:
-                content = result.output.get('content', '')
-            elif isinstance(result, dict):
-                content = result.get('content', str(result))
-            else:
-                content = str(result)
-            
-            # Parse consequence
-            consequence = ""
-            milestone_completed = False
+            result = self.structured.generate(
+                "openai/gpt-4o-mini",
+                messages,
+                self.CONSEQUENCE_SCHEMA,
+                call_site="generate_consequence"
+            )
+            if result is None:
+                raise ValueError("No valid consequence")
             
-            if "CONSEQUENCE:" in content:
-                consequence = content.split("CONSEQUENCE:")[1].split("MILESTONE_COMPLETED:")[0].strip()
-            
-            if "MILESTONE_COMPLETED:" in content:
-                completed_text = content.split("MILESTONE_COMPLETED:")[1].strip().upper()
-                milestone_completed = "YES" in completed_text
-            
-            return {
-                "consequence": consequence or content,
-                "milestone_completed": milestone_completed
-            }
+            return result
             
         except Exception as e:
             logger.error(f"Error generating consequence: {e}")
@@ -493,137 +635,6 @@ MILESTONE_COMPLETED: YES/NO"""
                 "consequence": "You take action and see results...",
                 "milestone_completed": False
             }
-    
-    def _parse_dream_extraction(self, content: str, original: str) -> Dict[str, Any]:
-        """Parse dream extraction response"""
-        try:
-            dream = ""
-            goal_type = "personal"
-            why = ""
-            timeline = "1 year"
-            key_elements = []
-            
-            if "DREAM:" in content:
-                dream = content.split("DREAM:")[1].split("GOAL_TYPE:")[0].strip()
-            
-            if "GOAL_TYPE:" in content:
-                goal_text = content.split("GOAL_TYPE:")[1].split("WHY:")[0].strip().lower()
-                for gt in self.GOAL_TYPES.keys():
-                    if gt in goal_text:
-                        goal_type = gt
-                        break
-            
-            if "WHY:" in content:
-                why = content.split("WHY:")[1].split("TIMELINE:")[0].strip()
-            
-            if "TIMELINE:" in content:
-                timeline = content.split("TIMELINE:")[1].split("KEY_ELEMENTS:")[0].strip()
-            
-            if "KEY_ELEMENTS:" in content:
-                elements_text = content.split("KEY_ELEMENTS:")[1].strip()
-                key_elements = [
-                    e.strip().lstrip("-•* ").strip()
-                    for e in elements_text.split("\n")
-                    if e.strip() and e.strip().lstrip("-•* ").strip()
-                ]
-            
-            return {
-                "dream": dream or original,
-                "goal_type": goal_type,
-                "why": why or "To achieve personal fulfillment",
-                "timeline": timeline,
-                "key_elements": key_elements or ["Growth", "Success", "Achievement"]
-            }
-            
-        except Exception as e:
-            logger.error(f"Error parsing dream extraction: {e}")
-            return {
-                "dream": original,
-                "goal_type": "personal",
-                "why": "To achieve personal fulfillment",
-                "timeline": "1 year",
-                "key_elements": ["Growth", "Success", "Achievement"]
-            }
-    
-    def _parse_milestones(self, content: str) -> List[Dict[str, Any]]:
-        """Parse milestones from AI response"""
-        try:
-            milestones = []
-            
-            # Split by MILESTONE
-            parts = re.split(r'MILESTONE \d+:', content)
-            
-            for i, part in enumerate(parts[1:], 1):  # Skip first empty part
-                title = ""
-                description = ""
-                
-                lines = part.strip().split("\n")
-                if lines:
-                    title = lines[0].strip()
-                
-                if "DESCRIPTION:" in part:
-                    description = part.split("DESCRIPTION:")[1].split("ESTIMATED_TIME:")[0].strip()
-                
-                milestones.append({
-                    "id": i,
-                    "title": title or f"Milestone {i}",
-                    "description": description or "Progress toward your goal",
-                    "completed": False
-                })
-            
-            # Ensure we have at least 5 milestones
-            while len(milestones) < 5:
-                milestones.append({
-                    "id": len(milestones) + 1,
-                    "title": f"Step {len(milestones) + 1}",
-                    "description": "Continue your journey",
-                    "completed": False
-                })
-            
-            return milestones[:7]  # Max 7 milestones
-            
-        except Exception as e:
-            logger.error(f"Error parsing milestones: {e}")
-            return [
-                {"id": i, "title": f"Milestone {i}", "description": "Progress", "completed": False}
-                for i in range(1, 6)
-            ]
-    
-    def _parse_scenario(self, content: str) -> Dict[str, Any]:
-        """Parse scenario from AI response"""
-        try:
-            scenario = ""
-            actions = []
-            
-            if "SCENARIO:" in content:
-                scenario = content.split("SCENARIO:")[1].split("ACTIONS:")[0].strip()
-            
-            if "ACTIONS:" in content:
-                actions_text = content.split("ACTIONS:")[1].strip()
-                lines = actions_text.split("\n")
-                for line in lines:
-                    line = line.strip()
-                    if line and (line[0].isdigit() or line.startswith("-")):
-                        action = line.lstrip("0123456789.-) ").strip()
-                        if action:
-                            actions.append(action)
-            
-            # Ensure 3 actions
-            if len(actions) < 3:
-                actions.extend(["Take action", "Wait and observe", "Seek guidance"][:3-len(actions)])
-            actions = actions[:3]
-            
-            return {
-                "scenario": scenario or content,
-                "actions": actions
-            }
-            
-        except Exception as e:
-            logger.error(f"Error parsing scenario: {e}")
-            return {
-                "scenario": content[:500] if content else "Your journey continues...",
-                "actions": ["Take action", "Wait and plan", "Seek help"]
-            }
 
 
 # Global instance
@@ -0,0 +1,137 @@
+"""
+Game Sessions - Expiring game state on the shared state store
+Sessions are saved compactly with an idle TTL, loaded lazily and kept
+briefly in a bounded local cache; a background sweeper drops what expired
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from src.core.config import get_config
+from src.core.state_store import get_state_store
+from src.core.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class GameSessionStore:
+    """
+    Mapping-style store of active games (user_id -> game state)
+    - encode/decode turn a game into its compact stored form and back
+    - every save or touch restarts the idle TTL; an abandoned session just
+      expires
+    - loaded sessions stay in a local cache for cache_seconds, so the
+      several lookups one update makes cost a single load, while other
+      instances see a change within that window at most
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[Dict[str, Any]], Any],
+        decode: Callable[[Any], Optional[Dict[str, Any]]],
+        store=None
+    ):
+        self.config = get_config()
+        self.store = store or get_state_store()
+        self.encode = encode
+        self.decode = decode
+        self.idle_ttl = self.config.game_session_ttl
+        self._local = TTLCache(
+            max_entries=self.config.game_session_cache_entries,
+            default_ttl=self.config.game_session_cache_seconds
+        )
+        # Sessions whose TTL this process restarted within cache_seconds;
+        # touching them again is skipped (a few seconds off a multi-hour TTL)
+        self._refreshed = TTLCache(
+            max_entries=self.config.game_session_cache_entries,
+            default_ttl=self.config.game_session_cache_seconds
+        )
+        self.stats = {"loads": 0, "saves": 0, "touches": 0, "swept": 0}
+
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="game-sweeper", daemon=True)
+        self._sweeper.start()
+
+    @staticmethod
+    def _key(user_id: Any) -> str:
+        return f"games:{user_id}:session"
+
+    def get(self, user_id: Any, default: Any = None) -> Optional[Dict[str, Any]]:
+        """Active game, loaded from the store on a local miss"""
+        game = self._local.get(user_id)
+        if game is not None:
+            return game
+
+        data = self.store.get(self._key(user_id))
+        if data is None:
+            return default
+
+        self.stats["loads"] += 1
+        try:
+            game = self.decode(data)
+        except Exception as e:
+            logger.warning(f"⚠️ Dropping unreadable game session for {user_id}: {e}")
+            game = None
+        if game is None:
+            self.delete(user_id)
+            return default
+
+        self._local.set(user_id, game)
+        return game
+
+    def save(self, user_id: Any, game: Dict[str, Any]):
+        """Store the game (restarts its idle TTL)"""
+        self.store.set(self._key(user_id), self.encode(game), expire=self.idle_ttl)
+        self._local.set(user_id, game)
+        self._refreshed.set(user_id, True)
+        self.stats["saves"] += 1
+
+    def touch(self, user_id: Any) -> Optional[Dict[str, Any]]:
+        """Active game with its idle TTL restarted (once per interaction)"""
+        game = self.get(user_id)
+        if game is not None and self._refreshed.get(user_id) is None:
+            self.store.expire(self._key(user_id), self.idle_ttl)
+            self._refreshed.set(user_id, True)
+            self.stats["touches"] += 1
+        return game
+
+    def delete(self, user_id: Any) -> bool:
+        self._local.delete(user_id)
+        self._refreshed.delete(user_id)
+        return bool(self.store.delete(self._key(user_id)))
+
+    def __contains__(self, user_id: Any) -> bool:
+        return self.get(user_id) is not None
+
+    def __getitem__(self, user_id: Any) -> Dict[str, Any]:
+        game = self.get(user_id)
+        if game is None:
+            raise KeyError(user_id)
+        return game
+
+    def __setitem__(self, user_id: Any, game: Dict[str, Any]):
+        self.save(user_id, game)
+
+    def __delitem__(self, user_id: Any):
+        self.delete(user_id)
+
+    # ==================== SWEEPER ====================
+
+    def sweep(self) -> int:
+        """Drop expired local copies and expired stored entries"""
+        self._refreshed.purge_expired()
+        swept = self._local.purge_expired() + self.store.purge_expired()
+        self.stats["swept"] += swept
+        return swept
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.config.game_sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Game session sweep failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "cached": len(self._local), "idle_ttl": self.idle_ttl}
@@ -7,16 +7,26 @@ import logging
 import random
 from typing import Dict, Any, List, Optional
 from datetime import datetime
+from src.core.state_store import get_state_store
+from src.features import tictactoe
+from src.features.game_sessions import GameSessionStore
 
 logger = logging.getLogger(__name__)
 
 
 class GamesEngine:
-    """Complete games engine with multiple playable games"""
+    """
+    Complete games engine with multiple playable games
+    
+    Active games and stats live on the shared state store: sessions expire
+    when idle, each interaction loads the game with active_games.touch()
+    (restarting that timer), and games that change are written back with
+    active_games[user_id] = game
+    """
     
     def __init__(self):
-        self.active_games = {}  # user_id -> game_state
-        self.game_stats = {}    # user_id -> stats
+        self.store = get_state_store()
+        self.active_games = GameSessionStore(self._encode_game, self._decode_game, self.store)
     
     # ==================== WORD GUESSING GAME ====================
     
@@ -62,10 +72,9 @@ class GamesEngine:
     
     def guess_letter(self, user_id: int, letter: str) -> Dict[str, Any]:
         """Process letter guess"""
-        if user_id not in self.active_games:
+        game = self.active_games.touch(user_id)
+        if game is None:
             return {"success": False, "message": "No active game! Start one first 🎮"}
-        
-        game = self.active_games[user_id]
         if game["type"] != "word_guess":
             return {"success": False, "message": "Wrong game type!"}
         
@@ -96,6 +105,7 @@ class GamesEngine:
                               f"Great job! You're amazing! 💕✨"
                 }
             else:
+                self.active_games[user_id] = game
                 return {
                     "success": True,
                     "message": f"✅ Good guess!\n\n"
@@ -120,6 +130,7 @@ class GamesEngine:
                               f"Don't worry, wanna try again? 💕"
                 }
             else:
+                self.active_games[user_id] = game
                 return {
                     "success": True,
                     "message": f"❌ Not in the word!\n\n"
@@ -177,10 +188,9 @@ class GamesEngine:
     
     def answer_trivia(self, user_id: int, answer: str) -> Dict[str, Any]:
         """Check trivia answer"""
-        if user_id not in self.active_games:
+        game = self.active_games.touch(user_id)
+        if game is None:
             return {"success": False, "message": "No active game!"}
-        
-        game = self.active_games[user_id]
         if game["type"] != "trivia":
             return {"success": False, "message": "Wrong game type!"}
         
@@ -203,6 +213,7 @@ class GamesEngine:
             questions = self.TRIVIA_QUESTIONS.get(game["category"], self.TRIVIA_QUESTIONS["general"])
             next_q = random.choice(questions)
             game["question"] = next_q
+            self.active_games[user_id] = game
             
             return {
                 "success": True,
@@ -214,6 +225,7 @@ class GamesEngine:
             }
         else:
             # Wrong
+            self.active_games[user_id] = game
             correct = correct_answers[0].title()
             return {
                 "success": True,
@@ -251,10 +263,9 @@ class GamesEngine:
     
     def guess_number(self, user_id: int, guess: int) -> Dict[str, Any]:
         """Process number guess"""
-        if user_id not in self.active_games:
+        game = self.active_games.touch(user_id)
+        if game is None:
             return {"success": False, "message": "No active game!"}
-        
-        game = self.active_games[user_id]
         if game["type"] != "number_guess":
             return {"success": False, "message": "Wrong game type!"}
         
@@ -290,6 +301,7 @@ class GamesEngine:
             else:
                 hint = "📉 Lower!"
             
+            self.active_games[user_id] = game
             remaining = game["max_guesses"] - game["guesses"]
             return {
                 "success": True,
@@ -356,10 +368,9 @@ class GamesEngine:
     
     def answer_riddle(self, user_id: int, answer: str) -> Dict[str, Any]:
         """Check riddle answer"""
-        if user_id not in self.active_games:
+        game = self.active_games.touch(user_id)
+        if game is None:
             return {"success": False, "message": "No active riddle!"}
-        
-        game = self.active_games[user_id]
         if game["type"] != "riddle":
             return {"success": False, "message": "Wrong game type!"}
         
@@ -395,22 +406,18 @@ class GamesEngine:
     # ==================== TIC TAC TOE ====================
     
     def start_tictactoe(self, user_id: int, difficulty: str = "medium") -> Dict[str, Any]:
-        """Start Tic-Tac-Toe game"""
-        board = [[" " for _ in range(3)] for _ in range(3)]
-        
+        """Start Tic-Tac-Toe game (easy, medium or hard)"""
         game_state = {
             "type": "tictactoe",
-            "board": board,
-            "player": "X",  # User is X
-            "ai": "O",      # AI is O
-            "current_turn": "X",
+            "x": 0,  # User's squares (bitboard)
+            "o": 0,  # AI's squares (bitboard)
             "difficulty": difficulty,
             "started_at": datetime.now().isoformat()
         }
         
         self.active_games[user_id] = game_state
         
-        board_display = self._get_tictactoe_display(board)
+        board_display = self._get_tictactoe_display(0, 0)
         
         return {
             "success": True,
@@ -420,40 +427,35 @@ class GamesEngine:
                       f"Choose position 1-9:\n"
                       f"```\n1 2 3\n4 5 6\n7 8 9```\n\n"
                       f"Your turn! 💕",
-            "board": board
+            "board": tictactoe.to_rows(0, 0)
         }
     
     def make_tictactoe_move(self, user_id: int, position: int) -> Dict[str, Any]:
         """Make a move in Tic-Tac-Toe"""
-        if user_id not in self.active_games:
+        game = self.active_games.touch(user_id)
+        if game is None:
             return {"success": False, "message": "No active game!"}
-        
-        game = self.active_games[user_id]
         if game["type"] != "tictactoe":
             return {"success": False, "message": "Wrong game type!"}
         
-        # Convert position (1-9) to row, col (0-2)
         if position < 1 or position > 9:
             return {"success": False, "message": "Position must be 1-9!"}
         
-        row = (position - 1) // 3
-        col = (position - 1) % 3
-        
-        board = game["board"]
+        square = 1 << (position - 1)
+        x, o = game["x"], game["o"]
         
         # Check if position is empty
-        if board[row][col] != " ":
+        if (x | o) & square:
             return {"success": False, "message": "That position is taken! Choose another 😊"}
         
         # Make player move
-        board[row][col] = game["player"]
+        x |= square
         
         # Check if player won
-        winner = self._check_tictactoe_winner(board)
-        if winner == game["player"]:
+        if tictactoe.has_line(x):
             self._update_stats(user_id, "tictactoe", won=True)
             del self.active_games[user_id]
-            board_display = self._get_tictactoe_display(board)
+            board_display = self._get_tictactoe_display(x, o)
             return {
                 "success": True,
                 "won": True,
@@ -461,28 +463,24 @@ class GamesEngine:
             }
         
         # Check for draw
-        if self._is_tictactoe_full(board):
+        if tictactoe.is_full(x, o):
             self._update_stats(user_id, "tictactoe", won=False)
             del self.active_games[user_id]
-            board_display = self._get_tictactoe_display(board)
+            board_display = self._get_tictactoe_display(x, o)
             return {
                 "success": True,
                 "won": False,
                 "message": f"🤝 *It's a Draw!*\n\n{board_display}\n\nGood game! Wanna play again? 💕"
             }
         
-        # AI's turn
-        ai_pos = self._get_ai_tictactoe_move(board, game["difficulty"])
-        ai_row = ai_pos // 3
-        ai_col = ai_pos % 3
-        board[ai_row][ai_col] = game["ai"]
+        # AI's turn (table lookup)
+        o |= 1 << tictactoe.choose_move(x, o, game["difficulty"])
         
         # Check if AI won
-        winner = self._check_tictactoe_winner(board)
-        if winner == game["ai"]:
+        if tictactoe.has_line(o):
             self._update_stats(user_id, "tictactoe", won=False)
             del self.active_games[user_id]
-            board_display = self._get_tictactoe_display(board)
+            board_display = self._get_tictactoe_display(x, o)
             return {
                 "success": True,
                 "won": False,
@@ -490,10 +488,10 @@ class GamesEngine:
             }
         
         # Check for draw after AI move
-        if self._is_tictactoe_full(board):
+        if tictactoe.is_full(x, o):
             self._update_stats(user_id, "tictactoe", won=False)
             del self.active_games[user_id]
-            board_display = self._get_tictactoe_display(board)
+            board_display = self._get_tictactoe_display(x, o)
             return {
                 "success": True,
                 "won": False,
@@ -501,13 +499,15 @@ class GamesEngine:
             }
         
         # Continue game
-        board_display = self._get_tictactoe_display(board)
+        game["x"], game["o"] = x, o
+        self.active_games[user_id] = game
+        board_display = self._get_tictactoe_display(x, o)
         return {
             "success": True,
             "message": f"⭕ *Tic-Tac-Toe*\n\n{board_display}\n\nYour turn! Choose 1-9 💕"
         }
     
-    def _get_tictactoe_display(self, board: List[List[str]]) -> str:
+    def _get_tictactoe_display(self, x: int, o: int) -> str:
         """Get emoji display of Tic-Tac-Toe board"""
         symbols = {
             "X": "❌",
@@ -516,123 +516,39 @@ class GamesEngine:
         }
         
         lines = []
-        for row in board:
+        for row in tictactoe.to_rows(x, o):
             line = " ".join([symbols[cell] for cell in row])
             lines.append(line)
         
         return "\n".join(lines)
     
-    def _check_tictactoe_winner(self, board: List[List[str]]) -> Optional[str]:
-        """Check if there's a winner"""
-        # Check rows
-        for row in board:
-            if row[0] == row[1] == row[2] != " ":
-                return row[0]
-        
-        # Check columns
-        for col in range(3):
-            if board[0][col] == board[1][col] == board[2][col] != " ":
-                return board[0][col]
-        
-        # Check diagonals
-        if board[0][0] == board[1][1] == board[2][2] != " ":
-            return board[0][0]
-        if board[0][2] == board[1][1] == board[2][0] != " ":
-            return board[0][2]
-        
-        return None
-    
-    def _is_tictactoe_full(self, board: List[List[str]]) -> bool:
-        """Check if board is full"""
-        for row in board:
-            if " " in row:
-                return False
-        return True
-    
-    def _get_ai_tictactoe_move(self, board: List[List[str]], difficulty: str) -> int:
-        """Get AI move (minimax for hard, random for easy)"""
-        if difficulty == "easy":
-            # Random move
-            empty = []
-            for i in range(3):
-                for j in range(3):
-                    if board[i][j] == " ":
-                        empty.append(i * 3 + j)
-            import random
-            return random.choice(empty) if empty else 0
-        
-        # Medium/Hard: Use minimax
-        best_score = -float('inf')
-        best_move = 0
-        
-        for i in range(3):
-            for j in range(3):
-                if board[i][j] == " ":
-                    board[i][j] = "O"
-                    score = self._minimax(board, 0, False)
-                    board[i][j] = " "
-                    
-                    if score > best_score:
-                        best_score = score
-                        best_move = i * 3 + j
-        
-        return best_move
-    
-    def _minimax(self, board: List[List[str]], depth: int, is_maximizing: bool) -> int:
-        """Minimax algorithm for unbeatable AI"""
-        winner = self._check_tictactoe_winner(board)
-        
-        if winner == "O":
-            return 10 - depth
-        elif winner == "X":
-            return depth - 10
-        elif self._is_tictactoe_full(board):
-            return 0
-        
-        if is_maximizing:
-            best_score = -float('inf')
-            for i in range(3):
-                for j in range(3):
-                    if board[i][j] == " ":
-                        board[i][j] = "O"
-                        score = self._minimax(board, depth + 1, False)
-                        board[i][j] = " "
-                        best_score = max(score, best_score)
-            return best_score
-        else:
-            best_score = float('inf')
-            for i in range(3):
-                for j in range(3):
-                    if board[i][j] == " ":
-                        board[i][j] = "X"
-                        score = self._minimax(board, depth + 1, True)
-                        board[i][j] = " "
-                        best_score = min(score, best_score)
-            return best_score
-    
     # ==================== STATS & UTILITIES ====================
     
+    @staticmethod
+    def _stats_key(user_id: int) -> str:
+        return f"games:{user_id}:stats"
+    
     def _update_stats(self, user_id: int, game_type: str, won: bool):
         """Update game statistics"""
-        if user_id not in self.game_stats:
-            self.game_stats[user_id] = {}
+        stats = self.store.get(self._stats_key(user_id)) or {}
         
-        if game_type not in self.game_stats[user_id]:
-            self.game_stats[user_id][game_type] = {"played": 0, "won": 0}
+        if game_type not in stats:
+            stats[game_type] = {"played": 0, "won": 0}
         
-        self.game_stats[user_id][game_type]["played"] += 1
+        stats[game_type]["played"] += 1
         if won:
-            self.game_stats[user_id][game_type]["won"] += 1
+            stats[game_type]["won"] += 1
+        self.store.set(self._stats_key(user_id), stats)
     
     def get_stats(self, user_id: int) -> Dict[str, Any]:
         """Get user's game statistics"""
-        if user_id not in self.game_stats:
+        stats = self.store.get(self._stats_key(user_id))
+        if not stats:
             return {
                 "success": True,
                 "message": "You haven't played any games yet! Let's start! 🎮"
             }
         
-        stats = self.game_stats[user_id]
         msg = "🎮 *Your Game Stats:*\n\n"
         
         for game_type, data in stats.items():
@@ -649,8 +565,7 @@ class GamesEngine:
     
     def quit_game(self, user_id: int) -> Dict[str, Any]:
         """Quit current game"""
-        if user_id in self.active_games:
-            del self.active_games[user_id]
+        if self.active_games.delete(user_id):
             return {
                 "success": True,
                 "message": "Game ended! Wanna play something else? 🎮"
@@ -660,6 +575,59 @@ class GamesEngine:
             "message": "No active game to quit!"
         }
 
+    
+    # ==================== SESSION ENCODING ====================
+    
+    # Stored as [type, started_at (epoch seconds), *fields]; trivia
+    # questions and riddles are stored by their index in the catalog
+    
+    def _encode_game(self, game: Dict[str, Any]) -> List[Any]:
+        game_type = game["type"]
+        started = int(datetime.fromisoformat(game["started_at"]).timestamp())
+        
+        if game_type == "word_guess":
+            fields = [game["word"], game["category"], "".join(game["guessed_letters"]),
+                      game["wrong_guesses"], game["max_wrong"]]
+        elif game_type == "trivia":
+            questions = self.TRIVIA_QUESTIONS.get(game["category"], self.TRIVIA_QUESTIONS["general"])
+            fields = [game["category"], questions.index(game["question"]), game["score"], game["total"]]
+        elif game_type == "number_guess":
+            fields = [game["number"], game["max"], game["guesses"], game["max_guesses"]]
+        elif game_type == "riddle":
+            fields = [self.RIDDLES.index(game["riddle"])]
+        elif game_type == "tictactoe":
+            fields = [game["x"], game["o"], game["difficulty"]]
+        else:
+            raise ValueError(f"Unknown game type: {game_type}")
+        
+        return [game_type, started, *fields]
+    
+    def _decode_game(self, data: List[Any]) -> Optional[Dict[str, Any]]:
+        game_type, started, *fields = data
+        game = {"type": game_type}
+        
+        if game_type == "word_guess":
+            word, category, guessed, wrong, max_wrong = fields
+            game.update(word=word, category=category, guessed_letters=list(guessed),
+                        wrong_guesses=wrong, max_wrong=max_wrong)
+        elif game_type == "trivia":
+            category, index, score, total = fields
+            questions = self.TRIVIA_QUESTIONS.get(category, self.TRIVIA_QUESTIONS["general"])
+            game.update(category=category, question=questions[index], score=score, total=total)
+        elif game_type == "number_guess":
+            number, max_num, guesses, max_guesses = fields
+            game.update(number=number, max=max_num, guesses=guesses, max_guesses=max_guesses)
+        elif game_type == "riddle":
+            game["riddle"] = self.RIDDLES[fields[0]]
+        elif game_type == "tictactoe":
+            x, o, difficulty = fields
+            game.update(x=x, o=o, difficulty=difficulty)
+        else:
+            return None
+        
+        game["started_at"] = datetime.fromtimestamp(started).isoformat()
+        return game
+
 
 # Global instance
 _games_engine = None
@@ -5,11 +5,16 @@ Intense transformation system for creating unstoppable winners
 """
 
 import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
-from bytez import Bytez
+from datetime import datetime
 from src.core.config import get_config
-from src.core.redis_manager import get_redis_manager
+from src.core.state_store import get_state_store
+from src.core.rate_limits import get_rate_limiter
+from src.core.model_client import get_model_client
+from src.core.structured_output import get_structured_generator
 from src.features.mode_engine import get_mode_manager
 
 logger = logging.getLogger(__name__)
@@ -19,6 +24,13 @@ class LuciEngine:
     """
     Brutal mentor using dark psychology for transformation
     ⚠️ Intense, aggressive, no-nonsense approach
+    
+    Challenges come from per (focus area, intensity) pools that refill in
+    the background on idle keys; a live call is only made when a pool is
+    empty. Assessment and challenge run concurrently on activation, and
+    the next challenge is fetched while feedback is generated
+    
+    Cooldown and daily challenge count are rate-limit keys, not state fields
     """
     
     FOCUS_AREAS = {
@@ -58,19 +70,51 @@ class LuciEngine:
     MAX_DAILY_CHALLENGES = 5
     COOLDOWN_HOURS = 2
     
+    CHALLENGE_MODEL = "openai/gpt-4o-mini"
+    CHALLENGE_SCHEMA = {
+        "type": "object",
+        "required": ["challenge", "action_required", "deadline"],
+        "properties": {
+            "challenge": {"type": "string", "minLength": 1, "description": "Your brutal challenge - be aggressive"},
+            "action_required": {"type": "string", "description": "Specific action required"},
+            "deadline": {"type": "string", "description": "Timeframe - be aggressive"}
+        }
+    }
+    
     def __init__(self):
         self.config = get_config()
-        self.redis = get_redis_manager()
+        self.store = get_state_store()
+        self.limits = get_rate_limiter()
         self.mode_manager = get_mode_manager()
+        self.model_client = get_model_client()
+        self.structured = get_structured_generator()
         
-        # Initialize Bytez client
-        if hasattr(self.config, 'bytez_key_1') and self.config.bytez_key_1:
-            self.bytez = Bytez(self.config.bytez_key_1)
-        else:
+        if not self.model_client.clients:
             raise ValueError("Bytez API key not configured")
+        
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.config.luci_workers,
+            thread_name_prefix="luci"
+        )
+        # Background refills get their own threads so they never queue
+        # ahead of live assessments and challenges
+        self._refill_executor = ThreadPoolExecutor(
+            max_workers=self.config.luci_refill_workers,
+            thread_name_prefix="luci-refill"
+        )
+        # (focus_area, intensity) -> ready challenges
+        self._pools: Dict[tuple, deque] = {}
+        self._refilling = set()
+        self._pool_lock = threading.Lock()
+        self.pool_stats = {"served": 0, "live": 0, "generated": 0, "skipped": 0}
+        
+        if self.config.luci_pool_warm:
+            for focus_area in self.FOCUS_AREAS:
+                self._schedule_refill(focus_area, self.DEFAULT_INTENSITY)
     
     def activate_luci(self, user_id: str, focus_area: str, intensity: int = None) -> Dict[str, Any]:
         """Activate Luci mode with warnings"""
+        charged = False
         try:
             if focus_area not in self.FOCUS_AREAS:
                 return {"success": False, "error": f"Invalid focus area"}
@@ -79,11 +123,19 @@ class LuciEngine:
                 intensity = self.DEFAULT_INTENSITY
             intensity = max(self.MIN_INTENSITY, min(intensity, self.MAX_INTENSITY))
             
-            # Generate AI-powered assessment
-            assessment = self._assess_current_state(user_id, focus_area)
+            # The first challenge counts and starts the cooldown: reserve both
+            # before generating (refunded below if generation fails)
+            allowed, _ = self.limits.consume("luci_challenges", user_id, self.MAX_DAILY_CHALLENGES)
+            if not allowed:
+                return {"success": False, "error": "Daily challenge limit reached", "daily_limit": True}
+            self.limits.start_cooldown("luci", user_id, self.COOLDOWN_HOURS * 3600)
+            charged = True
             
-            # Generate AI-powered first challenge
-            first_challenge = self._generate_challenge(focus_area, intensity)
+            # Assessment and first challenge run concurrently
+            assessment = self._executor.submit(self._assess_current_state, user_id, focus_area)
+            first_challenge = self._challenge_for(focus_area, intensity)
+            assessment = assessment.result()
+            first_challenge = first_challenge.result()
             
             # Create Luci state
             luci_state = {
@@ -95,17 +147,14 @@ class LuciEngine:
                 "current_challenge": first_challenge,
                 "user_responses": [],
                 "breakthrough_moments": [],
-                "activated_at": datetime.now().isoformat(),
-                "last_challenge_at": datetime.now().isoformat(),
-                "daily_challenges_count": 1,
-                "last_reset_date": datetime.now().date().isoformat()
+                "activated_at": datetime.now().isoformat()
             }
             
             # Save state
             state_key = f"mode:{user_id}:luci:state"
-            current_state = self.redis.get(state_key) or {}
+            current_state = self.store.get(state_key) or {}
             current_state["luci"] = luci_state
-            self.redis.set(state_key, current_state)
+            self.store.set(state_key, current_state)
             
             return {
                 "success": True,
@@ -117,23 +166,33 @@ class LuciEngine:
             }
         except Exception as e:
             logger.error(f"Error activating Luci: {e}")
+            if charged:
+                self.limits.refund("luci_challenges", user_id)
+                self.limits.clear_cooldown("luci", user_id)
             return {"success": False, "error": str(e)}
     
     def process_response(self, user_id: str, response: str) -> Dict[str, Any]:
         """Process user's response to Luci's challenge"""
+        charged = False
         try:
             luci_state = self.get_luci_state(user_id)
             if not luci_state:
                 return {"success": False, "error": "Luci mode not active"}
             
-            # Check cooldown
-            if not self._check_cooldown(luci_state):
-                remaining = self._get_cooldown_remaining(luci_state)
-                return {"success": False, "error": f"Cooldown active. Wait {remaining} minutes", "cooldown": True}
+            # Check cooldown (taking it starts the next one)
+            allowed, remaining = self.limits.acquire_cooldown("luci", user_id, self.COOLDOWN_HOURS * 3600)
+            if not allowed:
+                return {"success": False, "error": f"Cooldown active. Wait {int(remaining / 60)} minutes", "cooldown": True}
             
             # Check daily limit
-            if not self._check_daily_limit(luci_state):
+            allowed, _ = self.limits.consume("luci_challenges", user_id, self.MAX_DAILY_CHALLENGES)
+            if not allowed:
+                self.limits.clear_cooldown("luci", user_id)
                 return {"success": False, "error": "Daily challenge limit reached", "daily_limit": True}
+            charged = True
+            
+            # Next challenge doesn't depend on the feedback
+            next_challenge = self._challenge_for(luci_state["focus_area"], luci_state["intensity_level"])
             
             # Generate AI-powered feedback
             feedback_result = self._generate_feedback(luci_state, response)
@@ -154,18 +213,14 @@ class LuciEngine:
                     "score": luci_state["transformation_score"]
                 })
             
-            # Generate next AI-powered challenge
-            next_challenge = self._generate_challenge(luci_state["focus_area"], luci_state["intensity_level"])
-            
+            next_challenge = next_challenge.result()
             luci_state["current_challenge"] = next_challenge
-            luci_state["last_challenge_at"] = datetime.now().isoformat()
-            luci_state["daily_challenges_count"] += 1
             
             # Save state
             state_key = f"mode:{user_id}:luci:state"
-            current_state = self.redis.get(state_key) or {}
+            current_state = self.store.get(state_key) or {}
             current_state["luci"] = luci_state
-            self.redis.set(state_key, current_state)
+            self.store.set(state_key, current_state)
             
             return {
                 "success": True,
@@ -178,27 +233,20 @@ class LuciEngine:
             }
         except Exception as e:
             logger.error(f"Error processing response: {e}")
+            if charged:
+                # A failed response shouldn't cost a challenge or start the cooldown
+                self.limits.refund("luci_challenges", user_id)
+                self.limits.clear_cooldown("luci", user_id)
             return {"success": False, "error": str(e)}
     
     def get_luci_state(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get current Luci state"""
         try:
             state_key = f"mode:{user_id}:luci:state"
-            state = self.redis.get(state_key)
+            state = self.store.get(state_key)
             
             if state and "luci" in state:
-                luci_state = state["luci"]
-                # Reset daily count if new day
-                last_reset = luci_state.get("last_reset_date")
-                today = datetime.now().date().isoformat()
-                
-                if last_reset != today:
-                    luci_state["daily_challenges_count"] = 0
-                    luci_state["last_reset_date"] = today
-                    state["luci"] = luci_state
-                    self.redis.set(state_key, state)
-                
-                return luci_state
+                return state["luci"]
             return None
         except Exception as e:
             logger.error(f"Error getting Luci state: {e}")
@@ -222,51 +270,16 @@ class LuciEngine:
                 "transformation_score": luci_state["transformation_score"],
                 "challenges_completed": luci_state["challenges_completed"],
                 "breakthrough_count": len(luci_state["breakthrough_moments"]),
+                "challenges_left_today": self.limits.remaining(
+                    "luci_challenges", user_id, self.MAX_DAILY_CHALLENGES
+                ),
+                "cooldown_minutes": int(self.limits.cooldown_remaining("luci", user_id) / 60),
                 "activated_at": luci_state.get("activated_at")
             }
         except Exception as e:
             logger.error(f"Error tracking transformation: {e}")
             return {"active": False}
     
-    def _check_cooldown(self, luci_state: Dict[str, Any]) -> bool:
-        """Check if cooldown period has passed"""
-        try:
-            last_challenge = luci_state.get("last_challenge_at")
-            if not last_challenge:
-                return True
-            
-            last_time = datetime.fromisoformat(last_challenge)
-            cooldown_end = last_time + timedelta(hours=self.COOLDOWN_HOURS)
-            
-            return datetime.now() >= cooldown_end
-        except Exception as e:
-            logger.error(f"Error checking cooldown: {e}")
-            return True
-    
-    def _get_cooldown_remaining(self, luci_state: Dict[str, Any]) -> int:
-        """Get remaining cooldown time in minutes"""
-        try:
-            last_challenge = luci_state.get("last_challenge_at")
-            if not last_challenge:
-                return 0
-            
-            last_time = datetime.fromisoformat(last_challenge)
-            cooldown_end = last_time + timedelta(hours=self.COOLDOWN_HOURS)
-            remaining = cooldown_end - datetime.now()
-            
-            return max(0, int(remaining.total_seconds() / 60))
-        except Exception as e:
-            logger.error(f"Error getting cooldown remaining: {e}")
-            return 0
-    
-    def _check_daily_limit(self, luci_state: Dict[str, Any]) -> bool:
-        """Check if daily challenge limit reached"""
-        try:
-            return luci_state.get("daily_challenges_count", 0) < self.MAX_DAILY_CHALLENGES
-        except Exception as e:
-            logger.error(f"Error checking daily limit: {e}")
-            return True
-    
     def _assess_current_state(self, user_id: str, focus_area: str) -> Dict[str, Any]:
         """Generate AI-powered brutal assessment"""
         try:
@@ -294,13 +307,13 @@ Then list 3 specific weaknesses and 1 potential strength."""
                 }
             ]
             
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(messages)
-            
-            if hasattr(result, 'output') and result.output:
-                content = result.output.get('content', '')
-            else:
-                content = str(result)
+            # Not memoized: the prompt only carries the focus area, so a memo
+            # would hand every user the same "personal" assessment
+            content = self.model_client.chat(
+                "openai/gpt-4o-mini",
+                messages,
+                call_site="luci_assessment"
+            )
             
             return {
                 "assessment": content,
@@ -315,15 +328,90 @@ Then list 3 specific weaknesses and 1 potential strength."""
                 "strengths": []
             }
     
-    def _generate_challenge(self, focus_area: str, intensity: int) -> Dict[str, Any]:
-        """Generate AI-powered brutal challenge"""
+    # ==================== CHALLENGE POOLS ====================
+    
+    def _challenge_for(self, focus_area: str, intensity: int) -> Future:
+        """Pooled challenge if one is ready, otherwise a live generation"""
+        with self._pool_lock:
+            pool = self._pools.get((focus_area, intensity))
+            challenge = pool.popleft() if pool else None
+        
+        if challenge is not None:
+            self._count_pool("served")
+            ready = Future()
+            ready.set_result(challenge)
+        else:
+            self._count_pool("live")
+            ready = self._executor.submit(self._generate_challenge, focus_area, intensity)
+        
+        self._schedule_refill(focus_area, intensity)
+        return ready
+    
+    def _schedule_refill(self, focus_area: str, intensity: int):
+        pool_key = (focus_area, intensity)
+        with self._pool_lock:
+            pool = self._pools.setdefault(pool_key, deque())
+            if pool_key in self._refilling or len(pool) >= self.config.luci_challenge_pool_size:
+                return
+            self._refilling.add(pool_key)
+        self._refill_executor.submit(self._refill, focus_area, intensity)
+    
+    def _refill(self, focus_area: str, intensity: int):
+        """
+        Add one challenge on a key that is idle right now, then resubmit
+        while the pool is short (one generation per task keeps refills of
+        other pools from waiting behind this one)
+        """
+        pool_key = (focus_area, intensity)
+        more = False
         try:
-            focus_info = self.FOCUS_AREAS[focus_area]
-            
-            messages = [
-                {
-                    "role": "system",
-                    "content": f"""You are Luci - brutal mentor using dark psychology.
+            key_id = self.model_client.leases.try_acquire(
+                among=self.model_client.available_keys(self.CHALLENGE_MODEL)
+            )
+            if key_id is None:
+                self._count_pool("skipped")
+                return
+            
+            challenge = self.structured.generate(
+                self.CHALLENGE_MODEL,
+                self._challenge_messages(focus_area, intensity),
+                self.CHALLENGE_SCHEMA,
+                call_site="luci_challenge_pool",
+                key_id=key_id,
+                lease_held=True
+            )
+            if challenge is None:
+                return
+            
+            with self._pool_lock:
+                self._pools[pool_key].append(challenge)
+                self.pool_stats["generated"] += 1
+                more = len(self._pools[pool_key]) < self.config.luci_challenge_pool_size
+        except Exception as e:
+            logger.debug(f"Challenge pool refill failed for {pool_key}: {e}")
+        finally:
+            if more:
+                self._refill_executor.submit(self._refill, focus_area, intensity)
+            else:
+                with self._pool_lock:
+                    self._refilling.discard(pool_key)
+    
+    def _count_pool(self, field: str):
+        with self._pool_lock:
+            self.pool_stats[field] += 1
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Pool hit counts and ready challenges per (focus, intensity)"""
+        with self._pool_lock:
+            ready = {f"{focus}:{intensity}": len(pool) for (focus, intensity), pool in self._pools.items() if pool}
+            return {**self.pool_stats, "ready": ready}
+    
+    def _challenge_messages(self, focus_area: str, intensity: int) -> List[Dict[str, str]]:
+        focus_info = self.FOCUS_AREAS[focus_area]
+        return [
+            {
+                "role": "system",
+                "content": f"""You are Luci - brutal mentor using dark psychology.
 
 Focus: {focus_info['name']}
 Intensity: {intensity}/10
@@ -335,43 +423,27 @@ Generate a BRUTAL challenge that:
 4. Uses aggressive motivation
 5. Demands immediate action
 
-Higher intensity = more brutal and demanding.
-
-Format:
-CHALLENGE: [Your brutal challenge - be aggressive]
-ACTION: [Specific action required]
-DEADLINE: [Timeframe - be aggressive]"""
-                },
-                {
-                    "role": "user",
-                    "content": f"Give me a challenge for {focus_area}"
-                }
-            ]
-            
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(messages)
-            
-            if hasattr(result, 'output') and result.output:
-                content = result.output.get('content', '')
-            else:
-                content = str(result)
-            
-            # Parse response
-            lines = content.split('\n')
-            challenge = action = deadline = ""
-            for line in lines:
-                if line.startswith("CHALLENGE:"):
-                    challenge = line.replace("CHALLENGE:", "").strip()
-                elif line.startswith("ACTION:"):
-                    action = line.replace("ACTION:", "").strip()
-                elif line.startswith("DEADLINE:"):
-                    deadline = line.replace("DEADLINE:", "").strip()
-            
-            return {
-                "challenge": challenge or content,
-                "action_required": action or "Take action now",
-                "deadline": deadline or "Today"
+Higher intensity = more brutal and demanding."""
+            },
+            {
+                "role": "user",
+                "content": f"Give me a challenge for {focus_area}"
             }
+        ]
+    
+    def _generate_challenge(self, focus_area: str, intensity: int) -> Dict[str, Any]:
+        """Generate AI-powered brutal challenge"""
+        try:
+            challenge = self.structured.generate(
+                self.CHALLENGE_MODEL,
+                self._challenge_messages(focus_area, intensity),
+                self.CHALLENGE_SCHEMA,
+                call_site="generate_challenge"
+            )
+            if challenge is None:
+                raise ValueError("No valid challenge")
+            
+            return challenge
         except Exception as e:
             logger.error(f"Error generating challenge: {e}")
             return {
@@ -416,13 +488,11 @@ BREAKTHROUGH: [YES/NO]"""
                 }
             ]
             
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(messages)
-            
-            if hasattr(result, 'output') and result.output:
-                content = result.output.get('content', '')
-            else:
-                content = str(result)
+            content = self.model_client.chat(
+                "openai/gpt-4o-mini",
+                messages,
+                call_site="generate_feedback"
+            )
             
             # Parse response
             lines = content.split('\n')
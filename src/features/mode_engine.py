@@ -5,9 +5,13 @@ Manages Roleplay, Dream Life, and Luci modes
 
 import logging
 import json
+import threading
 from typing import Optional, Dict, Any
 from datetime import datetime
-from src.core.redis_manager import get_redis_manager
+from src.core.redis_manager import decode, get_redis_manager
+from src.core.async_redis import get_async_redis_manager
+from src.core.state_store import RedisStateStore, get_state_store
+from src.core.event_bus import EventType, get_event_bus
 
 logger = logging.getLogger(__name__)
 
@@ -36,12 +40,90 @@ class ModeManager:
     """
     Central controller for all revolutionary modes
     Manages activation, switching, and state persistence
+    
+    State lives in the configured StateStore. On Redis, transitions run as
+    one Lua script (one round trip, atomic); on the in-process store they
+    run under a lock. Activation flags live in a small per-mode meta entry
+    so the script never re-encodes the state JSON
     """
     
     VALID_MODES = ["roleplay", "dreamlife", "luci"]
     
+    # KEYS: current marker, target state, one meta hash per VALID_MODES
+    # ARGV: target mode, now, initial state JSON, VALID_MODES...
+    ACTIVATE_SCRIPT = """
+    local current = redis.call('GET', KEYS[1])
+    if current == ARGV[1] then
+        return {0, current}
+    end
+    local target_meta
+    for i = 4, #ARGV do
+        if ARGV[i] == current then
+            redis.call('HSET', KEYS[i - 1], 'is_active', '0', 'deactivated_at', ARGV[2])
+        end
+        if ARGV[i] == ARGV[1] then
+            target_meta = KEYS[i - 1]
+        end
+    end
+    redis.call('SET', KEYS[1], ARGV[1])
+    local state = redis.call('GET', KEYS[2])
+    if not state then
+        state = ARGV[3]
+        redis.call('SET', KEYS[2], state)
+        redis.call('HSET', target_meta, 'activated_at', ARGV[2])
+    end
+    redis.call('HSET', target_meta, 'is_active', '1', 'last_interaction', ARGV[2])
+    return {1, current or '', state, redis.call('HGETALL', target_meta)}
+    """
+    
+    # KEYS: current marker, one meta hash per VALID_MODES
+    # ARGV: now, VALID_MODES...
+    DEACTIVATE_SCRIPT = """
+    local current = redis.call('GET', KEYS[1])
+    if not current then
+        return ''
+    end
+    for i = 2, #ARGV do
+        if ARGV[i] == current then
+            redis.call('HSET', KEYS[i], 'is_active', '0', 'deactivated_at', ARGV[1])
+        end
+    end
+    redis.call('DEL', KEYS[1])
+    return current
+    """
+    
     def __init__(self):
         self.redis = get_redis_manager()
+        self.async_redis = get_async_redis_manager()
+        self.store = get_state_store()
+        self.events = get_event_bus()
+        
+        # Lua scripts only when state actually lives in Redis
+        self.on_redis = isinstance(self.store, RedisStateStore) and bool(self.redis.client)
+        self._activate_script = None
+        self._deactivate_script = None
+        if self.on_redis:
+            self._activate_script = self.redis.client.register_script(self.ACTIVATE_SCRIPT)
+            self._deactivate_script = self.redis.client.register_script(self.DEACTIVATE_SCRIPT)
+        
+        # Serializes transitions on the in-process store
+        self._local_lock = threading.Lock()
+    
+    @staticmethod
+    def _meta_key(user_id: str, mode: str) -> str:
+        return f"mode:{user_id}:{mode}:meta"
+    
+    @staticmethod
+    def _merge_meta(state: Optional[Dict[str, Any]], meta: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Overlay activation flags (meta hash) onto the stored state"""
+        if state is None and not meta:
+            return None
+        merged = dict(state or {})
+        for field, value in meta.items():
+            field = field.decode() if isinstance(field, bytes) else field
+            value = value.decode() if isinstance(value, bytes) else value
+            merged[field] = value == "1" if field == "is_active" else value
+        return merged
     
     def get_current_mode(self, user_id: str) -> Optional[str]:
         """
@@ -55,7 +137,7 @@ class ModeManager:
         """
         try:
             key = f"mode:{user_id}:current"
-            mode = self.redis.get(key)
+            mode = self.store.get(key)
             
             if mode and mode in self.VALID_MODES:
                 return mode
@@ -65,16 +147,76 @@ class ModeManager:
             logger.error(f"Error getting current mode for {user_id}: {e}")
             return None
     
+    async def get_current_mode_async(self, user_id: str) -> Optional[str]:
+        """get_current_mode for async handlers (doesn't block the event loop)"""
+        try:
+            key = f"mode:{user_id}:current"
+            mode = await self.async_redis.get(key) if self.on_redis else self.store.get(key)
+            return mode if mode in self.VALID_MODES else None
+        except Exception as e:
+            logger.error(f"Error getting current mode for {user_id}: {e}")
+            return None
+    
+    # ==================== TRANSITIONS ====================
+    
+    def _transition(self, user_id: str, mode: str, now: str, initial_state: Dict[str, Any]) -> Dict[str, Any]:
+        """Atomically make mode current -> {"changed", "previous", "state"}"""
+        if not self.on_redis:
+            return self._transition_local(user_id, mode, now, initial_state)
+        
+        keys = [f"mode:{user_id}:current", f"mode:{user_id}:{mode}:state"]
+        keys += [self._meta_key(user_id, m) for m in self.VALID_MODES]
+        args = [mode, now, json.dumps(initial_state)] + self.VALID_MODES
+        
+        with self.redis.latency.time("mode_transition"):
+            result = self._activate_script(keys=keys, args=args)
+        
+        if not result[0]:
+            return {"changed": False, "previous": mode, "state": None}
+        
+        previous = decode(result[1]) or None
+        meta = dict(zip(result[3][::2], result[3][1::2]))
+        return {"changed": True, "previous": previous, "state": self._merge_meta(decode(result[2]), meta)}
+    
+    def _transition_local(self, user_id: str, mode: str, now: str, initial_state: Dict[str, Any]) -> Dict[str, Any]:
+        current_key = f"mode:{user_id}:current"
+        state_key = f"mode:{user_id}:{mode}:state"
+        with self._local_lock:
+            current = self.store.get(current_key)
+            if current == mode:
+                return {"changed": False, "previous": mode, "state": None}
+            
+            if current:
+                self._set_meta(user_id, current, is_active="0", deactivated_at=now)
+            
+            self.store.set(current_key, mode)
+            state = self.store.get(state_key)
+            if state is None:
+                state = initial_state
+                self.store.set(state_key, state)
+                self._set_meta(user_id, mode, activated_at=now)
+            meta = self._set_meta(user_id, mode, is_active="1", last_interaction=now)
+            
+            return {"changed": True, "previous": current, "state": self._merge_meta(state, meta)}
+    
+    def _set_meta(self, user_id: str, mode: str, **fields) -> Dict[str, Any]:
+        """Update the in-process store's meta entry (mirrors HSET)"""
+        meta_key = self._meta_key(user_id, mode)
+        meta = dict(self.store.get(meta_key) or {})
+        meta.update(fields)
+        self.store.set(meta_key, meta)
+        return meta
+    
     def activate_mode(self, user_id: str, mode: str) -> Dict[str, Any]:
         """
-        Activate a mode for a user
+        Activate a mode for a user (deactivating the current one)
         
         Args:
             user_id: Telegram user ID
             mode: Mode to activate (roleplay, dreamlife, luci)
             
         Returns:
-            Activation result with status and message
+            Activation result with status, message and the mode's state
             
         Raises:
             InvalidModeError: If mode is not valid
@@ -85,41 +227,27 @@ class ModeManager:
             if mode not in self.VALID_MODES:
                 raise InvalidModeError(f"Invalid mode: {mode}. Valid modes: {self.VALID_MODES}")
             
-            # Check if mode is already active
-            current_mode = self.get_current_mode(user_id)
-            if current_mode == mode:
-                raise ModeAlreadyActiveError(f"Mode {mode} is already active")
-            
-            # Deactivate current mode if any
-            if current_mode:
-                self.deactivate_mode(user_id)
-            
-            # Activate new mode
-            key = f"mode:{user_id}:current"
-            self.redis.set(key, mode)
-            
-            # Initialize mode state if it doesn't exist
-            state_key = f"mode:{user_id}:{mode}:state"
-            existing_state = self.redis.get(state_key)
+            now = datetime.now().isoformat()
+            initial_state = {
+                "activated_at": now,
+                "last_interaction": now,
+                "is_active": True
+            }
             
-            if not existing_state:
-                initial_state = {
-                    "activated_at": datetime.now().isoformat(),
-                    "last_interaction": datetime.now().isoformat(),
-                    "is_active": True
-                }
-                self.redis.set(state_key, initial_state)
-            else:
-                # Update existing state
-                existing_state["is_active"] = True
-                existing_state["last_interaction"] = datetime.now().isoformat()
-                self.redis.set(state_key, existing_state)
+            # One atomic step: check, deactivate previous, activate, init state
+            result = self._transition(user_id, mode, now, initial_state)
+            if not result["changed"]:
+                raise ModeAlreadyActiveError(f"Mode {mode} is already active")
             
+            current_mode = result["previous"]
+            self.events.publish(EventType.MODE_CHANGED, user_id, mode=mode, previous=current_mode)
             logger.info(f"✅ Activated {mode} mode for user {user_id}")
             
             return {
                 "success": True,
                 "mode": mode,
+                "previous_mode": current_mode,
+                "state": result["state"],
                 "message": f"{mode.capitalize()} mode activated successfully"
             }
             
@@ -144,24 +272,25 @@ class ModeManager:
             True if deactivated successfully, False otherwise
         """
         try:
-            current_mode = self.get_current_mode(user_id)
+            now = datetime.now().isoformat()
+            
+            if not self.on_redis:
+                with self._local_lock:
+                    current_key = f"mode:{user_id}:current"
+                    current_mode = self.store.get(current_key)
+                    if current_mode:
+                        self.store.delete(current_key)
+                        self._set_meta(user_id, current_mode, is_active="0", deactivated_at=now)
+            else:
+                keys = [f"mode:{user_id}:current"] + [self._meta_key(user_id, m) for m in self.VALID_MODES]
+                with self.redis.latency.time("mode_transition"):
+                    current_mode = decode(self._deactivate_script(keys=keys, args=[now] + self.VALID_MODES))
             
             if not current_mode:
                 logger.info(f"No active mode to deactivate for user {user_id}")
                 return True
             
-            # Update mode state to inactive
-            state_key = f"mode:{user_id}:{current_mode}:state"
-            state = self.redis.get(state_key)
-            
-            if state:
-                state["is_active"] = False
-                state["deactivated_at"] = datetime.now().isoformat()
-                self.redis.set(state_key, state)
-            
-            # Remove current mode marker
-            key = f"mode:{user_id}:current"
-            self.redis.client.delete(key) if self.redis.client else None
+            self.events.publish(EventType.MODE_CHANGED, user_id, mode=None, previous=current_mode)
             
             logger.info(f"✅ Deactivated {current_mode} mode for user {user_id}")
             return True
@@ -189,15 +318,14 @@ class ModeManager:
             if mode not in self.VALID_MODES:
                 raise InvalidModeError(f"Invalid mode: {mode}")
             
-            state_key = f"mode:{user_id}:{mode}:state"
-            state = self.redis.get(state_key)
+            state, meta = self._read_state(user_id, mode)
             
             if state:
                 # Validate state structure
                 if not isinstance(state, dict):
                     raise StateCorruptionError(f"State for {mode} is corrupted")
                 
-                return state
+                return self._merge_meta(state, meta)
             
             return None
             
@@ -235,9 +363,8 @@ class ModeManager:
             # Update last interaction time
             state["last_interaction"] = datetime.now().isoformat()
             
-            # Save new state
-            state_key = f"mode:{user_id}:{mode}:state"
-            success = self.redis.set(state_key, state)
+            # Save new state (and the flag the meta hash overlays on read)
+            success = self._write_state(user_id, mode, state)
             
             if success:
                 logger.info(f"✅ Updated {mode} state for user {user_id}")
@@ -261,23 +388,17 @@ class ModeManager:
             Switch result with status and message
         """
         try:
-            current_mode = self.get_current_mode(user_id)
-            
-            if current_mode == new_mode:
+            # activate_mode deactivates the current mode in the same atomic step
+            try:
+                result = self.activate_mode(user_id, new_mode)
+            except ModeAlreadyActiveError:
                 return {
                     "success": False,
                     "message": f"Already in {new_mode} mode"
                 }
             
-            # Deactivate current mode (preserves state)
-            if current_mode:
-                self.deactivate_mode(user_id)
-            
-            # Activate new mode
-            result = self.activate_mode(user_id, new_mode)
-            
             if result.get("success"):
-                logger.info(f"✅ Switched from {current_mode} to {new_mode} for user {user_id}")
+                logger.info(f"✅ Switched from {result['previous_mode']} to {new_mode} for user {user_id}")
             
             return result
             
@@ -288,15 +409,42 @@ class ModeManager:
                 "error": str(e)
             }
     
+    def _read_state(self, user_id: str, mode: str) -> tuple:
+        """(state, meta) in one round trip"""
+        if not self.on_redis:
+            state, meta = self.store.get_many([f"mode:{user_id}:{mode}:state", self._meta_key(user_id, mode)])
+            return state, meta or {}
+        
+        pipe = self.redis.client.pipeline(transaction=False)
+        pipe.get(f"mode:{user_id}:{mode}:state")
+        pipe.hgetall(self._meta_key(user_id, mode))
+        with self.redis.latency.time("pipeline"):
+            raw, meta = pipe.execute()
+        return decode(raw), meta
+    
+    def _write_state(self, user_id: str, mode: str, state: Dict[str, Any]) -> bool:
+        if not self.on_redis:
+            with self._local_lock:
+                self.store.set(f"mode:{user_id}:{mode}:state", state)
+                self._set_meta(user_id, mode, last_interaction=state["last_interaction"])
+            return True
+        
+        pipe = self.redis.client.pipeline(transaction=False)
+        pipe.set(f"mode:{user_id}:{mode}:state", json.dumps(state))
+        pipe.hset(self._meta_key(user_id, mode), "last_interaction", state["last_interaction"])
+        with self.redis.latency.time("pipeline"):
+            pipe.execute()
+        return True
+    
     def _backup_state(self, user_id: str, mode: str):
         """Backup current state before major changes"""
         try:
             state_key = f"mode:{user_id}:{mode}:state"
             backup_key = f"mode:{user_id}:{mode}:state:backup"
             
-            current_state = self.redis.get(state_key)
+            current_state = self.store.get(state_key)
             if current_state:
-                self.redis.set(backup_key, current_state, expire=3600)  # 1 hour backup
+                self.store.set(backup_key, current_state, expire=3600)  # 1 hour backup
                 
         except Exception as e:
             logger.error(f"Error backing up state for {user_id}/{mode}: {e}")
@@ -311,7 +459,7 @@ class ModeManager:
                 "is_active": False,
                 "reset": True
             }
-            self.redis.set(state_key, initial_state)
+            self.store.set(state_key, initial_state)
             logger.info(f"Reset state for {user_id}/{mode}")
             
         except Exception as e:
@@ -330,11 +478,11 @@ class ModeManager:
         """
         try:
             backup_key = f"mode:{user_id}:{mode}:state:backup"
-            backup_state = self.redis.get(backup_key)
+            backup_state = self.store.get(backup_key)
             
             if backup_state:
                 state_key = f"mode:{user_id}:{mode}:state"
-                self.redis.set(state_key, backup_state)
+                self.store.set(state_key, backup_state)
                 logger.info(f"✅ Recovered state from backup for {user_id}/{mode}")
                 return True
             
@@ -4,11 +4,16 @@ Thriller, Horror, Romantic, and Dreamy stories with user choices
 """
 
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
 from datetime import datetime
-from bytez import Bytez
 from src.core.config import get_config
-from src.core.redis_manager import get_redis_manager
+from src.core.state_store import get_state_store
+from src.core.model_client import get_model_client
+from src.core.structured_output import get_structured_generator
+from src.core.rate_limits import get_rate_limiter
+from src.core.user_manager import get_user_manager
 from src.features.mode_engine import get_mode_manager
 
 logger = logging.getLogger(__name__)
@@ -18,6 +23,14 @@ class RoleplayStoryEngine:
     """
     Interactive story engine with branching narratives
     Supports: Thriller, Horror, Romantic, Dreamy genres
+    
+    Story state stays a constant size however long the story runs: a
+    rolling synopsis, the last RECENT_SCENES scenes verbatim, and bounded
+    lists of key facts and choices
+    
+    While a scene is on screen, the next scene for each of its choices is
+    generated speculatively (only on idle keys, within the tier's daily
+    budget) so the tapped choice can be served immediately
     """
     
     GENRES = {
@@ -43,16 +56,61 @@ class RoleplayStoryEngine:
         }
     }
     
+    SCENE_MODEL = "openai/gpt-4o-mini"
+    
+    # Structured output schemas (one JSON reply per scene)
+    _CHOICES = {"type": "array", "items": {"type": "string"}, "minItems": 3, "maxItems": 3}
+    OPENING_SCHEMA = {
+        "type": "object",
+        "required": ["scene", "choices", "characters"],
+        "properties": {
+            "scene": {"type": "string", "minLength": 1},
+            "choices": _CHOICES,
+            "characters": {"type": "array", "items": {"type": "string"}, "description": "Main characters mentioned"}
+        }
+    }
+    SCENE_SCHEMA = {
+        "type": "object",
+        "required": ["scene", "choices", "facts"],
+        "properties": {
+            "scene": {"type": "string", "minLength": 1},
+            "choices": _CHOICES,
+            "facts": {
+                "type": "array",
+                "items": {"type": "string"},
+                "maxItems": 3,
+                "description": "New key facts worth remembering (names, promises, items, injuries)"
+            }
+        }
+    }
+    
+    # Compact narrative state bounds
+    RECENT_SCENES = 3
+    MAX_KEY_FACTS = 20
+    MAX_CHOICES_KEPT = 10
+    SYNOPSIS_MAX_CHARS = 1200
+    
     def __init__(self):
         self.config = get_config()
-        self.redis = get_redis_manager()
+        self.store = get_state_store()
         self.mode_manager = get_mode_manager()
+        self.model_client = get_model_client()
+        self.structured = get_structured_generator()
+        self.user_manager = get_user_manager()
+        self.limits = get_rate_limiter()
         
-        # Initialize Bytez client
-        if hasattr(self.config, 'bytez_key_1') and self.config.bytez_key_1:
-            self.bytez = Bytez(self.config.bytez_key_1)
-        else:
+        if not self.model_client.clients:
             raise ValueError("Bytez API key not configured")
+        
+        # user_id -> {"story": started_at, "scene": n, "branches": {choice_index: Future}}
+        self._speculation: Dict[str, Dict[str, Any]] = {}
+        self._speculation_lock = threading.Lock()
+        # Speculative branches and synopsis folds
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.config.story_speculation_workers,
+            thread_name_prefix="story-bg"
+        )
+        self.speculation_stats = {"started": 0, "hits": 0, "waited": 0, "misses": 0, "discarded": 0, "skipped": 0}
     
     def start_story(self, user_id: str, genre: str) -> Dict[str, Any]:
         """
@@ -82,19 +140,24 @@ class RoleplayStoryEngine:
             story_state = {
                 "genre": genre,
                 "scene_number": 1,
-                "story_context": opening["scene"],
+                "synopsis": "",
+                "recent_scenes": [opening["scene"]],
+                "key_facts": [],
                 "previous_choices": [],
+                "choices_made": 0,
                 "characters": opening.get("characters", []),
-                "current_scene": opening["scene"],
                 "choices": opening["choices"],
                 "started_at": datetime.now().isoformat()
             }
             
             # Save state
             state_key = f"mode:{user_id}:roleplay:state"
-            current_state = self.redis.get(state_key) or {}
+            current_state = self.store.get(state_key) or {}
             current_state["story"] = story_state
-            self.redis.set(state_key, current_state)
+            self.store.set(state_key, current_state)
+            
+            self._discard_speculation(user_id)
+            self._speculate(user_id, story_state)
             
             logger.info(f"✅ Started {genre} story for user {user_id}")
             
@@ -141,27 +204,36 @@ class RoleplayStoryEngine:
                     "error": f"Invalid choice. Choose 1-{len(story_state['choices'])}"
                 }
             
+            # The oldest scene leaves the window after this step: fold it into
+            # the synopsis while the next scene is generated
+            fold = None
+            if len(story_state["recent_scenes"]) >= self.RECENT_SCENES:
+                fold = self._executor.submit(
+                    self._fold_into_synopsis, story_state["synopsis"], story_state["recent_scenes"][0]
+                )
+            
+            # Speculated branch for this exact scene, if one was prepared
+            next_scene = self._take_speculation(user_id, story_state, choice_index)
+            
             # Record choice
-            chosen_option = story_state["choices"][choice_index]
-            story_state["previous_choices"].append({
-                "scene": story_state["scene_number"],
-                "choice": chosen_option
-            })
+            story_state = self._branch_state(story_state, choice_index)
             
             # Generate next scene
-            next_scene = self._generate_next_scene(story_state, choice_index)
+            if next_scene is None:
+                next_scene = self._generate_next_scene(story_state, choice_index)
             
             # Update state
             story_state["scene_number"] += 1
-            story_state["current_scene"] = next_scene["scene"]
             story_state["choices"] = next_scene["choices"]
-            story_state["story_context"] += f"\n\n{next_scene['scene']}"
+            self._remember_scene(story_state, next_scene, fold)
             
             # Save updated state
             state_key = f"mode:{user_id}:roleplay:state"
-            current_state = self.redis.get(state_key) or {}
+            current_state = self.store.get(state_key) or {}
             current_state["story"] = story_state
-            self.redis.set(state_key, current_state)
+            self.store.set(state_key, current_state)
+            
+            self._speculate(user_id, story_state)
             
             logger.info(f"✅ Processed choice for user {user_id}, scene {story_state['scene_number']}")
             
@@ -183,10 +255,10 @@ class RoleplayStoryEngine:
         """Get current story state for user"""
         try:
             state_key = f"mode:{user_id}:roleplay:state"
-            state = self.redis.get(state_key)
+            state = self.store.get(state_key)
             
             if state and "story" in state:
-                return state["story"]
+                return self._compact_legacy(state["story"])
             
             return None
             
@@ -212,7 +284,7 @@ class RoleplayStoryEngine:
                 "genre_name": genre_info["name"],
                 "genre_emoji": genre_info["emoji"],
                 "scene_number": story_state["scene_number"],
-                "choices_made": len(story_state["previous_choices"]),
+                "choices_made": story_state.get("choices_made", len(story_state["previous_choices"])),
                 "started_at": story_state.get("started_at")
             }
             
@@ -261,17 +333,7 @@ Then provide exactly 3 meaningful choices that:
 - Lead to different outcomes
 - Are clearly distinct from each other
 
-Format your response as:
-SCENE:
-[Your story opening here]
-
-CHOICES:
-1. [First choice]
-2. [Second choice]
-3. [Third choice]
-
-CHARACTERS:
-[List main characters mentioned]"""
+Also list the main characters mentioned."""
                 },
                 {
                     "role": "user",
@@ -279,21 +341,18 @@ CHARACTERS:
                 }
             ]
             
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(messages)
-            
-            # Extract content
-            if hasattr(result, 'output') and result.output:
-                content = result.output.get('content', '')
-            elif isinstance(result, dict):
-                content = result.get('content', str(result))
-            else:
-                content = str(result)
-            
-            # Parse response
-            parsed = self._parse_story_response(content)
+            # Openings depend only on genre, so concurrent starts share one call
+            opening = self.structured.generate(
+                self.SCENE_MODEL,
+                messages,
+                self.OPENING_SCHEMA,
+                call_site="story_opening",
+                coalesce=True
+            )
+            if opening is None:
+                raise ValueError("No valid story opening")
             
-            return parsed
+            return opening
             
         except Exception as e:
             logger.error(f"Error generating story opening: {e}")
@@ -304,29 +363,242 @@ CHARACTERS:
                 "characters": ["You"]
             }
     
-    def _generate_next_scene(self, story_state: Dict[str, Any], choice_index: int) -> Dict[str, Any]:
-        """Generate next scene based on previous choice"""
+    # ==================== SPECULATION ====================
+    
+    @staticmethod
+    def _branch_state(story_state: Dict[str, Any], choice_index: int) -> Dict[str, Any]:
+        """Copy of story_state with the choice recorded (input to the next scene)"""
+        return {
+            **story_state,
+            "previous_choices": (story_state["previous_choices"] + [{
+                "scene": story_state["scene_number"],
+                "choice": story_state["choices"][choice_index]
+            }])[-RoleplayStoryEngine.MAX_CHOICES_KEPT:],
+            "choices_made": story_state.get("choices_made", 0) + 1
+        }
+    
+    def _speculation_limit(self, user_id: str) -> int:
+        """Speculative branches per day for the user's tier"""
         try:
-            genre = story_state["genre"]
-            chosen_option = story_state["choices"][choice_index]
-            previous_context = story_state["story_context"][-2000:]  # Last 2000 chars
-            
-            # Build context from previous choices
-            choice_history = "\n".join([
-                f"Scene {c['scene']}: Chose '{c['choice']}'"
-                for c in story_state["previous_choices"][-3:]  # Last 3 choices
-            ])
-            
-            messages = [
-                {
-                    "role": "system",
-                    "content": f"""You are continuing an interactive {genre} story.
+            tier = self.user_manager.get_user(int(user_id))["tier"]
+        except (ValueError, KeyError):
+            tier = "free"
+        return self.user_manager.get_tier_info(tier).get("speculative_branches_per_day", 0)
+    
+    def _speculation_allowance(self, user_id: str) -> int:
+        """Speculative branches left today for the user's tier"""
+        return self.limits.remaining("story_speculation", user_id, self._speculation_limit(user_id))
+    
+    def _charge_speculation(self, user_id: str) -> bool:
+        """Spend one branch of today's budget, False when it's used up"""
+        allowed, _ = self.limits.consume("story_speculation", user_id, self._speculation_limit(user_id))
+        return allowed
+    
+    def _speculate(self, user_id: str, story_state: Dict[str, Any]):
+        """Queue the next scene for every current choice"""
+        if not self.config.story_speculation or self._speculation_allowance(user_id) <= 0:
+            return
+        
+        branches = {
+            index: self._executor.submit(
+                self._speculate_branch, user_id, self._branch_state(story_state, index), index
+            )
+            for index in range(len(story_state["choices"]))
+        }
+        with self._speculation_lock:
+            previous = self._speculation.get(user_id)
+            self._speculation[user_id] = {
+                "story": story_state.get("started_at"),
+                "scene": story_state["scene_number"],
+                "branches": branches
+            }
+        if previous:
+            self._cancel_branches(previous["branches"].values())
+    
+    def _speculate_branch(self, user_id: str, branch_state: Dict[str, Any], choice_index: int) -> Optional[Dict[str, Any]]:
+        """
+        Generate one branch at background priority: only on a key that is
+        idle right now, never waiting for a lease, so interactive calls win
+        """
+        key_id = self.model_client.leases.try_acquire(among=self.model_client.available_keys(self.SCENE_MODEL))
+        if key_id is None:
+            self.speculation_stats["skipped"] += 1
+            return None
+        
+        if not self._charge_speculation(user_id):
+            self.model_client.leases.release(key_id)
+            self.speculation_stats["skipped"] += 1
+            return None
+        
+        self.speculation_stats["started"] += 1
+        try:
+            return self.structured.generate(
+                self.SCENE_MODEL,
+                self._next_scene_messages(branch_state, choice_index),
+                self.SCENE_SCHEMA,
+                call_site="speculative_next_scene",
+                key_id=key_id,
+                lease_held=True
+            )
+        except Exception as e:
+            logger.debug(f"Speculative scene failed for {user_id}: {e}")
+            return None
+    
+    def _take_speculation(self, user_id: str, story_state: Dict[str, Any], choice_index: int) -> Optional[Dict[str, Any]]:
+        """Claim the speculated branch for this choice, discarding the others"""
+        with self._speculation_lock:
+            entry = self._speculation.pop(user_id, None)
+        
+        if not entry:
+            return None
+        
+        future = entry["branches"].pop(choice_index, None)
+        self._cancel_branches(entry["branches"].values())
+        
+        current = entry["story"] == story_state.get("started_at") and entry["scene"] == story_state["scene_number"]
+        if future is None or not current or future.cancel():
+            # Stale, or still queued: generating directly is no slower
+            self.speculation_stats["misses"] += 1
+            return None
+        
+        try:
+            waited = not future.done()
+            scene = future.result(timeout=self.config.chat_deadline)
+        except Exception:
+            scene = None
+        
+        if scene is None:
+            self.speculation_stats["misses"] += 1
+            return None
+        
+        self.speculation_stats["waited" if waited else "hits"] += 1
+        return scene
+    
+    def _cancel_branches(self, futures):
+        for future in futures:
+            future.cancel()
+            self.speculation_stats["discarded"] += 1
+    
+    def _discard_speculation(self, user_id: str):
+        with self._speculation_lock:
+            entry = self._speculation.pop(user_id, None)
+        if entry:
+            self._cancel_branches(entry["branches"].values())
+    
+    def get_speculation_stats(self) -> Dict[str, Any]:
+        """Speculation outcomes (hits served instantly, waited on in-flight branches)"""
+        with self._speculation_lock:
+            pending = len(self._speculation)
+        return {**self.speculation_stats, "pending_users": pending}
+    
+    # ==================== NARRATIVE STATE ====================
+    
+    def _remember_scene(self, story_state: Dict[str, Any], next_scene: Dict[str, Any], fold=None):
+        """Slide the scene window, folding the scene that leaves it into the synopsis"""
+        recent = story_state["recent_scenes"] + [next_scene["scene"]]
+        if len(recent) > self.RECENT_SCENES:
+            evicted = recent.pop(0)
+            synopsis = None
+            if fold is not None:
+                try:
+                    synopsis = fold.result(timeout=self.config.chat_deadline)
+                except Exception as e:
+                    logger.debug(f"Synopsis fold failed: {e}")
+            story_state["synopsis"] = synopsis or self._extractive_fold(story_state["synopsis"], evicted)
+        story_state["recent_scenes"] = recent
+        
+        facts = story_state["key_facts"] + [
+            fact for fact in next_scene.get("facts", []) if fact not in story_state["key_facts"]
+        ]
+        story_state["key_facts"] = facts[-self.MAX_KEY_FACTS:]
+    
+    def _fold_into_synopsis(self, synopsis: str, scene: str) -> str:
+        """Rewrite the synopsis to cover one more scene (model, extractive fallback)"""
+        messages = [
+            {
+                "role": "system",
+                "content": f"""You maintain the running synopsis of an interactive story.
+Rewrite the synopsis so it also covers the new scene. Keep names, open threads and
+consequences of the reader's choices; drop description. Plain prose, at most
+{self.SYNOPSIS_MAX_CHARS // 6} words. Reply with the synopsis only."""
+            },
+            {
+                "role": "user",
+                "content": f"Synopsis so far:\n{synopsis or '(story just began)'}\n\nNew scene:\n{scene}"
+            }
+        ]
+        text = self.model_client.chat(
+            self.SCENE_MODEL,
+            messages,
+            call_site="story_synopsis",
+            deterministic=True
+        ).strip()
+        if not text:
+            return self._extractive_fold(synopsis, scene)
+        return text[-self.SYNOPSIS_MAX_CHARS:]
+    
+    @classmethod
+    def _extractive_fold(cls, synopsis: str, scene: str) -> str:
+        """First sentence of each paragraph appended, oldest sentences trimmed"""
+        lead = " ".join(
+            paragraph.strip().split(". ")[0].rstrip(".") + "."
+            for paragraph in scene.split("\n") if paragraph.strip()
+        )
+        combined = f"{synopsis} {lead}".strip()
+        if len(combined) > cls.SYNOPSIS_MAX_CHARS:
+            combined = combined[-cls.SYNOPSIS_MAX_CHARS:]
+            combined = combined[combined.find(". ") + 2:] if ". " in combined else combined
+        return combined
+    
+    @classmethod
+    def _compact_legacy(cls, story_state: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a story saved with the old ever-growing story_context"""
+        if "story_context" not in story_state:
+            return story_state
+        
+        story_state = dict(story_state)
+        context = story_state.pop("story_context")
+        current = story_state.pop("current_scene", "") or context
+        earlier = context[:-len(current)] if context.endswith(current) else context
+        story_state["synopsis"] = cls._extractive_fold("", earlier[-4 * cls.SYNOPSIS_MAX_CHARS:]) if earlier.strip() else ""
+        story_state["recent_scenes"] = [current]
+        story_state["key_facts"] = []
+        story_state["choices_made"] = len(story_state.get("previous_choices", []))
+        story_state["previous_choices"] = story_state.get("previous_choices", [])[-cls.MAX_CHOICES_KEPT:]
+        return story_state
+    
+    # ==================== GENERATION ====================
+    
+    def _next_scene_messages(self, story_state: Dict[str, Any], choice_index: int) -> List[Dict[str, str]]:
+        """Prompt for the scene after choice_index (choice already recorded)"""
+        genre = story_state["genre"]
+        chosen_option = story_state["choices"][choice_index]
+        synopsis = story_state["synopsis"] or "(story just began)"
+        key_facts = "\n".join(f"- {fact}" for fact in story_state["key_facts"]) or "- none yet"
+        recent_scenes = "\n\n".join(story_state["recent_scenes"])
+        
+        # Build context from previous choices
+        choice_history = "\n".join([
+            f"Scene {c['scene']}: Chose '{c['choice']}'"
+            for c in story_state["previous_choices"][-3:]  # Last 3 choices
+        ])
+        
+        messages = [
+            {
+                "role": "system",
+                "content": f"""You are continuing an interactive {genre} story.
 
 Maintain consistency with previous events and the chosen action.
 Build on the story naturally while keeping the {genre} genre strong.
 
-Previous context:
-{previous_context}
+Story so far:
+{synopsis}
+
+Key facts:
+{key_facts}
+
+Most recent scenes:
+{recent_scenes}
 
 Choice history:
 {choice_history}
@@ -345,36 +617,29 @@ Then provide exactly 3 new meaningful choices that:
 - Maintain story momentum
 - Are all compelling options
 
-Format your response as:
-SCENE:
-[Next scene here]
-
-CHOICES:
-1. [First choice]
-2. [Second choice]
-3. [Third choice]"""
-                },
-                {
-                    "role": "user",
-                    "content": f"Continue the story after the user chose: {chosen_option}"
-                }
-            ]
-            
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(messages)
-            
-            # Extract content
-            if hasattr(result, 'output') and result.output:
-                content = result.output.get('content', '')
-            elif isinstance(result, dict):
-                content = result.get('content', str(result))
-            else:
-                content = str(result)
-            
-            # Parse response
-            parsed = self._parse_story_response(content)
+Also note up to 3 new key facts worth remembering."""
+            },
+            {
+                "role": "user",
+                "content": f"Continue the story after the user chose: {chosen_option}"
+            }
+        ]
+        
+        return messages
+    
+    def _generate_next_scene(self, story_state: Dict[str, Any], choice_index: int) -> Dict[str, Any]:
+        """Generate next scene based on previous choice"""
+        try:
+            scene = self.structured.generate(
+                self.SCENE_MODEL,
+                self._next_scene_messages(story_state, choice_index),
+                self.SCENE_SCHEMA,
+                call_site="generate_next_scene"
+            )
+            if scene is None:
+                raise ValueError("No valid scene")
             
-            return parsed
+            return scene
             
         except Exception as e:
             logger.error(f"Error generating next scene: {e}")
@@ -383,56 +648,6 @@ CHOICES:
                 "scene": "The story continues...",
                 "choices": ["Continue", "Try something else", "Look around"]
             }
-    
-    def _parse_story_response(self, content: str) -> Dict[str, Any]:
-        """Parse AI response into scene and choices"""
-        try:
-            scene = ""
-            choices = []
-            characters = []
-            
-            # Split by sections
-            if "SCENE:" in content:
-                scene_part = content.split("SCENE:")[1].split("CHOICES:")[0].strip()
-                scene = scene_part
-            
-            if "CHOICES:" in content:
-                choices_part = content.split("CHOICES:")[1]
-                if "CHARACTERS:" in choices_part:
-                    choices_part = choices_part.split("CHARACTERS:")[0]
-                
-                # Extract choices
-                lines = choices_part.strip().split("\n")
-                for line in lines:
-                    line = line.strip()
-                    if line and (line[0].isdigit() or line.startswith("-")):
-                        # Remove numbering
-                        choice = line.lstrip("0123456789.-) ").strip()
-                        if choice:
-                            choices.append(choice)
-            
-            if "CHARACTERS:" in content:
-                char_part = content.split("CHARACTERS:")[1].strip()
-                characters = [c.strip() for c in char_part.split(",") if c.strip()]
-            
-            # Ensure we have 3 choices
-            if len(choices) < 3:
-                choices.extend(["Continue", "Look around", "Wait"][:3-len(choices)])
-            choices = choices[:3]  # Max 3 choices
-            
-            return {
-                "scene": scene or "The story unfolds...",
-                "choices": choices,
-                "characters": characters
-            }
-            
-        except Exception as e:
-            logger.error(f"Error parsing story response: {e}")
-            return {
-                "scene": content[:500] if content else "The story continues...",
-                "choices": ["Continue", "Try something else", "Look around"],
-                "characters": []
-            }
 
 
 # Global instance
@@ -0,0 +1,115 @@
+"""
+Tic-Tac-Toe Engine - Bitboards with a precomputed perfect-play table
+Each side is a 9-bit mask (bit i = square i, 0-8 row by row); every
+reachable position is solved once at import, so a move is one lookup
+"""
+
+import random
+from typing import Dict, List, Optional, Tuple
+
+FULL = 0b111111111
+
+WIN_LINES = (
+    0b000000111, 0b000111000, 0b111000000,  # rows
+    0b001001001, 0b010010010, 0b100100100,  # columns
+    0b100010001, 0b001010100                # diagonals
+)
+
+# Share of "medium" moves that come from the table (the rest are random)
+MEDIUM_OPTIMAL_RATE = 0.6
+
+
+def has_line(mask: int) -> bool:
+    """Whether mask covers a winning line"""
+    return any(mask & line == line for line in WIN_LINES)
+
+
+def winner(x: int, o: int) -> Optional[str]:
+    """'X', 'O' or None"""
+    if has_line(x):
+        return "X"
+    if has_line(o):
+        return "O"
+    return None
+
+
+def is_full(x: int, o: int) -> bool:
+    return x | o == FULL
+
+
+def empty_squares(x: int, o: int) -> List[int]:
+    taken = x | o
+    return [square for square in range(9) if not taken & (1 << square)]
+
+
+def to_move(x: int, o: int) -> str:
+    """X always moves first"""
+    return "X" if bin(x).count("1") == bin(o).count("1") else "O"
+
+
+def to_rows(x: int, o: int) -> List[List[str]]:
+    """3x3 grid of 'X', 'O' and ' '"""
+    cells = ["X" if x & (1 << i) else "O" if o & (1 << i) else " " for i in range(9)]
+    return [cells[row * 3:row * 3 + 3] for row in range(3)]
+
+
+# ==================== PERFECT-PLAY TABLE ====================
+
+# x | o << 9 -> (score for the side to move, optimal move squares)
+# A win scores 1 + the squares still empty after it, so faster wins (and
+# slower losses) rank higher; a draw is 0
+_TABLE: Dict[int, Tuple[int, Tuple[int, ...]]] = {}
+
+
+def _solve(mine: int, theirs: int, x_to_move: bool) -> int:
+    x, o = (mine, theirs) if x_to_move else (theirs, mine)
+    key = x | o << 9
+    solved = _TABLE.get(key)
+    if solved is not None:
+        return solved[0]
+
+    best_score, best_moves = -10, []
+    for square in range(9):
+        bit = 1 << square
+        if (mine | theirs) & bit:
+            continue
+        after = mine | bit
+        if has_line(after):
+            score = 1 + 9 - bin(after | theirs).count("1")
+        elif after | theirs == FULL:
+            score = 0
+        else:
+            score = -_solve(theirs, after, not x_to_move)
+
+        if score > best_score:
+            best_score, best_moves = score, [square]
+        elif score == best_score:
+            best_moves.append(square)
+
+    _TABLE[key] = (best_score, tuple(best_moves))
+    return best_score
+
+
+_solve(0, 0, True)
+
+
+def best_moves(x: int, o: int) -> Tuple[int, ...]:
+    """Every optimal square for the side to move"""
+    return _TABLE[x | o << 9][1]
+
+
+def choose_move(x: int, o: int, difficulty: str = "medium") -> int:
+    """
+    Square for the side to move
+    - easy: random
+    - medium: optimal MEDIUM_OPTIMAL_RATE of the time, else random
+    - hard: always optimal (ties broken at random)
+    """
+    if difficulty == "easy" or (difficulty == "medium" and random.random() >= MEDIUM_OPTIMAL_RATE):
+        return random.choice(empty_squares(x, o))
+    return random.choice(best_moves(x, o))
+
+
+def table_size() -> int:
+    """Solved non-terminal positions"""
+    return len(_TABLE)
@@ -0,0 +1,216 @@
+"""
+Voice Clip Library - Pre-rendered TTS for reminder and proactive voice templates
+Templates are rendered once (per language) in the background; once sent, the
+Telegram file_id is reused for good, so Bark only runs again when a clip's
+provider URL has expired before Telegram ever saw it
+"""
+
+import logging
+import random
+import re
+import time
+from typing import Dict, Any, Optional
+
+from src.ai.generator import get_generator
+from src.core.config import get_config
+from src.core.file_id_cache import get_file_id_cache
+from src.core.redis_manager import get_redis_manager
+from src.core.ttl_cache import TTLCache
+from src.features.language_support import LanguageSupport, get_language_support
+
+logger = logging.getLogger(__name__)
+
+
+class VoiceClipLibrary:
+    """
+    Library of pre-rendered voice clips keyed by template and language
+    Clip records (text + provider URL) expire with the URL; clips already
+    sent are served by Telegram file_id instead
+    """
+
+    KEY_PREFIX = "voice_clip:"
+
+    # Spoken after the reminder phrase
+    CARE_LINES = {
+        "english": [
+            "I'm reminding you because I care about you.",
+            "Take care of yourself for me, okay?"
+        ],
+        "hinglish": [
+            "Main yaad dila rahi hoon kyunki mujhe teri fikar hai.",
+            "Apna khayal rakhna, theek hai?"
+        ],
+        "punjabi": [
+            "Main yaad dila rahi aan kyunki menu teri fikar aa.",
+            "Apna khayal rakhi, theek aa?"
+        ]
+    }
+
+    GENERIC_REMINDER = {
+        "english": "Hey! It's time for your reminder.",
+        "hinglish": "Arre yaar, reminder ka time ho gaya!",
+        "punjabi": "Sat Sri Akaal! Reminder da time ho gaya!"
+    }
+
+    # Reminder text keywords -> LanguageSupport.REMINDERS key
+    REMINDER_KEYWORDS = {
+        "drink_water": ["water", "paani", "pani", "hydrate"],
+        "eat": ["eat", "breakfast", "lunch", "dinner", "food", "meal", "khaana", "khana"],
+        "sleep": ["sleep", "bed", "soja", "so ja", "rest"],
+        "medicine": ["medicine", "pill", "tablet", "meds", "dawaai", "dawai"]
+    }
+
+    # Proactive voice notes (LanguageSupport.GREETINGS keys)
+    PROACTIVE_KEYS = ["miss_you", "good_morning", "good_night", "love_you"]
+
+    def __init__(self):
+        self.config = get_config()
+        self.generator = get_generator()
+        self.redis = get_redis_manager()
+        self.file_ids = get_file_id_cache()
+        self.language_support = get_language_support()
+        self.url_ttl = self.config.voice_clip_url_ttl
+        self._clips = TTLCache(max_entries=1000, default_ttl=self.url_ttl)  # clip_key -> record
+        self._stopped = False
+        self.templates = self._build_templates()
+
+    # ==================== TEMPLATES ====================
+
+    @staticmethod
+    def _speakable(text: str) -> str:
+        """Resolve 'karda/kardi' style alternatives to Prabh's (feminine) form"""
+        return re.sub(r"(\w+)/(\w+)", r"\2", text)
+
+    def _build_templates(self) -> Dict[str, Dict[str, Any]]:
+        """Build every clip template with per-language variants"""
+        templates = {}
+
+        for language in LanguageSupport.SUPPORTED_LANGUAGES:
+            care_lines = self.CARE_LINES[language]
+            reminders = dict(LanguageSupport.REMINDERS[language])
+            reminders["generic"] = self.GENERIC_REMINDER[language]
+
+            for key, phrase in reminders.items():
+                for variant, care_line in enumerate(care_lines):
+                    clip_key = f"reminder:{key}:{language}:{variant}"
+                    templates[clip_key] = {
+                        "text": self._speakable(f"{phrase} {care_line}"),
+                        "audio_type": "speech"
+                    }
+
+            greetings = LanguageSupport.GREETINGS[language]
+            for key in self.PROACTIVE_KEYS:
+                clip_key = f"proactive:{key}:{language}:0"
+                templates[clip_key] = {
+                    "text": self._speakable(f"{greetings['hello']} {greetings[key]}"),
+                    "audio_type": "voice"
+                }
+
+        return templates
+
+    def match_reminder(self, reminder_text: str) -> str:
+        """Map free reminder text onto a pre-rendered reminder template"""
+        text = reminder_text.lower()
+        for key, keywords in self.REMINDER_KEYWORDS.items():
+            if re.search(r"\b(" + "|".join(keywords) + r")\b", text):
+                return key
+        return "generic"
+
+    # ==================== CLIPS ====================
+
+    def get_clip(self, clip_key: str, render: bool = True) -> Optional[Dict[str, Any]]:
+        """Get a rendered clip, rendering on demand if allowed"""
+        clip = self._clips.get(clip_key)
+        if clip:
+            return clip
+
+        redis_key = f"{self.KEY_PREFIX}{clip_key}"
+        clip = self.redis.get(redis_key)
+        if isinstance(clip, dict):
+            ttl = self.redis.client.ttl(redis_key)
+            if ttl > 0:
+                self._clips.set(clip_key, clip, ttl=ttl)
+                return clip
+            # Stored without expiry (older records): the URL's age is unknown
+            self.redis.delete(redis_key)
+
+        # Sent before (MediaSender stores file_ids under the clip key)
+        file_id = self.file_ids.get("voice", clip_key)
+        template = self.templates.get(clip_key)
+        if file_id and template:
+            return {"clip_key": clip_key, "text": template["text"], "audio_url": None, "file_id": file_id}
+
+        if render:
+            return self._render(clip_key)
+
+        return None
+
+    @staticmethod
+    def source(clip: Dict[str, Any]) -> str:
+        """What to send: the Telegram file_id when known, else the provider URL"""
+        return clip.get("file_id") or clip["audio_url"]
+
+    def get_reminder_clip(self, user_id: int, reminder_text: str) -> Optional[Dict[str, Any]]:
+        """Pick a reminder clip in the user's language"""
+        language = self.language_support.get_language(user_id)
+        key = self.match_reminder(reminder_text)
+        variants = len(self.CARE_LINES[language])
+        return self.get_clip(f"reminder:{key}:{language}:{random.randrange(variants)}")
+
+    def get_proactive_clip(self, user_id: int, key: str = None) -> Optional[Dict[str, Any]]:
+        """Pick a proactive voice note clip in the user's language"""
+        language = self.language_support.get_language(user_id)
+        key = key or random.choice(self.PROACTIVE_KEYS)
+        return self.get_clip(f"proactive:{key}:{language}:0")
+
+    def _render(self, clip_key: str) -> Optional[Dict[str, Any]]:
+        """Render one template through TTS and store it"""
+        template = self.templates.get(clip_key)
+        if not template:
+            return None
+
+        result = self.generator.generate_audio(template["text"], audio_type=template["audio_type"])
+        if not result["success"]:
+            logger.warning(f"⚠️ Voice clip render failed for {clip_key}: {result.get('error')}")
+            return None
+
+        clip = {
+            "clip_key": clip_key,
+            "text": template["text"],
+            "audio_url": result["url"]
+        }
+        self._clips.set(clip_key, clip)
+        self.redis.set(f"{self.KEY_PREFIX}{clip_key}", clip, expire=self.url_ttl)
+        return clip
+
+    def warm(self, pause_seconds: float = 2.0) -> int:
+        """Pre-render every template that isn't rendered yet (run in background)"""
+        rendered = 0
+        for clip_key in self.templates:
+            if self._stopped:
+                break
+            if self.get_clip(clip_key, render=False):
+                continue
+            if self._render(clip_key):
+                rendered += 1
+            # Leave key capacity for interactive traffic
+            time.sleep(pause_seconds)
+
+        logger.info(f"✅ Voice clip library warmed ({rendered} newly rendered, {len(self.templates)} total)")
+        return rendered
+
+    def stop(self):
+        """Stop background pre-rendering"""
+        self._stopped = True
+
+
+# Global instance
+_voice_clip_library = None
+
+
+def get_voice_clip_library() -> VoiceClipLibrary:
+    """Get global voice clip library"""
+    global _voice_clip_library
+    if _voice_clip_library is None:
+        _voice_clip_library = VoiceClipLibrary()
+    return _voice_clip_library
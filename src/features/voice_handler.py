@@ -6,6 +6,7 @@ import logging
 from src.ai.generator import get_generator
 from src.core.user_manager import get_user_manager
 from src.story.advanced_processor import get_advanced_processor
+from src.features.voice_clips import get_voice_clip_library
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +18,7 @@ class VoiceHandler:
         self.generator = get_generator()
         self.user_manager = get_user_manager()
         self.processor = get_advanced_processor()
+        self.voice_clips = get_voice_clip_library()
     
     async def generate_voice_message(self, user_id: int, text: str = None):
         """Generate voice message from persona"""
@@ -24,6 +26,17 @@ class VoiceHandler:
             user = self.user_manager.get_user(user_id)
             persona = user.get('persona')
             
+            if not text and not persona:
+                # Nothing personal to say - serve a pre-rendered template clip
+                clip = self.voice_clips.get_proactive_clip(user_id, "miss_you")
+                if clip:
+                    return {
+                        "success": True,
+                        "audio_url": self.voice_clips.source(clip),
+                        "text": clip["text"],
+                        "clip_key": clip["clip_key"]
+                    }
+            
             if not text:
                 # Generate proactive voice message
                 text = self.processor.generate_proactive_message(persona) if persona else "Hey, thinking of you..."
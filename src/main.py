@@ -57,10 +57,11 @@ def main():
     # Railway-specific: Clear any existing webhooks before starting polling
     # This will be handled by the bot's initialization instead
     
-    # Start website in background thread
-    website_thread = threading.Thread(target=run_website_thread, daemon=True)
-    website_thread.start()
-    logger.info("✅ Website thread started")
+    # Start website in background thread (unless it runs as its own process)
+    if config.website_in_process:
+        website_thread = threading.Thread(target=run_website_thread, daemon=True)
+        website_thread.start()
+        logger.info("✅ Website thread started")
     
     # Start bot (main thread)
     logger.info("🤖 Starting Advanced Telegram Bot...")
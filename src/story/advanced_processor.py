@@ -4,10 +4,10 @@ Creates a digital persona from user's story and memories
 """
 
 import logging
-import json
 from typing import Dict, Any, List
-from bytez import Bytez
 from src.core.config import get_config
+from src.core.model_client import get_model_client
+from src.core.structured_output import get_structured_generator
 
 logger = logging.getLogger(__name__)
 
@@ -15,9 +15,28 @@ logger = logging.getLogger(__name__)
 class AdvancedStoryProcessor:
     """Process stories to create digital personas and deep understanding"""
     
+    _TEXT_LIST = {"type": "array", "items": {"type": "string"}}
+    ANALYSIS_SCHEMA = {
+        "type": "object",
+        "required": ["persona_name", "persona_traits", "relationship_type", "emotional_tone", "key_memories"],
+        "properties": {
+            "persona_name": {"type": "string", "description": "Name of the person they're talking about, if mentioned"},
+            "persona_traits": _TEXT_LIST,
+            "relationship_type": {"type": "string", "description": "love, friend, family, etc."},
+            "emotional_tone": {"type": "string"},
+            "key_memories": _TEXT_LIST,
+            "speaking_style": {"type": "string", "description": "How this person talks/talked"},
+            "interests": _TEXT_LIST,
+            "physical_description": {"type": "string"},
+            "special_moments": _TEXT_LIST,
+            "loss_context": {"type": "string", "description": "How/why they're separated, if mentioned"}
+        }
+    }
+    
     def __init__(self):
         self.config = get_config()
-        self.bytez = Bytez(self.config.bytez_key_1)
+        self.model_client = get_model_client()
+        self.structured = get_structured_generator()
     
     def process_story_deep(self, story_text: str) -> Dict[str, Any]:
         """Deep process story to extract persona, memories, and character"""
@@ -29,7 +48,7 @@ class AdvancedStoryProcessor:
 
 Story: {story_text}
 
-Extract and return in JSON format:
+Extract:
 1. persona_name: The name of the person they're talking about (if mentioned)
 2. persona_traits: List of personality traits
 3. relationship_type: Type of relationship (love, friend, family, etc.)
@@ -54,27 +73,14 @@ Be empathetic and detailed. This is for someone trying to reconnect with a lost
                 }
             ]
             
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(messages)
-            
-            # Extract response
-            if hasattr(result, 'output') and result.output:
-                response_text = result.output.get('content', '{}')
-            else:
-                response_text = str(result)
-            
-            # Try to parse JSON
-            try:
-                # Find JSON in response
-                start = response_text.find('{')
-                end = response_text.rfind('}') + 1
-                if start >= 0 and end > start:
-                    json_str = response_text[start:end]
-                    analysis = json.loads(json_str)
-                else:
-                    analysis = self._create_default_analysis(story_text)
-            except:
-                analysis = self._create_default_analysis(story_text)
+            # Re-uploads of the same story reuse the previous analysis
+            analysis = self.structured.generate(
+                "openai/gpt-4o-mini",
+                messages,
+                self.ANALYSIS_SCHEMA,
+                call_site="process_story_deep",
+                deterministic=True
+            ) or self._create_default_analysis(story_text)
             
             # Create persona profile
             persona = {
@@ -160,13 +166,12 @@ Be the person they miss. Bring comfort and love."""
                 }
             ]
             
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(messages)
-            
-            if hasattr(result, 'output') and result.output:
-                response = result.output.get('content', "I'm here for you, always. 💕")
-            else:
-                response = str(result)
+            response = self.model_client.chat(
+                "openai/gpt-4o-mini",
+                messages,
+                call_site="generate_persona_response",
+                default="I'm here for you, always. 💕"
+            )
             
             return response
             
@@ -196,13 +201,12 @@ Reference a shared memory if possible. Be genuine and loving."""
                 }
             ]
             
-            model = self.bytez.model("openai/gpt-4o-mini")
-            result = model.run(messages)
-            
-            if hasattr(result, 'output') and result.output:
-                response = result.output.get('content', "Thinking of you... 💕")
-            else:
-                response = str(result)
+            response = self.model_client.chat(
+                "openai/gpt-4o-mini",
+                messages,
+                call_site="persona_proactive_message",
+                default="Thinking of you... 💕"
+            )
             
             return response
             
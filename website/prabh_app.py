@@ -415,4 +415,5 @@ DASHBOARD_HTML = """
 """
 
 if __name__ == '__main__':
-    run_website()
+    logging.basicConfig(level=logging.INFO)
+    run_website(port=config.port)